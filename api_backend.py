@@ -1,10 +1,37 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.predict import generate_all_predictions
+from fastapi.middleware.gzip import GZipMiddleware
+from src.jobs import JobManager, InMemoryJobStore, SQLiteJobStore, QueueFullError
+from src.metrics import configure_logging, count, get_logger, get_metrics, run_report, span
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import sys
 import threading
 import time
 
+# Modul berat (pandas, src.predict -> neuralforecast/torch) sengaja tidak diimpor di sini:
+# diimpor di dalam handler atau oleh warm-up di background, supaya worker baru bisa
+# menjawab /health dalam hitungan milidetik. Anggaran waktu impor: `python -m src.coldstart`.
+
+configure_logging()
+logger = get_logger("api")
+# Folder checkpoint NeuralForecast, atau folder hasil `python -m src.export` (TorchScript, tanpa Lightning)
+MODEL_SAVE_DIR = os.environ.get("PREDICT_MODEL_DIR", "saved_models/Forecast_Model")
+# Jumlah proses inferensi paralel per sektor (1 = sekuensial)
+PREDICT_WORKERS = int(os.environ.get("PREDICT_WORKERS", "1"))
+# Path dataset biner/CSV lokal; diisi = prediksi membaca data lewat mmap, bukan ingest online
+PREDICT_DATASET = os.environ.get("PREDICT_DATASET") or None
+# per_sector = satu model per sektor, global = satu model untuk semua sektor (satu load, satu forward pass)
+PREDICT_MODE = os.environ.get("PREDICT_MODE", "per_sector")
+# Folder arsip prediksi append-only (src.forecast_archive); kosong = tidak diarsipkan
+FORECAST_ARCHIVE = os.environ.get("FORECAST_ARCHIVE", "data/forecast_archive")
+# Folder snapshot dari `python -m src.scheduler` (dibaca saja); kosong = selalu jalankan pipeline
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "data/snapshots")
+
 
 app = FastAPI()
 
@@ -16,52 +43,685 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Kompres respons besar (histori + prediksi) untuk klien yang mendukung gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
-# Variabel global untuk status proses
-process_status = {"status": "Idle", "result": None}
 
-def run_prediction_pipeline(model_save_dir, horizon):
-    global process_status
-    process_status["status"] = "Mengambil data..."
-    # time.sleep(1)  # Simulasi delay, bisa dihapus
-    try:
-        process_status["status"] = "Melakukan prediksi..."
-        final_data, final_predictions_df = generate_all_predictions(model_save_dir, horizon)
-        # Konversi kolom datetime dan Timestamp ke string agar bisa di-serialize ke JSON
-        import pandas as pd
-        def convert_datetime(df):
-            if df is not None:
-                for col in df.columns:
-                    if pd.api.types.is_datetime64_any_dtype(df[col]) or df[col].dtype.__class__.__name__ == 'Timestamp':
-                        df[col] = df[col].astype(str)
-            return df
-        final_data = convert_datetime(final_data)
-        final_predictions_df = convert_datetime(final_predictions_df)
-        process_status["status"] = "Selesai"
-        process_status["result"] = {
-            "data": final_data.to_dict(orient="records") if final_data is not None else [],
-            "predictions": final_predictions_df.to_dict(orient="records") if final_predictions_df is not None else []
-        }
-    except Exception as e:
-        process_status["status"] = f"Error: {str(e)}"
-        process_status["result"] = {
-            "data": [],
-            "predictions": []
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Durasi per template route (mis. /predict/jobs/{job_id}) agar label tidak meledak
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    get_metrics().observe(
+        "idx_http_request_duration_seconds", time.perf_counter() - t0,
+        method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code,
+    )
+    return response
+
+
+# --- Warm-up & readiness ---
+_started_at = time.time()
+_warmup = {"stages": {}, "done": False}
+
+
+def _import_inference_stack():
+    import src.predict  # noqa: F401  (pandas, get_data, registry, cache)
+    import src.rebalance  # noqa: F401
+    import src.serialize  # noqa: F401
+
+
+def _warm_up_models():
+    from src.model_registry import GLOBAL_MODEL_KEY, get_registry
+    from src.predict import SECTOR_SETTINGS
+    keys = [GLOBAL_MODEL_KEY] if PREDICT_MODE == "global" else [setting["sector"] for setting in SECTOR_SETTINGS]
+    get_registry(MODEL_SAVE_DIR).warm_up(keys)
+
+
+def _warm_up_snapshot():
+    # Body respons snapshot aktif dimuat ke memori, jadi request pertama pun cukup cache read
+    meta = current_snapshot()
+    if meta is not None:
+        for fmt in meta["etags"]:
+            _snapshot_body(meta, fmt)
+
+
+def warm_up():
+    """
+    Impor stack inferensi, muat semua model sektor dan snapshot scheduler terbaru, lalu
+    siapkan state /rebalance (kovarians + bobot dasar). Durasi dan status tiap tahap
+    tercatat untuk /ready.
+    """
+    for stage, fn in (("imports", _import_inference_stack), ("models", _warm_up_models),
+                      ("snapshot", _warm_up_snapshot), ("rebalance", lambda: get_rebalance_state())):
+        t0 = time.perf_counter()
+        try:
+            fn()
+            status, error = "ok", None
+        except Exception as e:
+            status, error = "error", str(e)
+            logger.error(f"❌ Warm-up tahap '{stage}' gagal: {e}")
+        _warmup["stages"][stage] = {"status": status, "duration_s": round(time.perf_counter() - t0, 3), "error": error}
+    _warmup["done"] = True
+    logger.info(f"🔥 Warm-up selesai dalam {time.time() - _started_at:.2f}s sejak start")
+
+
+@app.on_event("startup")
+def start_warm_up():
+    # Server langsung menerima request; model dan state disiapkan di background
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
+@app.get("/health")
+def health():
+    # Liveness: tidak menyentuh modul berat sama sekali
+    return {"status": "ok", "uptime_s": round(time.time() - _started_at, 3)}
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: 200 setelah stack inferensi terimpor dan warm-up model selesai, 503 selama
+    masih berjalan (atau bila impor gagal). Kegagalan state /rebalance tidak memblokir.
+    """
+    stages = dict(_warmup["stages"])
+    is_ready = _warmup["done"] and stages.get("imports", {}).get("status") == "ok"
+    body = {"ready": is_ready, "uptime_s": round(time.time() - _started_at, 3), "stages": stages}
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
+def _to_records(df):
+    from src.serialize import to_records
+    return to_records(df)
+
+
+def _serialize_event(event):
+    # Event sektor membawa DataFrame; ubah ke list of records agar bisa disimpan & di-stream
+    return {key: _to_records(value) if hasattr(value, "to_dict") else value for key, value in event.items()}
+
+
+def run_prediction_pipeline(model_save_dir, horizon, emit=None, data=None, mode="per_sector"):
+    """
+    Menjalankan pipeline prediksi dan mengembalikan hasil yang siap di-serialize ke JSON.
+
+    Args:
+        emit (callable, optional): Menerima event progress/sektor (sudah JSON-serializable).
+    """
+    from src.predict import generate_all_predictions
+
+    emit = emit or (lambda event: None)
+    emit({"type": "progress", "stage": "start", "message": "Mengambil data..."})
+    final_data, final_predictions_df = generate_all_predictions(
+        model_save_dir, horizon, n_workers=PREDICT_WORKERS, data=data, mode=mode,
+        on_event=lambda event: emit(_serialize_event(event)),
+    )
+    if final_predictions_df is None:
+        raise RuntimeError("Pipeline prediksi tidak menghasilkan data.")
+
+    archived = None
+    if FORECAST_ARCHIVE:
+        # Arsip tidak boleh menggagalkan job: prediksi tetap dikembalikan walau arsip gagal ditulis
+        from src.forecast_archive import archive_run
+        try:
+            with span("pipeline", stage="archive"):
+                archived = archive_run(FORECAST_ARCHIVE, final_data, final_predictions_df, mode=mode)
+        except Exception:
+            logger.exception("⚠️ Gagal menulis arsip prediksi")
+
+    with span("pipeline", stage="serialize"):
+        return {
+            "data": _to_records(final_data),
+            "predictions": _to_records(final_predictions_df),
+            "archive": archived,
         }
 
-@app.get("/predict")
+
+def _run_job(params, emit):
+    # Snapshot terbaru dari scheduler yang cocok dan masih segar: job cukup membaca snapshot
+    snapshot = _fresh_snapshot(params)
+    if snapshot is not None:
+        result = _replay_snapshot(snapshot, emit)
+        count("idx_jobs_total", status="snapshot")
+        return result
+
+    # Setiap job membawa run report (span per tahap/sektor) di result["report"]
+    with run_report() as report:
+        try:
+            result = run_prediction_pipeline(params["model_save_dir"], params["horizon"], emit=emit,
+                                             data=params.get("dataset"), mode=params.get("mode", "per_sector"))
+        except Exception:
+            count("idx_jobs_total", status="error")
+            logger.exception("❌ Job prediksi gagal")
+            raise
+    count("idx_jobs_total", status="done")
+    report_dict = report.to_dict()
+    logger.info(f"✅ Job prediksi selesai dalam {report_dict['duration_s']:.2f}s")
+    return {**result, "report": report_dict}
+
+
+# --- Snapshot scheduler (read-only) ---
+_snapshot_cache = {"id": None, "meta": None, "bodies": {}}
+_snapshot_lock = threading.Lock()
+
+
+def current_snapshot():
+    """Meta snapshot aktif dari `SNAPSHOT_DIR` (pointer CURRENT dibaca ulang setiap panggilan), atau None."""
+    if not SNAPSHOT_DIR:
+        return None
+    from src.scheduler import read_current
+    meta = read_current(SNAPSHOT_DIR)
+    if meta is None:
+        return None
+    with _snapshot_lock:
+        if _snapshot_cache["id"] != meta["snapshot_id"]:
+            _snapshot_cache.update(id=meta["snapshot_id"], meta=meta, bodies={})
+    return meta
+
+
+def _snapshot_body(meta, fmt):
+    # Body respons yang sudah diserialisasi scheduler; dibaca dari disk sekali per snapshot
+    with _snapshot_lock:
+        if _snapshot_cache["id"] == meta["snapshot_id"] and fmt in _snapshot_cache["bodies"]:
+            return _snapshot_cache["bodies"][fmt]
+    with open(os.path.join(meta["path"], f"response_{fmt}.json"), "rb") as f:
+        body = f.read()
+    with _snapshot_lock:
+        if _snapshot_cache["id"] == meta["snapshot_id"]:
+            _snapshot_cache["bodies"][fmt] = body
+    return body
+
+
+def _fresh_snapshot(params):
+    from src.scheduler import is_fresh
+    meta = current_snapshot()
+    if meta is None or params.get("dataset"):
+        return None
+    matches = (meta["mode"] == params.get("mode", "per_sector") and meta["horizon"] == params["horizon"]
+               and meta["model_save_dir"] == os.path.abspath(params["model_save_dir"]))
+    return meta if matches and is_fresh(meta) else None
+
+
+def _replay_snapshot(meta, emit):
+    # Event sama dengan pipeline (progress + satu event per sektor) agar klien SSE tidak berubah
+    with span("pipeline", stage="snapshot"):
+        result = json.loads(_snapshot_body(meta, "records"))["result"]
+    emit({"type": "progress", "stage": "snapshot", "message": f"Memakai snapshot {meta['snapshot_id']} (data s/d {meta['as_of']})"})
+    history = {}
+    for row in result["data"]:
+        history.setdefault(row["Sector"], []).append(row)
+    predictions = {}
+    for row in result["predictions"]:
+        predictions.setdefault(row["Sector"], []).append(row)
+    for sector, rows in predictions.items():
+        emit({"type": "sector", "sector": sector, "predictions": rows, "history": history.get(sector, [])})
+    logger.info(f"📸 Job prediksi dilayani dari snapshot {meta['snapshot_id']}")
+    return result
+
+
+def _create_job_store():
+    # JOB_STORE_PATH diisi = SQLite bersama (untuk banyak worker uvicorn), kosong = memori
+    path = os.environ.get("JOB_STORE_PATH")
+    return SQLiteJobStore(path) if path else InMemoryJobStore()
+
+
+# PREDICT_JOB_QUEUE berlaku per proses: dengan N worker uvicorn, total antrian bisa N kali nilai ini
+job_manager = JobManager(
+    _create_job_store(),
+    _run_job,
+    max_workers=int(os.environ.get("PREDICT_JOB_WORKERS", "1")),
+    max_queue=int(os.environ.get("PREDICT_JOB_QUEUE", "8")),
+    retention_seconds=int(os.environ.get("PREDICT_JOB_RETENTION", "3600")),
+)
+
+
+def _job_summary(job):
+    return {key: value for key, value in job.items() if key != "result"}
+
+
+@app.post("/predict")
 def predict_api():
-    global process_status
-    # Mulai proses prediksi di thread terpisah agar status bisa di-poll dari frontend
-    if process_status["status"] in ["Idle", "Selesai", "Error"]:
-        process_status = {"status": "Memulai pipeline...", "result": None}
-        thread = threading.Thread(target=run_prediction_pipeline, args=("saved_models/Forecast_Model", 7))
-        thread.start()
-        return JSONResponse({"message": "Proses prediksi dimulai.", "status": process_status["status"]})
+    # Request identik yang masih berjalan memakai job yang sama (tidak memicu pipeline baru)
+    params = {"model_save_dir": MODEL_SAVE_DIR, "horizon": 7, "dataset": PREDICT_DATASET, "mode": PREDICT_MODE}
+    try:
+        job, created = job_manager.submit(params)
+    except QueueFullError as e:
+        return JSONResponse({"message": str(e)}, status_code=429)
+    message = "Proses prediksi dimulai." if created else "Proses sedang berjalan."
+    return JSONResponse(
+        {**_job_summary(job), "message": message, "deduplicated": not created},
+        status_code=202,
+    )
+
+@app.get("/predict/jobs")
+def list_jobs(limit: int = 20):
+    return JSONResponse({"jobs": job_manager.list(limit)})
+
+@app.get("/predict/jobs/{job_id}")
+def job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"message": "Job tidak ditemukan."}, status_code=404)
+    return JSONResponse(_job_summary(job))
+
+@app.get("/predict/jobs/{job_id}/events")
+def job_events(job_id: str, history: int = None):
+    """
+    Server-Sent Events: progress tahap ingest, satu event `sector` per sektor yang selesai,
+    lalu `done`/`error`. Event lama diputar ulang sehingga klien yang telat tetap lengkap.
+    `history` membatasi jumlah baris histori yang dikirim per sektor.
+    """
+    if job_manager.get(job_id) is None:
+        return JSONResponse({"message": "Job tidak ditemukan."}, status_code=404)
+
+    async def stream():
+        async for seq, event in job_manager.events(job_id):
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            if history and event.get("history"):
+                event = {**event, "history": event["history"][-history:]}
+            yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _parse_sectors(sectors):
+    return [sector.strip() for sector in sectors.split(",") if sector.strip()] if sectors else None
+
+
+def _etag_response(request, payload):
+    # ETag dari isi respons: poll berulang dengan hasil yang sama cukup dijawab 304
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return _body_response(request, body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+
+def _body_response(request, body, etag):
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/predict/jobs/{job_id}/result")
+def job_result(job_id: str, request: Request, format: str = "records",
+               sectors: str = None, history: int = None):
+    """
+    Hasil job yang sudah selesai.
+
+    Query:
+        format: `records` (default, list of dict) atau `compact` (kolumnar, lihat `src.serialize`).
+        sectors: daftar sektor dipisah koma.
+        history: jumlah baris histori terakhir per sektor.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"message": "Job tidak ditemukan."}, status_code=404)
+    if job["status"] != "done":
+        return JSONResponse({"message": job["message"], "status": job["status"]}, status_code=409)
+
+    result = job["result"]
+    sector_list = _parse_sectors(sectors)
+    if format == "records" and not sector_list and not history:
+        return _etag_response(request, {"status": job["status"], "result": result})
+
+    import pandas as pd
+    from src.serialize import filter_frame, to_compact
+    data = filter_frame(pd.DataFrame(result["data"]), sector_list, history)
+    predictions = filter_frame(pd.DataFrame(result["predictions"]), sector_list)
+    if format == "compact":
+        payload = {"data": to_compact(data), "predictions": to_compact(predictions)}
     else:
-        return JSONResponse({"message": "Proses sedang berjalan.", "status": process_status["status"]})
+        payload = {"data": _to_records(data), "predictions": _to_records(predictions)}
+    return _etag_response(request, {"status": job["status"], "format": format, "result": payload})
+
+
+@app.get("/snapshot")
+def snapshot_meta():
+    # Snapshot aktif dari scheduler (tanpa isi data), termasuk apakah masih segar untuk jadwal terakhir
+    meta = current_snapshot()
+    if meta is None:
+        return JSONResponse({"message": "Belum ada snapshot."}, status_code=404)
+    from src.scheduler import is_fresh
+    summary = {key: value for key, value in meta.items() if key not in ("report", "path")}
+    return JSONResponse({**summary, "fresh": is_fresh(meta)})
+
+
+@app.get("/snapshot/result")
+def snapshot_result(request: Request, format: str = "records"):
+    """
+    Hasil prediksi snapshot aktif, langsung dari body yang sudah diserialisasi scheduler
+    (format sama dengan `/predict/jobs/{job_id}/result`; `records` atau `compact`).
+    """
+    from src.scheduler import RESPONSE_FORMATS
+    if format not in RESPONSE_FORMATS:
+        return JSONResponse({"message": f"Format harus salah satu dari: {', '.join(RESPONSE_FORMATS)}"}, status_code=422)
+    meta = current_snapshot()
+    if meta is None:
+        return JSONResponse({"message": "Belum ada snapshot."}, status_code=404)
+    return _body_response(request, _snapshot_body(meta, format), meta["etags"][format])
+
+
+@app.get("/models")
+def models_report():
+    # Model yang sedang resident di memori beserta waktu muat dan ukuran parameter
+    from src.model_registry import get_registry
+    report = get_registry(MODEL_SAVE_DIR).memory_report()
+    report["loaded_at"] = report["loaded_at"].astype(str)
+    return JSONResponse({"models": report.to_dict(orient="records")})
+
+
+@app.get("/predict/cache")
+def cache_stats():
+    # Statistik hit/miss cache prediksi per sektor
+    from src.forecast_cache import get_forecast_cache
+    return JSONResponse(get_forecast_cache().stats())
+
+
+@app.get("/predict/jobs/{job_id}/report")
+def job_report(job_id: str):
+    # Laporan JSON satu run: durasi per tahap dan per sektor/model, counter ticker & cache
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"message": "Job tidak ditemukan."}, status_code=404)
+    if job["status"] != "done":
+        return JSONResponse({"message": job["message"], "status": job["status"]}, status_code=409)
+    return JSONResponse((job["result"] or {}).get("report") or {})
+
 
-@app.get("/predict/status")
-def predict_status():
-    global process_status
-    return JSONResponse({"status": process_status["status"], "result": process_status["result"]})
+# Gauge dibaca dari modul yang sudah dimuat saja; scrape /metrics tidak memicu impor berat
+def _forecast_cache_gauges():
+    if "src.forecast_cache" not in sys.modules:
+        return {}
+    stats = sys.modules["src.forecast_cache"].get_forecast_cache().stats()
+    return {
+        (("metric", "hit_ratio"),): stats["hit_rate"],
+        (("metric", "entries"),): stats["entries"],
+    }
+
+
+def _models_resident_gauge():
+    if "src.model_registry" not in sys.modules:
+        return {(): 0}
+    return {(): len(sys.modules["src.model_registry"].get_registry(MODEL_SAVE_DIR).memory_report())}
+
+
+def _forecast_accuracy_gauge():
+    # Dibaca langsung dari accuracy.json arsip (json saja, tanpa impor pandas)
+    path = os.path.join(FORECAST_ARCHIVE, "accuracy.json") if FORECAST_ARCHIVE else None
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        snapshot = json.load(f)
+    gauges = {}
+    for window, summary in snapshot["windows"].items():
+        for row in summary["by_sector"]:
+            for metric in ("mae", "rmse", "mape", "n"):
+                if row[metric] is not None:
+                    gauges[(("metric", metric), ("sector", row["Sector"]), ("window_days", window))] = row[metric]
+    return gauges
+
+
+get_metrics().register_gauge("idx_forecast_cache", _forecast_cache_gauges, "Hit ratio dan jumlah entri cache prediksi.")
+get_metrics().register_gauge("idx_models_resident", _models_resident_gauge, "Jumlah model yang resident di memori proses ini.")
+get_metrics().register_gauge(
+    "idx_forecast_accuracy", _forecast_accuracy_gauge,
+    "Akurasi rolling prediksi vs actual per sektor dari arsip prediksi (accuracy.json).",
+)
+get_metrics().register_gauge(
+    "idx_jobs_pending", lambda: {(): job_manager._pending}, "Job prediksi yang menunggu atau sedang berjalan.",
+)
+
+
+@app.get("/metrics")
+def metrics():
+    # Format teks Prometheus; metrik bersifat per proses (per worker uvicorn)
+    return PlainTextResponse(get_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# --- Arsip prediksi ---
+def _archive_or_404():
+    if not FORECAST_ARCHIVE:
+        return None, JSONResponse({"message": "Arsip prediksi tidak aktif (FORECAST_ARCHIVE kosong)."}, status_code=404)
+    from src.forecast_archive import open_archive
+    return open_archive(FORECAST_ARCHIVE), None
+
+
+@app.get("/forecasts")
+def forecasts(sectors: str = None, as_of: str = None, as_of_start: str = None, as_of_end: str = None,
+              target_start: str = None, target_end: str = None, all_runs: bool = False, format: str = "records"):
+    """
+    Prediksi dari arsip, tanpa menjalankan model.
+
+    Query:
+        as_of: prediksi yang berlaku pada tanggal ini (run terbaru per sektor dengan as_of <= tanggal).
+        as_of_start, as_of_end, target_start, target_end: query rentang (inklusif) bila `as_of` kosong.
+        all_runs: true = semua run, bukan hanya run terbaru per (sektor, as_of, target).
+        sectors: daftar sektor dipisah koma. format: `records` atau `compact`.
+    """
+    archive, error = _archive_or_404()
+    if error:
+        return error
+    sector_list = _parse_sectors(sectors)
+    try:
+        if as_of:
+            frame = archive.as_of(as_of, sectors=sector_list)
+        else:
+            frame = archive.query(sectors=sector_list, as_of_start=as_of_start, as_of_end=as_of_end,
+                                  target_start=target_start, target_end=target_end, latest=not all_runs)
+    except (ValueError, TypeError) as e:
+        return JSONResponse({"message": f"Parameter tanggal tidak valid: {e}"}, status_code=422)
+    if format == "compact":
+        from src.serialize import to_compact
+        return JSONResponse({"format": format, "forecasts": to_compact(frame)})
+    return JSONResponse({"format": format, "forecasts": _to_records(frame)})
+
+
+@app.get("/forecasts/runs")
+def forecast_runs(limit: int = 20):
+    archive, error = _archive_or_404()
+    if error:
+        return error
+    return JSONResponse({"runs": archive.runs(limit).to_dict(orient="records")})
+
+
+@app.get("/forecasts/accuracy")
+def forecast_accuracy(window: int = None, by: str = "sector"):
+    """
+    Akurasi prediksi vs actual dari arsip. Tanpa `window`: ringkasan terakhir yang ditulis
+    saat actual baru di-ingest (`accuracy.json`). Dengan `window` (hari): dihitung dari
+    tabel error arsip. `by`: `sector`, `step` atau `sector_step`.
+    """
+    archive, error = _archive_or_404()
+    if error:
+        return error
+    if window is None:
+        snapshot = archive.accuracy()
+        if snapshot is None:
+            return JSONResponse({"message": "Belum ada prediksi arsip yang dinilai terhadap actual."}, status_code=404)
+        return JSONResponse(snapshot)
+    groups = {"sector": ("Sector",), "step": ("step",), "sector_step": ("Sector", "step")}
+    if by not in groups:
+        return JSONResponse({"message": f"`by` harus salah satu dari: {', '.join(groups)}"}, status_code=422)
+    from src.forecast_archive import summary_records
+    summary = archive.rolling_accuracy(window, by=groups[by])
+    return JSONResponse({"window_days": window, "accuracy": summary_records(summary)})
+
+
+# --- Rebalance ---
+_rebalance_lock = threading.Lock()
+_rebalance_state = None
+
+
+def get_rebalance_state():
+    """
+    State rebalance dari hasil prediksi terbaru: job selesai terbaru di job store atau
+    snapshot scheduler aktif, mana yang lebih baru (`updated_at` vs `published_at`);
+    tanpa keduanya, histori saja.
+    Hanya dibangun ulang bila sumbernya berubah, jadi request biasa cukup memakai
+    state yang sudah ada.
+    """
+    global _rebalance_state
+    latest = job_manager.latest("done")
+    snapshot = current_snapshot()
+    if latest and snapshot and snapshot.get("published_at", 0) > latest["updated_at"]:
+        latest = None
+    elif latest:
+        snapshot = None
+    source = latest["job_id"] if latest else (f"snapshot:{snapshot['snapshot_id']}" if snapshot else None)
+    state = _rebalance_state
+    if state is not None and state.source == source:
+        return state
+
+    with _rebalance_lock:
+        if _rebalance_state is not None and _rebalance_state.source == source:
+            return _rebalance_state
+        import pandas as pd
+        from src.rebalance import RebalanceState, load_history
+        recent, predictions, result, kind, updated_at = None, None, None, "history", None
+        if snapshot:
+            result = json.loads(_snapshot_body(snapshot, "records"))["result"]
+            kind, updated_at = "snapshot", snapshot.get("published_at")
+        elif latest:
+            result = (job_manager.get(source) or {}).get("result")
+            kind, updated_at = "job", latest["updated_at"]
+            if not result:
+                # Job terhapus retensi di antara dua bacaan: bangun dari histori saja
+                source, kind, updated_at = None, "history", None
+        if result:
+            recent = pd.DataFrame(result["data"])
+            predictions = pd.DataFrame(result["predictions"])
+        _rebalance_state = RebalanceState(load_history(recent_df=recent), predictions, source=source,
+                                          source_kind=kind, source_updated_at=updated_at)
+        return _rebalance_state
+
+
+class PortfolioRequest(BaseModel):
+    id: Optional[str] = None
+    holdings: Dict[str, float] = {}
+    method: Optional[str] = None
+    max_weight: Optional[float] = None
+    turnover_cap: Optional[float] = None
+    risk_target: Optional[float] = None
+
+
+class RebalanceRequest(PortfolioRequest):
+    # Batch: setiap portofolio mewarisi metode/batasan level atas yang tidak diisi
+    portfolios: Optional[List[PortfolioRequest]] = None
+
+
+@app.post("/rebalance")
+def rebalance(request: RebalanceRequest):
+    """
+    Bobot target per sektor dari holding saat ini dan batasan (bobot maksimum per sektor,
+    batas turnover, target volatilitas tahunan), memakai prediksi volatilitas terbaru
+    yang sudah dihitung. Kirim `portfolios` untuk menilai banyak portofolio sekaligus.
+    """
+    state = get_rebalance_state()
+    portfolios = request.portfolios if request.portfolios is not None else [request]
+    defaults = {"method": request.method or "risk_parity", "max_weight": request.max_weight,
+                "turnover_cap": request.turnover_cap, "risk_target": request.risk_target}
+    specs = [
+        {key: getattr(p, key) if getattr(p, key) is not None else value for key, value in defaults.items()}
+        for p in portfolios
+    ]
+
+    import numpy as np
+    results = [None] * len(portfolios)
+    try:
+        current, _ = state.holdings_matrix([p.holdings for p in portfolios])
+        # Satu panggilan solver per metode, semua portofolio dalam grup dihitung bersamaan
+        for method in dict.fromkeys(spec["method"] for spec in specs):
+            idx = np.array([i for i, spec in enumerate(specs) if spec["method"] == method])
+            column = lambda key: np.array([np.nan if specs[i][key] is None else specs[i][key] for i in idx])
+            solved = state.solve(current[idx], method=method, max_weight=column("max_weight"),
+                                 turnover_cap=column("turnover_cap"), risk_target=column("risk_target"))
+            for k, i in enumerate(idx):
+                results[i] = {
+                    "id": portfolios[i].id,
+                    "method": method,
+                    "target_weights": dict(zip(state.sectors, solved["weights"][k].round(6).tolist())),
+                    "cash": round(float(solved["cash"][k]), 6),
+                    "expected_vol": round(float(solved["expected_vol"][k]), 6),
+                    "turnover": round(float(solved["turnover"][k]), 6),
+                    "turnover_capped": bool(solved["turnover_capped"][k]),
+                    "turnover_cap_breached": bool(solved["turnover_cap_breached"][k]),
+                }
+    except ValueError as e:
+        return JSONResponse({"message": str(e)}, status_code=422)
+
+    return JSONResponse({**state.summary(), "portfolios": results})
+
+
+RISK_MAX_PATHS = int(os.environ.get("RISK_MAX_PATHS", 2_000_000))
+# Buffer ekor kerugian tumbuh sebanding n_paths x jumlah portofolio
+RISK_MAX_PORTFOLIOS = int(os.environ.get("RISK_MAX_PORTFOLIOS", 50))
+# Horizon maksimum: kelipatan panjang jalur volatilitas prediksi, minimal RISK_MAX_HORIZON_FLOOR hari
+# (fallback histori hanya punya jalur 1 hari)
+RISK_MAX_HORIZON_FACTOR = 5
+RISK_MAX_HORIZON_FLOOR = 30
+
+
+class RiskPortfolio(BaseModel):
+    id: Optional[str] = None
+    holdings: Dict[str, float] = {}
+
+
+class RiskRequest(RiskPortfolio):
+    # Semua portofolio dinilai dari path simulasi yang sama
+    portfolios: Optional[List[RiskPortfolio]] = None
+    n_paths: int = 100_000
+    horizon: Optional[int] = None
+    confidence: List[float] = [0.95, 0.99]
+    drawdowns: List[float] = [0.05, 0.10]
+    seed: Optional[int] = None
+
+
+@app.post("/risk")
+def risk(request: RiskRequest):
+    """
+    Simulasi Monte Carlo risiko turun (VaR/CVaR, peluang rugi dan drawdown) per portofolio
+    selama horizon prediksi, memakai jalur volatilitas prediksi terbaru dan korelasi sektor
+    historis. Kirim `portfolios` untuk menilai banyak portofolio sekaligus.
+    """
+    if not 1 <= request.n_paths <= RISK_MAX_PATHS:
+        return JSONResponse({"message": f"n_paths harus di antara 1 dan {RISK_MAX_PATHS}."}, status_code=422)
+    portfolios = request.portfolios if request.portfolios is not None else [request]
+    if not 1 <= len(portfolios) <= RISK_MAX_PORTFOLIOS:
+        return JSONResponse({"message": f"Jumlah portofolio harus di antara 1 dan {RISK_MAX_PORTFOLIOS}."},
+                            status_code=422)
+    state = get_rebalance_state()
+    max_horizon = max(RISK_MAX_HORIZON_FACTOR * len(state.vol_path), RISK_MAX_HORIZON_FLOOR)
+    if request.horizon is not None and not 1 <= request.horizon <= max_horizon:
+        return JSONResponse({"message": f"horizon harus di antara 1 dan {max_horizon}."}, status_code=422)
+
+    from src.risk import simulate_risk
+    try:
+        weights, cash = state.holdings_matrix([p.holdings for p in portfolios])
+        with span("api", stage="risk"):
+            result = simulate_risk(state, weights, cash, n_paths=request.n_paths, horizon=request.horizon,
+                                   confidence=request.confidence, drawdowns=request.drawdowns, seed=request.seed)
+    except ValueError as e:
+        return JSONResponse({"message": str(e)}, status_code=422)
+
+    by_level = lambda values, i: {str(level): round(float(v[i]), 6) for level, v in values.items()}
+    results = [
+        {
+            "id": p.id,
+            "expected_return": round(float(result["expected_return"][i]), 6),
+            "volatility": round(float(result["volatility"][i]), 6),
+            "var": by_level(result["var"], i),
+            "cvar": by_level(result["cvar"], i),
+            "prob_loss": round(float(result["prob_loss"][i]), 6),
+            "prob_drawdown": by_level(result["prob_drawdown"], i),
+        }
+        for i, p in enumerate(portfolios)
+    ]
+    return JSONResponse({
+        **state.summary(),
+        "n_paths": result["n_paths"],
+        "horizon": result["horizon"],
+        "elapsed_s": round(result["elapsed_s"], 3),
+        "portfolios": results,
+    })
@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
+import json
 import os
-from code.predict import generate_all_predictions
+import urllib.error
+import urllib.parse
+import urllib.request
+from src.predict import generate_all_predictions
 
 # --- SETTINGS ---
+# Panel arsip membaca lewat API (api_backend), bukan membuka file arsip langsung
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:8000")
 SECTORS = [
     "Basic Materials",
     "Consumer Cyclicals",
@@ -88,3 +94,42 @@ if st.button("Lakukan Prediksi"):
                         st.altair_chart(chart, use_container_width=True)
                     except Exception as e:
                         st.warning(f"Plot gagal untuk sektor {sector}: {e}")
+
+# --- Arsip prediksi & akurasi (dari API, tanpa menjalankan model ulang) ---
+def api_get(path, **params):
+    """GET ke API; mengembalikan (payload, pesan error)."""
+    query = urllib.parse.urlencode({key: value for key, value in params.items() if value})
+    url = f"{API_URL}{path}" + (f"?{query}" if query else "")
+    try:
+        with urllib.request.urlopen(url, timeout=15) as response:
+            return json.load(response), None
+    except urllib.error.HTTPError as e:
+        try:
+            return None, json.load(e).get("message", str(e))
+        except ValueError:
+            return None, str(e)
+    except urllib.error.URLError as e:
+        return None, f"API tidak dapat dihubungi di {API_URL}: {e.reason}"
+
+
+st.markdown("---")
+st.subheader("Arsip Prediksi & Akurasi")
+
+accuracy, error = api_get("/forecasts/accuracy")
+if error:
+    st.info(error)
+else:
+    window = st.selectbox("Jendela akurasi (hari)", list(accuracy["windows"]), index=len(accuracy["windows"]) - 1)
+    st.caption(f"Tanggal target terakhir yang dinilai: {accuracy['last_target']}")
+    st.dataframe(pd.DataFrame(accuracy["windows"][window]["by_sector"]))
+
+as_of_date = st.date_input("Lihat prediksi yang berlaku pada tanggal:")
+archive_sectors = None if "Semua Sektor" in selected_sectors or not selected_sectors else ",".join(selected_sectors)
+payload, error = api_get("/forecasts", as_of=as_of_date.isoformat(), sectors=archive_sectors)
+archived = pd.DataFrame(payload["forecasts"]) if payload else pd.DataFrame()
+if error:
+    st.info(error)
+elif archived.empty:
+    st.info("Tidak ada prediksi arsip sampai tanggal tersebut.")
+else:
+    st.dataframe(archived[["Sector", "as_of", "target", "step", "forecast", "run_id", "model_version"]])
@@ -0,0 +1,293 @@
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def load_backtest_data(path="./data/df_final_update.csv", vol_column='SectorVolatility_7d'):
+    """
+    Mengubah data long (Date, Sector, ...) menjadi matriks tanggal x sektor.
+
+    Returns:
+        dict: `dates`, `sectors`, `returns` (T, S) dari SectorReturn_avg dan `vol` (T, S)
+            dari `vol_column`. Nilai yang hilang: return 0, volatilitas di-forward-fill.
+    """
+    df = pd.read_csv(path, parse_dates=['Date'])
+    returns = df.pivot(index='Date', columns='Sector', values='SectorReturn_avg').sort_index()
+    vol = df.pivot(index='Date', columns='Sector', values=vol_column).reindex_like(returns)
+    return {
+        'dates': returns.index.to_numpy(),
+        'sectors': list(returns.columns),
+        'returns': returns.fillna(0.0).to_numpy(dtype=np.float64),
+        'vol': vol.ffill().bfill().to_numpy(dtype=np.float64),
+    }
+
+
+def vol_signal_from_predictions(predictions_df, dates, sectors, column='SectorVolatility_7d'):
+    """
+    Menyusun sinyal volatilitas (T, S) dari prediksi yang diarsipkan
+    (kolom Date, Sector, `column`, mis. hasil `generate_all_predictions` dari banyak tanggal).
+
+    Tanggal tanpa prediksi diisi prediksi terakhir sebelumnya; sebelum prediksi pertama NaN.
+    """
+    pivot = predictions_df.pivot_table(index='Date', columns='Sector', values=column, aggfunc='last')
+    pivot.index = pd.to_datetime(pivot.index)
+    return pivot.reindex(columns=sectors).reindex(pd.to_datetime(dates)).ffill().to_numpy(dtype=np.float64)
+
+
+def allocation_weights(rule, vol, power=1.0, vol_target=None, max_leverage=1.0):
+    """
+    Bobot target per tanggal (T, S) untuk satu aturan alokasi.
+
+    Args:
+        rule (str): 'equal' atau 'inverse_vol' (bobot ~ vol ** -power).
+        vol (np.ndarray): Sinyal volatilitas harian (T, S), mis. volatilitas realisasi
+            atau prediksi (`vol_signal_from_predictions`).
+        power (float): Pangkat untuk 'inverse_vol'.
+        vol_target (float, optional): Target volatilitas tahunan. Bobot diskalakan agar
+            volatilitas ex-ante (asumsi antar-sektor independen) mendekati target; sisanya kas.
+        max_leverage (float): Batas total bobot setelah penskalaan vol target.
+    """
+    n_dates, n_sectors = vol.shape
+    if rule == 'equal':
+        weights = np.full((n_dates, n_sectors), 1.0 / n_sectors)
+    elif rule == 'inverse_vol':
+        safe_vol = np.where(np.isfinite(vol) & (vol > 0), vol, np.nan)
+        raw = safe_vol ** -power
+        raw = np.where(np.isnan(raw), 0.0, raw)
+        total = raw.sum(axis=1, keepdims=True)
+        weights = np.where(total > 0, raw / np.where(total > 0, total, 1.0), 1.0 / n_sectors)
+    else:
+        raise ValueError(f"Aturan alokasi tidak dikenal: {rule}")
+
+    if vol_target:
+        sigma = np.where(np.isfinite(vol), vol, np.nanmean(vol))
+        ex_ante = np.sqrt(((weights * sigma) ** 2).sum(axis=1)) * np.sqrt(TRADING_DAYS)
+        scale = np.minimum(max_leverage, vol_target / np.maximum(ex_ante, 1e-12))
+        weights = weights * scale[:, None]
+    return weights
+
+
+def simulate(returns, targets, rebalance_mask, cost_bps):
+    """
+    Simulasi vektorisasi untuk K strategi sekaligus.
+
+    Bobot target di tanggal t ditentukan dengan informasi sampai penutupan t, dieksekusi
+    di penutupan t dan mulai menghasilkan return di t+1. Di antara tanggal rebalance,
+    bobot bergerak mengikuti harga (drift), termasuk porsi kas (1 - jumlah bobot, return 0).
+
+    Args:
+        returns (np.ndarray): Return harian (T, S).
+        targets (np.ndarray): Bobot target (K, T, S).
+        rebalance_mask (np.ndarray): (K, T) bool, True = rebalance di penutupan hari itu.
+            Hari pertama selalu dianggap rebalance.
+        cost_bps (np.ndarray): Biaya transaksi per strategi (K,), basis point per unit turnover.
+
+    Returns:
+        tuple: (net_returns (K, T-1), turnover (K, T))
+    """
+    n_strat, n_dates, _ = targets.shape
+    mask = rebalance_mask.copy()
+    mask[:, 0] = True
+
+    # Indeks rebalance terakhir <= t dan < t
+    positions = np.where(mask, np.arange(n_dates), -1)
+    last_reb = np.maximum.accumulate(positions, axis=1)
+    prev_reb = np.concatenate([np.zeros((n_strat, 1), dtype=last_reb.dtype), last_reb[:, :-1]], axis=1)
+
+    # Faktor pertumbuhan kumulatif; drift dari s ke t = growth[t] / growth[s]
+    growth = np.cumprod(1.0 + returns, axis=0)
+
+    def drifted(anchor):
+        base = np.take_along_axis(targets, anchor[:, :, None], axis=1)
+        invested = base * (growth[None, :, :] / growth[anchor])
+        cash = 1.0 - base.sum(axis=2)
+        return invested / (invested.sum(axis=2) + cash)[:, :, None]
+
+    pre_trade = drifted(prev_reb)
+    pre_trade[:, 0] = 0.0  # mulai dari kas penuh
+    turnover = np.where(mask, np.abs(targets - pre_trade).sum(axis=2), 0.0)
+    holdings = np.where(mask[:, :, None], targets, pre_trade)
+
+    gross = (holdings[:, :-1] * returns[None, 1:]).sum(axis=2)
+    net = gross - (np.asarray(cost_bps, dtype=np.float64)[:, None] / 1e4) * turnover[:, :-1]
+    return net, turnover
+
+
+def performance_metrics(net_returns, turnover, vol_target=None):
+    """
+    Metrik standar per strategi dari return harian (K, T-1).
+
+    Returns:
+        dict: Array (K,) untuk ann_return, ann_vol, sharpe, max_drawdown, avg_turnover
+            (tahunan) dan vol_gap (ann_vol - vol_target, NaN jika tanpa target).
+    """
+    n_days = net_returns.shape[1]
+    equity = np.cumprod(1.0 + net_returns, axis=1)
+    ann_return = equity[:, -1] ** (TRADING_DAYS / n_days) - 1
+    ann_vol = net_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+    mean_daily = net_returns.mean(axis=1)
+    sharpe = np.where(ann_vol > 0, mean_daily * TRADING_DAYS / np.where(ann_vol > 0, ann_vol, 1.0), np.nan)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+    max_drawdown = (equity / peak - 1).min(axis=1)
+    avg_turnover = turnover.sum(axis=1) / n_days * TRADING_DAYS
+    target = np.asarray(vol_target if vol_target is not None else np.nan, dtype=np.float64)
+    return {
+        'ann_return': ann_return,
+        'ann_vol': ann_vol,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'avg_turnover': avg_turnover,
+        'vol_gap': ann_vol - target,
+    }
+
+
+def strategy_grid(rules=('equal', 'inverse_vol'), powers=(1.0,), rebalance_every=(1, 5, 21),
+                  cost_bps=(0.0, 10.0), vol_targets=(None,), max_leverage=1.0):
+    """
+    Kombinasi parameter (product) sebagai DataFrame, satu baris per strategi.
+    Untuk 'equal', parameter `power` tidak berpengaruh sehingga hanya diambil sekali.
+    """
+    rows = []
+    for rule, power, every, cost, target in itertools.product(rules, powers, rebalance_every, cost_bps, vol_targets):
+        if rule == 'equal' and power != powers[0]:
+            continue
+        rows.append({
+            'rule': rule,
+            'power': power if rule != 'equal' else np.nan,
+            'rebalance_every': int(every),
+            'cost_bps': float(cost),
+            'vol_target': np.nan if target is None else float(target),
+            'max_leverage': float(max_leverage),
+        })
+    return pd.DataFrame(rows)
+
+
+def run_backtest(data, strategies, vol_signal=None, chunk_size=256, return_series=False):
+    """
+    Menjalankan semua strategi di `strategies` sebagai komputasi array
+    (strategi x tanggal x sektor), diproses per chunk agar memori terbatas.
+
+    Args:
+        data (dict): Hasil `load_backtest_data`.
+        strategies (pd.DataFrame): Kolom rule, power, rebalance_every, cost_bps, vol_target,
+            max_leverage (lihat `strategy_grid`).
+        vol_signal (np.ndarray, optional): Sinyal volatilitas (T, S). Default volatilitas
+            realisasi `data['vol']`; gunakan `vol_signal_from_predictions` untuk
+            alokasi berbasis volatilitas prediksi.
+        chunk_size (int): Jumlah strategi per chunk.
+        return_series (bool): Juga kembalikan matriks return bersih (K, T-1).
+
+    Returns:
+        pd.DataFrame | tuple: `strategies` + kolom metrik; dengan `return_series=True`
+            (DataFrame, net_returns).
+    """
+    returns = data['returns']
+    vol = data['vol'] if vol_signal is None else vol_signal
+    n_dates = returns.shape[0]
+    strategies = strategies.reset_index(drop=True)
+
+    # Bobot target hanya bergantung pada aturan alokasi, bukan frekuensi/biaya
+    alloc_codes = strategies.groupby(['rule', 'power', 'vol_target', 'max_leverage'], dropna=False, sort=False).ngroup().to_numpy()
+    _, first_idx = np.unique(alloc_codes, return_index=True)
+    alloc = np.stack([
+        allocation_weights(
+            row.rule, vol,
+            power=1.0 if pd.isna(row.power) else row.power,
+            vol_target=None if pd.isna(row.vol_target) else row.vol_target,
+            max_leverage=row.max_leverage,
+        )
+        for row in strategies.iloc[first_idx].itertuples()
+    ])
+
+    day_index = np.arange(n_dates)
+    every = strategies['rebalance_every'].to_numpy()
+    costs = strategies['cost_bps'].to_numpy(dtype=np.float64)
+    targets_vol = strategies['vol_target'].to_numpy(dtype=np.float64)
+
+    metrics, series = [], []
+    for start in range(0, len(strategies), chunk_size):
+        stop = min(start + chunk_size, len(strategies))
+        targets = alloc[alloc_codes[start:stop]]
+        mask = (day_index[None, :] % every[start:stop, None]) == 0
+        net, turnover = simulate(returns, targets, mask, costs[start:stop])
+        metrics.append(pd.DataFrame(performance_metrics(net, turnover, targets_vol[start:stop])))
+        if return_series:
+            series.append(net)
+
+    result = pd.concat([strategies, pd.concat(metrics, ignore_index=True)], axis=1)
+    if return_series:
+        return result, np.concatenate(series)
+    return result
+
+
+def _simulate_loop(returns, weights, every, cost_bps):
+    # Implementasi referensi hari-per-hari (satu strategi) untuk verifikasi dan benchmark
+    n_dates, n_sectors = returns.shape
+    holdings = np.zeros(n_sectors)
+    net = []
+    for t in range(n_dates):
+        if t > 0:
+            r = returns[t]
+            net.append(float(holdings @ r) - pending_cost)
+            invested = holdings * (1 + r)
+            holdings = invested / (invested.sum() + (1 - holdings.sum()))
+        pending_cost = 0.0
+        if t % every == 0:
+            pending_cost = cost_bps / 1e4 * np.abs(weights[t] - holdings).sum()
+            holdings = weights[t].copy()
+    return np.array(net)
+
+
+def benchmark_backtest(n_strategies=2000, n_check=5, seed=0):
+    """
+    Sweep parameter besar dengan engine vektorisasi dibanding loop Python per strategi
+    (diukur pada `n_check` strategi lalu diekstrapolasi).
+
+    Returns:
+        dict: jumlah strategi, waktu vektorisasi, estimasi waktu loop dan selisih maksimum.
+    """
+    data = load_backtest_data()
+    rng = np.random.default_rng(seed)
+    grid = strategy_grid(
+        rules=('equal', 'inverse_vol'),
+        powers=tuple(np.round(np.linspace(0.25, 3.0, 12), 3)),
+        rebalance_every=(1, 2, 3, 5, 10, 21, 42, 63),
+        cost_bps=(0.0, 5.0, 10.0, 20.0, 30.0),
+        vol_targets=(None, 0.05, 0.08, 0.10, 0.12, 0.15),
+    )
+    grid = grid.sample(n=min(n_strategies, len(grid)), random_state=seed).reset_index(drop=True)
+
+    t0 = time.perf_counter()
+    result, net = run_backtest(data, grid, return_series=True)
+    t_vec = time.perf_counter() - t0
+
+    max_diff, t_loop = 0.0, 0.0
+    for i in rng.choice(len(grid), size=n_check, replace=False):
+        row = grid.iloc[i]
+        weights = allocation_weights(
+            row.rule, data['vol'], power=1.0 if pd.isna(row.power) else row.power,
+            vol_target=None if pd.isna(row.vol_target) else row.vol_target, max_leverage=row.max_leverage,
+        )
+        t0 = time.perf_counter()
+        expected = _simulate_loop(data['returns'], weights, row.rebalance_every, row.cost_bps)
+        t_loop += time.perf_counter() - t0
+        max_diff = max(max_diff, float(np.abs(expected - net[i]).max()))
+
+    return {
+        'strategies': len(grid),
+        'vectorized_s': t_vec,
+        'loop_s_estimate': t_loop / n_check * len(grid),
+        'max_abs_diff': max_diff,
+        'best': result.sort_values('sharpe', ascending=False).head(5),
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_backtest()
+    print(f"📈 {result['strategies']} strategi | vektorisasi {result['vectorized_s']:.2f}s "
+          f"| loop (estimasi) {result['loop_s_estimate']:.1f}s | selisih maks {result['max_abs_diff']:.2e}")
+    print(result['best'].to_string(index=False))
@@ -0,0 +1,559 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BASELINE_PATH = "./benchmarks/baseline.json"
+# Meta yang harus sama agar angka run bisa dibandingkan dengan baseline
+BASELINE_META_KEYS = ("models", "cpu_count")
+FIXTURE_DIR = "./data/bench_fixtures"
+
+
+# --- Fixture & provider palsu ---
+
+def build_fixtures(source_csv="./data/df_final_update.csv", sektor_csv_path="./data/Sector-Faktur.csv",
+                   fixture_dir=FIXTURE_DIR, seed=0):
+    """
+    Membuat fixture rekaman dari df_final_update.csv (sekali, lalu dipakai ulang dari disk).
+
+    - prices.pkl: bar harian OHLCV setiap ticker di Sector-Faktur.csv. Close mengikuti
+      SectorReturn_avg sektornya ditambah noise per ticker (seed tetap).
+    - gpr.pkl: data GPR mentah (kolom date, N10D, GPRD, GPRD_ACT, GPRD_THREAT) dari
+      kolom artikel/GPR di CSV, diambil apa adanya.
+
+    Returns:
+        tuple: (prices, gpr) DataFrame.
+    """
+    prices_path = os.path.join(fixture_dir, "prices.pkl")
+    gpr_path = os.path.join(fixture_dir, "gpr.pkl")
+    if os.path.exists(prices_path) and os.path.exists(gpr_path):
+        return pd.read_pickle(prices_path), pd.read_pickle(gpr_path)
+
+    df = pd.read_csv(source_csv, parse_dates=['Date'])
+    sector_returns = df.pivot(index='Date', columns='Sector', values='SectorReturn_avg').sort_index().fillna(0.0)
+    dates = sector_returns.index
+    df_sektor = pd.read_csv(sektor_csv_path)
+    rng = np.random.default_rng(seed)
+
+    frames = []
+    for ticker, sector in zip(df_sektor.Faktur.str.strip(), df_sektor.Sector):
+        base = sector_returns[sector].to_numpy() if sector in sector_returns else np.zeros(len(dates))
+        close = 1000 * np.cumprod(1 + base + rng.normal(0, 0.01, len(dates)))
+        spread = np.abs(rng.normal(0, 0.005, len(dates)))
+        frames.append(pd.DataFrame({
+            'Date': dates,
+            'Ticker': ticker,
+            'Open': close * (1 - spread / 2),
+            'High': close * (1 + spread),
+            'Low': close * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(1e5, 1e7, len(dates)),
+        }))
+    prices = pd.concat(frames, ignore_index=True)
+
+    gpr = (
+        df.drop_duplicates('Date')
+        .rename(columns={'Date': 'date', 'ArticlesCount_Daily': 'N10D', 'GPR_Daily': 'GPRD',
+                         'GPR_Action_Daily': 'GPRD_ACT', 'GPR_Threat_Daily': 'GPRD_THREAT'})
+        [['date', 'N10D', 'GPRD', 'GPRD_ACT', 'GPRD_THREAT']]
+        .sort_values('date').reset_index(drop=True)
+    )
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    prices.to_pickle(prices_path)
+    gpr.to_pickle(gpr_path)
+    return prices, gpr
+
+
+class FixtureProviders:
+    """
+    Provider data palsu untuk `get_sector_and_article_data`: `fetcher` menggantikan
+    Yahoo Finance dan `gpr_loader` menggantikan unduhan Excel GPR.
+
+    Args:
+        prices (pd.DataFrame): Fixture harga (lihat `build_fixtures`).
+        gpr (pd.DataFrame): Fixture GPR mentah.
+        latency_s (float): Jeda buatan per request ticker (0 = hanya biaya CPU).
+    """
+
+    def __init__(self, prices, gpr, latency_s=0.0):
+        self.by_ticker = {ticker: frame.drop(columns='Ticker') for ticker, frame in prices.groupby('Ticker')}
+        self.gpr = gpr
+        self.latency_s = latency_s
+        self.end_date = prices['Date'].max() + pd.Timedelta(days=1)
+
+    def fetcher(self, ticker_jk, start_date, end_date):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        frame = self.by_ticker.get(ticker_jk.replace('.JK', ''))
+        if frame is None:
+            return pd.DataFrame()
+        # end_date eksklusif, sama seperti yfinance
+        mask = (frame['Date'] >= pd.Timestamp(start_date)) & (frame['Date'] < pd.Timestamp(end_date))
+        return frame[mask]
+
+    def gpr_loader(self):
+        return self.gpr.copy()
+
+
+class _NaiveModel:
+    # Pengganti model NeuralForecast saat checkpoint/neuralforecast tidak tersedia
+    def parameters(self):
+        return []
+
+    def buffers(self):
+        return []
+
+
+class NaiveForecaster:
+    """
+    Stand-in ringan dengan antarmuka `NeuralForecast` (atribut `models`, `predict(df)`):
+    memprediksi rata-rata `y` pada jendela input terakhir untuk `horizon` hari.
+    """
+
+    def __init__(self, model_type, horizon=7, input_size=30):
+        self.models = [type(model_type, (_NaiveModel,), {})()]
+        self.horizon = horizon
+        self.input_size = input_size
+
+    def predict(self, df):
+        frames = []
+        for unique_id, series in df.groupby('unique_id', sort=False):
+            window = series.tail(self.input_size)
+            dates = pd.date_range(window['ds'].max() + pd.Timedelta(days=1), periods=self.horizon, freq='D')
+            frames.append(pd.DataFrame({
+                'unique_id': unique_id,
+                'ds': dates,
+                type(self.models[0]).__name__: float(window['y'].mean()),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+def _neuralforecast_available():
+    try:
+        import neuralforecast  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def probe_real_models(model_save_dir):
+    """
+    Mencari checkpoint yang bisa dimuat, mencoba semua sektor lalu model global
+    (tidak semua sektor wajib punya checkpoint).
+
+    Returns:
+        str | None: Kunci model pertama yang berhasil dimuat, None bila tidak ada.
+    """
+    from src.model_registry import GLOBAL_MODEL_KEY, ModelRegistry
+    from src.predict import SECTOR_SETTINGS
+
+    if not _neuralforecast_available():
+        return None
+    registry = ModelRegistry(model_save_dir)
+    for key in [s['sector'] for s in SECTOR_SETTINGS] + [GLOBAL_MODEL_KEY]:
+        try:
+            registry.get(key)
+            return key
+        except Exception:
+            continue
+    return None
+
+
+def make_registry(model_save_dir, models='auto'):
+    """
+    Registry baru (cold) untuk tahap model load.
+
+    Args:
+        models (str): 'real' = checkpoint NeuralForecast, 'naive' = `NaiveForecaster`,
+            'auto' = real bila neuralforecast terpasang dan minimal satu checkpoint bisa
+            dimuat (lihat `probe_real_models`).
+
+    Returns:
+        tuple: (ModelRegistry, mode yang dipakai)
+    """
+    from src.model_registry import GLOBAL_MODEL_KEY, ModelRegistry, sector_dir_name
+    from src.predict import GLOBAL_MODEL, SECTOR_SETTINGS
+
+    if models == 'auto':
+        models = 'real' if probe_real_models(model_save_dir) else 'naive'
+    if models == 'real':
+        return ModelRegistry(model_save_dir), models
+
+    model_types = {sector_dir_name(s['sector']): s['model'] for s in SECTOR_SETTINGS}
+    model_types[GLOBAL_MODEL_KEY] = GLOBAL_MODEL['model']
+    loader = lambda path: NaiveForecaster(model_types[os.path.basename(path)])
+    # Naive tidak membaca disk: folder checkpoint (termasuk `_global`) tidak wajib ada
+    return ModelRegistry(model_save_dir, loader=loader, require_checkpoint=False), models
+
+
+# --- Pengukuran ---
+
+@contextlib.contextmanager
+def _quiet(enabled=True):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _percentiles(samples):
+    arr = np.asarray(samples, dtype=float) * 1000
+    return {
+        'n': int(arr.size),
+        'p50_ms': float(np.percentile(arr, 50)),
+        'p95_ms': float(np.percentile(arr, 95)),
+        'p99_ms': float(np.percentile(arr, 99)),
+        'max_ms': float(arr.max()),
+    }
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def run_ingest(providers, lookback_days=70, full_data=False):
+    """
+    Satu kali ingest lewat `get_sector_and_article_data` dengan provider fixture.
+
+    Returns:
+        tuple: (df, {'fetch': detik, 'features': detik})
+    """
+    from src.get_data import get_sector_and_article_data
+
+    marks = {}
+    on_event = lambda event: marks.setdefault(event.get('stage'), time.perf_counter())
+    t0 = time.perf_counter()
+    df = get_sector_and_article_data(
+        lookback_days=lookback_days, full_data=full_data, on_event=on_event,
+        end_date=providers.end_date, fetcher=providers.fetcher, gpr_loader=providers.gpr_loader,
+        store_path=None,
+    )
+    t_end = time.perf_counter()
+    if not isinstance(df, pd.DataFrame):
+        raise RuntimeError("Ingest fixture tidak menghasilkan data.")
+    # fetch = unduh saham (sampai event features) + unduh & olah GPR (event gpr -> selesai)
+    return df, {
+        'fetch': (marks['features'] - t0) + (t_end - marks['gpr']),
+        'features': marks['gpr'] - marks['features'],
+    }
+
+
+def run_benchmark(model_save_dir="./saved_models/Forecast_Model", repeats=5, models='auto',
+                  lookback_days=70, full_data=False, latency_s=0.0, quiet=True):
+    """
+    Benchmark end-to-end offline per tahap: data fetch, feature build, model load,
+    predict per sektor dan serialisasi JSON (seperti `run_prediction_pipeline`).
+
+    Returns:
+        dict: Laporan {'meta', 'stages': {tahap: persentil, peak_mb, throughput}}.
+    """
+    from api_backend import _to_records
+    from src.predict import SECTOR_SETTINGS, prepare_sector_input, predict_sector
+
+    prices, gpr = build_fixtures()
+    providers = FixtureProviders(prices, gpr, latency_s=latency_s)
+    samples = {'fetch': [], 'features': [], 'model_load': [], 'predict': [], 'serialize': []}
+    counts = {}
+    # Mode 'auto' diputuskan sekali di awal agar probe tidak ikut terukur di tahap model_load
+    probe = probe_real_models(model_save_dir) if models == 'auto' else None
+    model_mode = ('real' if probe else 'naive') if models == 'auto' else models
+
+    with _quiet(quiet):
+        for _ in range(repeats):
+            df, timings = run_ingest(providers, lookback_days, full_data)
+            samples['fetch'].append(timings['fetch'])
+            samples['features'].append(timings['features'])
+
+            registry, _ = make_registry(model_save_dir, model_mode)
+            loaded, load_errors = [], {}
+            for setting in SECTOR_SETTINGS:
+                t0 = time.perf_counter()
+                try:
+                    registry.get(setting['sector'])
+                except Exception as e:
+                    load_errors[setting['sector']] = f"{type(e).__name__}: {e}"
+                    continue
+                samples['model_load'].append(time.perf_counter() - t0)
+                loaded.append(setting)
+
+            predictions = []
+            for setting in loaded:
+                historical_df = prepare_sector_input(df, setting)
+                t0 = time.perf_counter()
+                predictions.append(predict_sector(historical_df, setting, registry))
+                samples['predict'].append(time.perf_counter() - t0)
+            predictions_df = pd.concat(predictions, ignore_index=True) if predictions else pd.DataFrame()
+
+            t0 = time.perf_counter()
+            body = json.dumps({"data": _to_records(df), "predictions": _to_records(predictions_df)}, default=str)
+            samples['serialize'].append(time.perf_counter() - t0)
+
+        counts = {
+            'fetch': len(df),
+            'features': len(df),
+            'model_load': 1,
+            'predict': 1,
+            'serialize': len(body) / 1e6,
+        }
+
+        # Satu putaran tambahan dengan tracemalloc untuk puncak memori per tahap
+        peaks = {
+            'fetch+features': _peak_mb(lambda: run_ingest(providers, lookback_days, full_data)),
+            'model_load': _peak_mb(lambda: [make_registry(model_save_dir, model_mode)[0].get(s['sector']) for s in loaded]),
+            'predict': _peak_mb(lambda: [predict_sector(prepare_sector_input(df, s), s, registry) for s in loaded]),
+            'serialize': _peak_mb(lambda: json.dumps(
+                {"data": _to_records(df), "predictions": _to_records(predictions_df)}, default=str)),
+        }
+
+    units = {'fetch': 'rows/s', 'features': 'rows/s', 'model_load': 'models/s', 'predict': 'sectors/s', 'serialize': 'MB/s'}
+    stages = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        stats = _percentiles(values)
+        stats['throughput'] = counts[stage] / (stats['p50_ms'] / 1000) if stats['p50_ms'] else None
+        stats['throughput_unit'] = units[stage]
+        stats['peak_mb'] = peaks.get(stage, peaks['fetch+features'] if stage in ('fetch', 'features') else None)
+        stages[stage] = stats
+
+    return {
+        'meta': {
+            'created_at': pd.Timestamp.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'repeats': repeats,
+            'models': model_mode,
+            'models_requested': models,
+            'models_probe': probe,
+            'model_dir': model_save_dir,
+            'lookback_days': lookback_days,
+            'full_data': full_data,
+            'rows': len(df),
+            'sectors_predicted': len(loaded),
+            'load_errors': load_errors,
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        'stages': stages,
+    }
+
+
+def _holdout_errors(df, settings, predict_fn, horizon, n_windows, history_rows):
+    # Rolling origin: prediksi dari setiap cutoff, dibandingkan dengan `horizon` hari sesudahnya
+    from src.predict import prepare_sector_input
+
+    dates = np.sort(df['Date'].unique())
+    totals = {s['sector']: [0.0, 0.0, 0] for s in settings}
+    for k in range(n_windows, 0, -1):
+        cutoff = dates[-1 - k * horizon]
+        past = df[df['Date'] <= cutoff].groupby('Sector', sort=False).tail(history_rows)
+        actual = df[(df['Date'] > cutoff)].set_index(['Sector', 'Date'])['SectorVolatility_7d']
+        for setting, predictions in zip(settings, predict_fn([prepare_sector_input(past, s) for s in settings])):
+            merged = predictions.join(actual, on=['Sector', 'Date'], rsuffix='_actual').dropna()
+            err = merged['SectorVolatility_7d'] - merged['SectorVolatility_7d_actual']
+            total = totals[setting['sector']]
+            total[0] += float(err.abs().sum())
+            total[1] += float((err ** 2).sum())
+            total[2] += len(err)
+    return {sector: (a / n, np.sqrt(s / n)) if n else (np.nan, np.nan) for sector, (a, s, n) in totals.items()}
+
+
+def compare_modes(model_save_dir="./saved_models/Forecast_Model", data="./data/df_final_update.csv",
+                  horizon=7, n_windows=4, repeats=3, models='auto'):
+    """
+    Perbandingan berdampingan mode per sektor vs model global (lihat `src.train.run_global_forecast`).
+
+    - Latensi: load semua model dari registry dingin dan prediksi semua sektor (p50 dari
+      `repeats` kali), plus jumlah model resident dan ukuran parameter.
+    - Akurasi: MAE/RMSE per sektor pada `n_windows` horizon terakhir (rolling origin) lewat
+      jalur inferensi yang sama dengan API. Bila checkpoint dilatih dengan seluruh data,
+      angka ini in-sample untuk kedua mode; gunakan `global_cv_metrics.csv` dan tabel CV
+      training untuk angka out-of-sample.
+
+    Returns:
+        dict: {'latency': DataFrame per mode, 'accuracy': DataFrame per sektor, 'errors': {mode: pesan}}
+    """
+    from src.dataset import load_frame
+    from src.model_registry import GLOBAL_MODEL_KEY
+    from src.predict import HISTORY_ROWS, SECTOR_SETTINGS, predict_global, predict_sector, prepare_sector_input
+
+    df = load_frame(data, sectors=[s['sector'] for s in SECTOR_SETTINGS])
+    latest = df.groupby('Sector', sort=False).tail(HISTORY_ROWS)
+    latest_inputs = [prepare_sector_input(latest, s) for s in SECTOR_SETTINGS]
+    modes = {
+        'per_sector': (
+            [s['sector'] for s in SECTOR_SETTINGS],
+            lambda registry, inputs: [predict_sector(x, s, registry) for x, s in zip(inputs, SECTOR_SETTINGS)],
+        ),
+        'global': (
+            [GLOBAL_MODEL_KEY],
+            lambda registry, inputs: predict_global(inputs, SECTOR_SETTINGS, registry),
+        ),
+    }
+
+    latency, accuracy, errors = [], {}, {}
+    for mode, (keys, predict_all) in modes.items():
+        load_s, predict_s = [], []
+        try:
+            for _ in range(repeats):
+                registry, model_mode = make_registry(model_save_dir, models)
+                t0 = time.perf_counter()
+                for key in keys:
+                    registry.get(key)
+                load_s.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                predict_all(registry, latest_inputs)
+                predict_s.append(time.perf_counter() - t0)
+            accuracy[mode] = _holdout_errors(df, SECTOR_SETTINGS, lambda inputs: predict_all(registry, inputs),
+                                             horizon, n_windows, HISTORY_ROWS)
+        except Exception as e:
+            errors[mode] = f"{type(e).__name__}: {e}"
+            continue
+        report = registry.memory_report()
+        latency.append({
+            'mode': mode,
+            'models': model_mode,
+            'resident_models': len(report),
+            'param_mb': float(report['param_mb'].sum()) if len(report) else 0.0,
+            'load_p50_ms': float(np.median(load_s) * 1000),
+            'predict_p50_ms': float(np.median(predict_s) * 1000),
+            'predict_calls': len(keys),
+        })
+
+    rows = []
+    for setting in SECTOR_SETTINGS:
+        row = {'Sektor': setting['sector']}
+        for mode in modes:
+            mae, rmse = accuracy.get(mode, {}).get(setting['sector'], (np.nan, np.nan))
+            row[f'MAE_{mode}'], row[f'RMSE_{mode}'] = mae, rmse
+        rows.append(row)
+    return {'latency': pd.DataFrame(latency), 'accuracy': pd.DataFrame(rows), 'errors': errors}
+
+
+def compare_to_baseline(report, baseline, tolerance=0.25, min_delta_ms=1.0):
+    """
+    Membandingkan p50 dan peak memori per tahap dengan baseline.
+
+    Regresi = lebih lambat dari baseline * (1 + tolerance) dan selisih > `min_delta_ms`
+    (tahap yang sangat cepat tidak dinilai dari noise), atau peak memori > baseline * (1 + tolerance).
+
+    Returns:
+        pd.DataFrame: Satu baris per tahap dengan kolom rasio dan status.
+
+    Raises:
+        ValueError: Mode model atau jumlah CPU run berbeda dengan meta baseline
+            (lihat `BASELINE_META_KEYS`), sehingga angkanya tidak sebanding.
+    """
+    base_meta = baseline.get('meta', {})
+    mismatch = [
+        f"{key}: baseline {base_meta.get(key)}, run {report['meta'].get(key)}"
+        for key in BASELINE_META_KEYS
+        if base_meta.get(key) != report['meta'].get(key)
+    ]
+    if mismatch:
+        raise ValueError(f"Baseline tidak sebanding dengan run ini ({'; '.join(mismatch)}).")
+
+    rows = []
+    for stage, current in report['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if base is None:
+            rows.append({'stage': stage, 'p50_ms': current['p50_ms'], 'status': 'baru'})
+            continue
+        ratio = current['p50_ms'] / base['p50_ms'] if base['p50_ms'] else np.nan
+        slower = ratio > 1 + tolerance and current['p50_ms'] - base['p50_ms'] > min_delta_ms
+        mem_ratio = (current['peak_mb'] / base['peak_mb']) if current.get('peak_mb') and base.get('peak_mb') else np.nan
+        heavier = mem_ratio > 1 + tolerance
+        rows.append({
+            'stage': stage,
+            'baseline_p50_ms': base['p50_ms'],
+            'p50_ms': current['p50_ms'],
+            'p50_ratio': ratio,
+            'peak_mb_ratio': mem_ratio,
+            'status': 'REGRESI' if slower or heavier else 'ok',
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline prediksi (CPU, tanpa jaringan).")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--models", choices=["auto", "real", "naive"], default="auto")
+    parser.add_argument("--model-dir", default="./saved_models/Forecast_Model")
+    parser.add_argument("--full-data", action="store_true", help="Replay seluruh histori sejak 2015.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--report", help="Tulis laporan JSON ke path ini.")
+    parser.add_argument("--compare-global", action="store_true",
+                        help="Bandingkan latensi & akurasi model per sektor vs model global.")
+    args = parser.parse_args(argv)
+
+    if args.compare_global:
+        with _quiet():
+            result = compare_modes(args.model_dir, repeats=min(args.repeats, 3), models=args.models)
+        print("⏱️ Latensi per mode:")
+        print(result['latency'].to_string(index=False))
+        print("\n🎯 Akurasi holdout per sektor:")
+        print(result['accuracy'].to_string(index=False))
+        for mode, error in result['errors'].items():
+            print(f"⚠️ Mode {mode} tidak bisa dievaluasi: {error}")
+        return 0
+
+    report = run_benchmark(args.model_dir, repeats=args.repeats, models=args.models, full_data=args.full_data)
+    meta = report['meta']
+    mode = meta['models'] if meta['models_requested'] == meta['models'] else f"{meta['models_requested']} -> {meta['models']}"
+    print(f"⏱️ Benchmark ({mode} models, {meta['rows']} rows, {args.repeats}x):")
+    table = pd.DataFrame(report['stages']).T[['n', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_mb', 'throughput', 'throughput_unit']]
+    print(table.to_string())
+    if report['meta']['load_errors']:
+        print(f"⚠️ Model gagal dimuat: {', '.join(report['meta']['load_errors'])}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline disimpan di {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ Baseline {args.baseline} belum ada, jalankan dengan --update-baseline.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    try:
+        comparison = compare_to_baseline(report, baseline, tolerance=args.tolerance)
+    except ValueError as e:
+        print(f"❌ {e} Rekam ulang baseline di mesin yang sama (--models real --update-baseline).")
+        return 1
+    print(comparison.to_string(index=False))
+    regressions = comparison[comparison['status'] == 'REGRESI']
+    if not regressions.empty:
+        print(f"❌ Regresi di tahap: {', '.join(regressions['stage'])}")
+        return 1
+    print("✅ Tidak ada regresi dibanding baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Anggaran waktu impor (detik, interpreter baru, nilai terbaik dari beberapa percobaan)
+IMPORT_BUDGETS = {
+    "api_backend": 0.75,
+    "src.jobs": 0.1,
+    "src.metrics": 0.1,
+}
+# Worker uvicorn baru harus menjawab /health dalam waktu ini (proses start -> respons 200)
+BOOT_BUDGET_S = 1.0
+
+# Modul yang tidak boleh ikut termuat saat `import api_backend` (dimuat oleh warm-up)
+HEAVY_MODULES = (
+    "pandas", "numpy", "torch", "neuralforecast", "pytorch_lightning", "lightning",
+    "IPython", "yfinance", "tqdm", "matplotlib", "sklearn",
+)
+
+_MEASURE_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _repo_root():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module, repeats=5):
+    """
+    Waktu `import module` di interpreter baru (tanpa cache modul proses ini).
+
+    Returns:
+        dict: seconds (terbaik), runs (semua percobaan) dan heavy (modul berat yang ikut termuat).
+    """
+    runs, heavy = [], []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", _MEASURE_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=_repo_root(), capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"module": module, "seconds": min(runs), "runs": runs, "heavy": heavy}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_boot(timeout=30.0, wait_ready=False):
+    """
+    Menjalankan `uvicorn api_backend:app` dan mengukur waktu sampai /health menjawab 200
+    (dan opsional sampai /ready 200, yaitu warm-up model selesai).
+
+    Returns:
+        dict: health_s dan ready_s (None bila tidak diminta / tidak tercapai).
+    """
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_backend:app", "--port", str(port), "--log-level", "warning"],
+        cwd=_repo_root(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    def wait_for(path):
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - t0
+            except Exception:
+                pass
+            time.sleep(0.01)
+        return None
+
+    try:
+        health_s = wait_for("/health")
+        ready_s = wait_for("/ready") if wait_ready and health_s is not None else None
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"health_s": health_s, "ready_s": ready_s}
+
+
+def check_budgets(repeats=5, boot=True):
+    """
+    Membandingkan waktu impor (dan boot) dengan anggaran.
+
+    Returns:
+        list[dict]: Satu baris per pemeriksaan dengan kolom check, seconds, budget dan status.
+    """
+    rows = []
+    for module, budget in IMPORT_BUDGETS.items():
+        result = measure_import(module, repeats)
+        ok = result["seconds"] <= budget and not (module == "api_backend" and result["heavy"])
+        rows.append({"check": f"import {module}", "seconds": result["seconds"], "budget": budget,
+                     "status": "ok" if ok else "over", "heavy": result["heavy"]})
+    if boot:
+        result = measure_boot()
+        seconds = result["health_s"]
+        rows.append({"check": "boot -> /health", "seconds": seconds, "budget": BOOT_BUDGET_S,
+                     "status": "ok" if seconds is not None and seconds <= BOOT_BUDGET_S else "over", "heavy": []})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Anggaran waktu impor dan cold start API.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--no-boot", action="store_true", help="Lewati pengukuran boot uvicorn.")
+    args = parser.parse_args(argv)
+
+    rows = check_budgets(args.repeats, boot=not args.no_boot)
+    for row in rows:
+        seconds = "-" if row["seconds"] is None else f"{row['seconds'] * 1000:.0f} ms"
+        icon = "✅" if row["status"] == "ok" else "❌"
+        extra = f" | modul berat: {', '.join(row['heavy'])}" if row["heavy"] else ""
+        print(f"{icon} {row['check']:<22} {seconds:>8} (anggaran {row['budget'] * 1000:.0f} ms){extra}")
+    return 0 if all(row["status"] == "ok" for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
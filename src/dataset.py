@@ -0,0 +1,249 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = "npyds-v2"
+DATASET_SUFFIX = ".npyds"
+
+
+def dataset_path_for(csv_path):
+    """Lokasi dataset biner untuk sebuah CSV: `data/x.csv` -> `data/x.npyds`."""
+    return os.path.splitext(csv_path)[0] + DATASET_SUFFIX
+
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {"name": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _swap_dir(tmp_path, path):
+    # Sama seperti save_checkpoint_atomic: pembaca tidak pernah melihat folder setengah tertulis
+    old_path = None
+    if os.path.exists(path):
+        old_path = f"{path}.old-{uuid.uuid4().hex[:8]}"
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def write_dataset(df, path, source=None):
+    """
+    Menyimpan DataFrame long (Date, Sector, kolom numerik ...) sebagai dataset biner:
+    satu file `.npy` per kolom plus `meta.json`.
+
+    - Date -> int32 offset hari dari `date_start`
+    - Sector dan kolom teks lain -> kode kategori int16 (label di meta, NaN -> kode -1)
+    - Kolom numerik -> float64 (presisi sama dengan CSV; training membutuhkannya)
+    - Baris diurutkan per (Sector, Date); rentang baris tiap sektor dicatat di meta,
+      sehingga membaca satu sektor hanya menyentuh potongan file yang bersangkutan.
+
+    Args:
+        df (pd.DataFrame): Data dengan kolom Date dan Sector.
+        path (str): Folder tujuan (ditulis atomik).
+        source (dict, optional): Fingerprint file sumber, dipakai untuk deteksi data basi.
+
+    Returns:
+        dict: Isi meta.json.
+    """
+    df = df.dropna(subset=['Sector']).copy()  # baris tanpa sektor tidak bisa dialamatkan per sektor
+    df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
+    df = df.sort_values(['Sector', 'Date'], kind='stable').reset_index(drop=True)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = os.path.join(parent, f".{os.path.basename(path)}.tmp-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp_path)
+
+    date_start = df['Date'].min()
+    columns, categories = {}, {}
+    for col in df.columns:
+        series = df[col]
+        if col == 'Date':
+            values = (series - date_start).dt.days.to_numpy(dtype=np.int32)
+        elif pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+        else:
+            codes, uniques = pd.factorize(series, sort=True)
+            values = codes.astype(np.int16)
+            categories[col] = [str(u) for u in uniques]
+        np.save(os.path.join(tmp_path, f"{col}.npy"), values)
+        columns[col] = str(values.dtype)
+
+    sector_codes = np.load(os.path.join(tmp_path, "Sector.npy"))
+    bounds = np.searchsorted(sector_codes, np.arange(len(categories['Sector']) + 1))
+    meta = {
+        "format": FORMAT_VERSION,
+        "rows": len(df),
+        "date_start": date_start.strftime('%Y-%m-%d'),
+        "columns": columns,
+        "categories": categories,
+        "sector_rows": {s: [int(bounds[i]), int(bounds[i + 1])] for i, s in enumerate(categories['Sector'])},
+        "source": source,
+        "created_at": time.time(),
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    _swap_dir(tmp_path, path)
+    return meta
+
+
+def convert_csv(csv_path, path=None):
+    """Mengonversi CSV data (mis. df_final_update.csv) ke dataset biner di sebelahnya."""
+    path = path or dataset_path_for(csv_path)
+    df = pd.read_csv(csv_path, parse_dates=['Date'])
+    write_dataset(df, path, source=_source_fingerprint(csv_path))
+    return path
+
+
+class MappedDataset:
+    """
+    Dataset biner yang dibuka dengan `np.load(mmap_mode='r')`.
+
+    Kolom tidak disalin ke memori proses: halaman file dibaca lewat page cache OS yang
+    dipakai bersama oleh semua worker uvicorn dan proses training.
+
+    Args:
+        path (str): Folder hasil `write_dataset`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Format dataset tidak dikenal di {path}: {self.meta.get('format')}")
+        self.arrays = {
+            col: np.load(os.path.join(path, f"{col}.npy"), mmap_mode='r') for col in self.meta["columns"]
+        }
+        self.date_start = np.datetime64(self.meta["date_start"], 'D')
+        self.sectors = self.meta["categories"]["Sector"]
+        self.columns = list(self.meta["columns"])
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def sector_rows(self, sector, tail=None):
+        start, stop = self.meta["sector_rows"][sector]
+        if tail:
+            start = max(start, stop - tail)
+        return slice(start, stop)
+
+    def to_frame(self, sectors=None, columns=None, tail=None, dtype=None):
+        """
+        Materialisasi ke DataFrame (hanya sektor, kolom dan baris yang diminta).
+
+        Args:
+            sectors (list[str], optional): Default semua sektor.
+            columns (list[str], optional): Default semua kolom. Date dan Sector selalu ikut.
+            tail (int, optional): Hanya `tail` baris terakhir per sektor.
+            dtype (optional): dtype kolom numerik, mis. np.float32 untuk jalur serving.
+                Default dtype tersimpan (float64).
+
+        Returns:
+            pd.DataFrame: Kolom Date (datetime64), Sector (str), kolom teks (NaN untuk nilai
+                kosong) dan kolom numerik, diurutkan per (Sector, Date).
+        """
+        sectors = self.sectors if sectors is None else [s for s in sectors if s in self.meta["sector_rows"]]
+        columns = self.columns if columns is None else ['Date', 'Sector'] + [c for c in columns if c not in ('Date', 'Sector')]
+        slices = [self.sector_rows(s, tail) for s in sectors]
+        take = np.concatenate([np.arange(sl.start, sl.stop) for sl in slices]) if slices else np.array([], dtype=int)
+
+        data = {}
+        for col in columns:
+            values = self.arrays[col][take] if len(take) else np.asarray(self.arrays[col][:0])
+            if col == 'Date':
+                data[col] = (self.date_start + values.astype('timedelta64[D]')).astype('datetime64[ns]')
+            elif col in self.meta["categories"]:
+                # Kode -1 = NaN saat factorize; tanpa ini ia terbaca sebagai label terakhir
+                labels = np.append(np.asarray(self.meta["categories"][col], dtype=object), np.nan)
+                data[col] = labels[np.where(values < 0, len(labels) - 1, values)]
+            else:
+                data[col] = values if dtype is None else values.astype(dtype, copy=False)
+        return pd.DataFrame(data)
+
+
+_open_lock = threading.Lock()
+_open_datasets = {}
+
+
+def open_dataset(source, rebuild=True):
+    """
+    Membuka dataset (sekali per proses). `source` boleh folder dataset atau CSV;
+    untuk CSV, dataset di sebelahnya dibuat/diperbarui otomatis bila belum ada atau
+    CSV-nya berubah (ukuran/mtime).
+
+    Returns:
+        MappedDataset
+    """
+    path = source
+    if source.endswith('.csv'):
+        path = dataset_path_for(source)
+        stale = True
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            stale = meta.get("source") != _source_fingerprint(source) or meta.get("format") != FORMAT_VERSION
+        if stale:
+            if not rebuild:
+                raise FileNotFoundError(f"Dataset untuk {source} belum ada atau basi.")
+            print(f"🗜️ Mengonversi {source} ke dataset biner...")
+            convert_csv(source, path)
+
+    key = os.path.abspath(path)
+    meta_mtime = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    with _open_lock:
+        cached = _open_datasets.get(key)
+        if cached is None or cached[0] != meta_mtime:
+            cached = (meta_mtime, MappedDataset(path))
+            _open_datasets[key] = cached
+        return cached[1]
+
+
+def load_frame(source, sectors=None, columns=None, tail=None, dtype=None):
+    """
+    Pengganti `pd.read_csv(path, parse_dates=['Date'])` untuk data sektor: membaca dari
+    dataset biner yang di-mmap (lihat `open_dataset` dan `MappedDataset.to_frame`).
+    Kolom numerik float64 seperti read_csv kecuali `dtype` diberikan.
+    """
+    return open_dataset(source).to_frame(sectors=sectors, columns=columns, tail=tail, dtype=dtype)
+
+
+def benchmark_load(csv_path="./data/df_final_update.csv", repeats=5):
+    """
+    Membandingkan waktu baca CSV dengan dataset biner.
+
+    Returns:
+        dict: waktu terbaik (detik) untuk read_csv, open (mmap) dan to_frame, serta ukuran file.
+    """
+    def best_of(fn):
+        best = float('inf')
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    path = open_dataset(csv_path).path
+    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return {
+        'csv_s': best_of(lambda: pd.read_csv(csv_path, parse_dates=['Date'])),
+        'open_s': best_of(lambda: MappedDataset(path)),
+        'to_frame_s': best_of(lambda: MappedDataset(path).to_frame()),
+        'csv_bytes': os.path.getsize(csv_path),
+        'dataset_bytes': size,
+    }
+
+
+if __name__ == "__main__":
+    for csv_path in ("./data/df_final_update.csv", "./data/sector_vol_with_geo_2_7d.csv"):
+        r = benchmark_load(csv_path)
+        print(f"🗜️ {os.path.basename(csv_path)}: read_csv {r['csv_s'] * 1000:.1f} ms | open {r['open_s'] * 1000:.2f} ms "
+              f"| to_frame {r['to_frame_s'] * 1000:.1f} ms | {r['csv_bytes'] / 1e6:.1f} MB -> {r['dataset_bytes'] / 1e6:.1f} MB")
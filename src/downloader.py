@@ -0,0 +1,191 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from tqdm import tqdm
+
+
+class RateLimiter:
+    """
+    Token bucket sederhana yang aman dipakai lintas thread.
+
+    Args:
+        rate (float): Jumlah request per detik yang diizinkan.
+        burst (int): Jumlah request yang boleh dilepas sekaligus.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blok sampai satu token tersedia."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchTimeout(Exception):
+    """Dilempar ketika satu request melewati batas waktu."""
+
+
+# Batas thread fetch yang hidup bersamaan dalam satu proses, termasuk request yang sudah
+# timeout tetapi masih menggantung: slot baru dilepas begitu request tersebut benar-benar selesai
+MAX_INFLIGHT_FETCHES = 64
+_inflight = threading.BoundedSemaphore(MAX_INFLIGHT_FETCHES)
+
+
+def _call_with_timeout(fetcher, args, timeout):
+    # Thread daemon agar request yang menggantung tidak menahan worker pool
+    if not _inflight.acquire(timeout=timeout):
+        raise FetchTimeout(f"{MAX_INFLIGHT_FETCHES} request masih menggantung, slot tidak tersedia dalam {timeout}s")
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = fetcher(*args)
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            _inflight.release()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise FetchTimeout(f"timeout setelah {timeout}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+def _fetch_with_retry(task, fetcher, timeout, max_retries, backoff, max_backoff, limiter):
+    ticker_jk, start_date, end_date = task
+    report = {
+        'Ticker': ticker_jk,
+        'start_date': start_date,
+        'end_date': end_date,
+        'status': 'error',
+        'attempts': 0,
+        'rows': 0,
+        'elapsed_s': 0.0,
+        'error': None,
+    }
+    t0 = time.perf_counter()
+    data = None
+
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        report['attempts'] = attempt + 1
+        try:
+            if timeout:
+                data = _call_with_timeout(fetcher, task, timeout)
+            else:
+                data = fetcher(*task)
+            if data is None or data.empty:
+                report['status'] = 'empty'
+                data = None
+            else:
+                report['status'] = 'ok'
+                report['rows'] = len(data)
+            report['error'] = None
+            break
+        except Exception as e:
+            report['status'] = 'timeout' if isinstance(e, FetchTimeout) else 'error'
+            report['error'] = str(e)
+            if attempt < max_retries:
+                # Exponential backoff dengan jitter agar retry tidak serempak
+                sleep = min(max_backoff, backoff * (2 ** attempt))
+                time.sleep(sleep * (0.5 + random.random() / 2))
+
+    report['elapsed_s'] = time.perf_counter() - t0
+    return data, report
+
+
+def download_tickers(
+    tasks,
+    fetcher,
+    max_workers=8,
+    timeout=30,
+    max_retries=3,
+    backoff=0.5,
+    max_backoff=8.0,
+    rate_limit=None,
+    progress=True,
+):
+    """
+    Mengunduh banyak ticker secara paralel dengan batas worker, timeout, retry dan rate limit.
+
+    Args:
+        tasks (list[tuple]): Daftar `(ticker_jk, start_date, end_date)`.
+        fetcher (callable): Fungsi `(ticker_jk, start_date, end_date) -> DataFrame`.
+        max_workers (int): Jumlah request yang berjalan bersamaan.
+        timeout (float | None): Batas waktu per request (detik). None = tanpa batas.
+        max_retries (int): Jumlah retry setelah percobaan pertama gagal.
+        backoff (float): Jeda awal retry (detik), dikali dua setiap percobaan.
+        max_backoff (float): Jeda retry maksimum (detik).
+        rate_limit (float | None): Maksimum request per detik untuk semua worker.
+        progress (bool): Tampilkan loading bar tqdm.
+
+    Returns:
+        tuple[list, pd.DataFrame]: Hasil per task (DataFrame atau None, urut sesuai `tasks`)
+            dan laporan per task dengan kolom Ticker, start_date, end_date, status,
+            attempts, rows, elapsed_s, error.
+    """
+    limiter = RateLimiter(rate_limit, burst=max_workers) if rate_limit else None
+    results = [None] * len(tasks)
+    reports = [None] * len(tasks)
+    counts = {'ok': 0, 'empty': 0, 'gagal': 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool, \
+            tqdm(total=len(tasks), desc="📥 Collecting data", disable=not progress,
+                 bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]") as pbar:
+        futures = {
+            pool.submit(_fetch_with_retry, task, fetcher, timeout, max_retries, backoff, max_backoff, limiter): i
+            for i, task in enumerate(tasks)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i], reports[i] = future.result()
+            status = reports[i]['status']
+            counts[status if status in counts else 'gagal'] += 1
+            pbar.set_postfix(ok=counts['ok'], empty=counts['empty'], gagal=counts['gagal'])
+            pbar.update(1)
+
+    report_df = pd.DataFrame(
+        reports,
+        columns=['Ticker', 'start_date', 'end_date', 'status', 'attempts', 'rows', 'elapsed_s', 'error'],
+    )
+    return results, report_df
+
+
+if __name__ == "__main__":
+    # Benchmark offline: provider palsu yang lambat (tanpa jaringan)
+    def slow_fetcher(ticker_jk, start_date, end_date, latency=0.2):
+        time.sleep(latency * (0.5 + random.random()))
+        if random.random() < 0.05:
+            raise ConnectionError("provider sibuk")
+        dates = pd.bdate_range(start_date, end_date, inclusive='left')
+        return pd.DataFrame({
+            'Date': dates, 'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Volume': 100,
+        })
+
+    tasks = [(f"T{i:03d}.JK", "2025-01-01", "2025-03-01") for i in range(165)]
+    for workers in (1, 8, 32):
+        t0 = time.perf_counter()
+        _, report = download_tickers(tasks, slow_fetcher, max_workers=workers, backoff=0.05, progress=False)
+        elapsed = time.perf_counter() - t0
+        print(f"⏱️ workers={workers:>2}: {elapsed:6.2f}s | status={report['status'].value_counts().to_dict()}")
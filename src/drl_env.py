@@ -0,0 +1,309 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+DRL_SECTORS = [
+    "Basic_Materials",
+    "Consumer_Cyclicals",
+    "Consumer_Non-Cyclicals",
+    "Energy",
+    "Financials",
+    "Industrials",
+    "Infrastuctures",
+    "Kesehatan",
+    "Properties_Real_Estate",
+    "Technology",
+    "Transportation_Logistic",
+]
+DRL_FIELDS = ["vol_today", "ret_today", "news", "vol_tplus7", "sum_return_7d_fwd"]
+
+
+def load_drl_arrays(path="./data/df_drl_long.csv"):
+    """
+    Memuat df_drl_long.csv sekali menjadi array NumPy (tanggal x sektor) per field.
+
+    Returns:
+        dict: `dates` dan satu array float32 berbentuk (T, 11) untuk setiap nama di `DRL_FIELDS`.
+    """
+    df = pd.read_csv(path, parse_dates=["Date"]).sort_values("Date").reset_index(drop=True)
+    arrays = {"dates": df["Date"].to_numpy()}
+    for field in DRL_FIELDS:
+        columns = [f"{sector}_{field}" for sector in DRL_SECTORS]
+        arrays[field] = df[columns].to_numpy(dtype=np.float32)
+    return arrays
+
+
+def _expanding_zscore(x):
+    """
+    Z-score per kolom memakai statistik expanding (hanya baris <= t), sehingga
+    observasi di tanggal t tidak membocorkan distribusi data masa depan.
+    """
+    frame = pd.DataFrame(x, dtype=np.float64).expanding()
+    mean, std = frame.mean().to_numpy(), frame.std(ddof=0).to_numpy()
+    return (x - mean) / np.where(std > 0, std, 1.0)
+
+
+def _softmax(x):
+    z = x - x.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class BatchedRebalanceEnv:
+    """
+    Environment rebalancing portofolio 11 sektor yang berjalan untuk N episode sekaligus.
+
+    Semua data dipegang sebagai array NumPy; satu `step` hanya berisi operasi array
+    berbentuk (N, 11), tanpa akses pandas.
+
+    - Observasi (N, 44): vol_today, ret_today, news (z-score expanding per sektor) dan bobot saat ini.
+    - Aksi (N, 11): nilai di [-1, 1], dikali `action_scale` lalu diubah menjadi bobot
+      long-only lewat softmax.
+    - Setiap step maju `step_size` hari bursa (default 7, sesuai horizon target) dengan
+      reward = return 7 hari ke depan portofolio
+               - risk_aversion * volatilitas t+7 tertimbang
+               - biaya transaksi * turnover.
+    - Episode dipotong (truncation, bukan terminal) setelah `episode_length` step atau saat
+      data habis; env yang selesai langsung di-reset otomatis (semantik VecEnv) dan
+      `infos[i]["TimeLimit.truncated"]` diisi agar algoritma tetap melakukan bootstrap.
+
+    Args:
+        arrays (dict): Hasil `load_drl_arrays`.
+        n_envs (int): Jumlah episode paralel.
+        episode_length (int): Jumlah step per episode.
+        step_size (int): Jumlah baris (hari bursa) per step.
+        cost_bps (float): Biaya transaksi per unit turnover, dalam basis point.
+        risk_aversion (float): Bobot penalti volatilitas.
+        action_scale (float): Pengali logit; makin besar, makin terkonsentrasi bobot yang bisa dicapai.
+        start_range (tuple, optional): Rentang indeks awal (mis. untuk split train/test).
+        seed (int, optional): Seed RNG.
+    """
+
+    n_sectors = len(DRL_SECTORS)
+
+    def __init__(self, arrays, n_envs=64, episode_length=52, step_size=7, cost_bps=10.0,
+                 risk_aversion=1.0, action_scale=5.0, start_range=None, seed=None):
+        news_z = _expanding_zscore(arrays["news"])
+        # Fitur pasar per tanggal dipra-hitung: (T, 33)
+        self.market_obs = np.concatenate(
+            [arrays["vol_today"] * 100, arrays["ret_today"] * 100, news_z], axis=1
+        ).astype(np.float32)
+        self.fwd_return = arrays["sum_return_7d_fwd"].astype(np.float64)
+        self.fwd_vol = arrays["vol_tplus7"].astype(np.float64)
+
+        self.n_envs = n_envs
+        self.episode_length = episode_length
+        self.step_size = step_size
+        self.cost = cost_bps / 1e4
+        self.risk_aversion = risk_aversion
+        self.action_scale = action_scale
+        self.obs_dim = self.market_obs.shape[1] + self.n_sectors
+
+        n_rows = len(self.fwd_return)
+        lo, hi = start_range or (0, n_rows)
+        # Indeks awal terakhir yang masih muat satu episode penuh
+        self.start_lo = lo
+        self.start_hi = max(lo + 1, min(hi, n_rows) - episode_length * step_size)
+        self.n_rows = n_rows
+        self.rng = np.random.default_rng(seed)
+
+        self.t = np.zeros(n_envs, dtype=np.int64)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.weights = np.full((n_envs, self.n_sectors), 1.0 / self.n_sectors)
+        self.episode_return = np.zeros(n_envs)
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def _observe(self, idx=None):
+        t = self.t if idx is None else self.t[idx]
+        weights = self.weights if idx is None else self.weights[idx]
+        return np.concatenate([self.market_obs[t], weights.astype(np.float32)], axis=1)
+
+    def _reset_envs(self, idx):
+        self.t[idx] = self.rng.integers(self.start_lo, self.start_hi, size=len(idx))
+        self.steps[idx] = 0
+        self.weights[idx] = 1.0 / self.n_sectors
+        self.episode_return[idx] = 0.0
+
+    def reset(self):
+        """Mereset semua episode. Returns: observasi (N, obs_dim)."""
+        self._reset_envs(np.arange(self.n_envs))
+        return self._observe()
+
+    def step(self, actions):
+        """
+        Args:
+            actions (np.ndarray): Aksi (N, 11) di [-1, 1].
+
+        Returns:
+            tuple: (obs, rewards, dones, infos). Untuk env yang selesai, `obs` sudah berisi
+                observasi awal episode baru dan observasi terakhir ada di
+                `infos[i]["terminal_observation"]`.
+        """
+        actions = np.clip(np.asarray(actions, dtype=np.float64).reshape(self.n_envs, self.n_sectors), -1.0, 1.0)
+        new_weights = _softmax(actions * self.action_scale)
+        turnover = np.abs(new_weights - self.weights).sum(axis=1)
+
+        t = self.t
+        port_return = (new_weights * self.fwd_return[t]).sum(axis=1)
+        port_vol = (new_weights * self.fwd_vol[t]).sum(axis=1)
+        rewards = port_return - self.risk_aversion * port_vol - self.cost * turnover
+
+        # Bobot terbawa pergerakan harga selama periode holding
+        grown = new_weights * (1.0 + self.fwd_return[t])
+        self.weights = grown / grown.sum(axis=1, keepdims=True)
+        self.t = t + self.step_size
+        self.steps += 1
+        self.episode_return += port_return
+
+        dones = (self.steps >= self.episode_length) | (self.t >= self.n_rows)
+        self.t = np.minimum(self.t, self.n_rows - 1)
+        infos = [{} for _ in range(self.n_envs)]
+
+        done_idx = np.flatnonzero(dones)
+        if done_idx.size:
+            terminal_obs = self._observe(done_idx)
+            for k, i in enumerate(done_idx):
+                infos[i]["terminal_observation"] = terminal_obs[k]
+                infos[i]["TimeLimit.truncated"] = True
+                infos[i]["episode"] = {"r": float(self.episode_return[i]), "l": int(self.steps[i])}
+            self._reset_envs(done_idx)
+
+        return self._observe(), rewards.astype(np.float32), dones, infos
+
+
+def _spaces(obs_dim, n_sectors):
+    from gymnasium import spaces
+    observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(obs_dim,), dtype=np.float32)
+    action_space = spaces.Box(low=-1.0, high=1.0, shape=(n_sectors,), dtype=np.float32)
+    return observation_space, action_space
+
+
+try:
+    from stable_baselines3.common.vec_env import VecEnv as _VecEnvBase
+except ImportError:
+    _VecEnvBase = object
+
+
+class SectorRebalanceVecEnv(_VecEnvBase):
+    """
+    Adaptor `BatchedRebalanceEnv` ke `stable_baselines3` VecEnv (semua env di-step
+    bersamaan di satu proses, tanpa subprocess).
+
+    Contoh:
+        env = SectorRebalanceVecEnv(load_drl_arrays(), n_envs=256, seed=0)
+        model = PPO("MlpPolicy", env).learn(1_000_000)
+    """
+
+    def __init__(self, arrays, n_envs=64, **env_kwargs):
+        self.core = BatchedRebalanceEnv(arrays, n_envs=n_envs, **env_kwargs)
+        observation_space, action_space = _spaces(self.core.obs_dim, self.core.n_sectors)
+        self.render_mode = None
+        if _VecEnvBase is object:
+            self.num_envs = n_envs
+            self.observation_space, self.action_space = observation_space, action_space
+        else:
+            super().__init__(n_envs, observation_space, action_space)
+        self._actions = None
+
+    def reset(self):
+        return self.core.reset()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        return self.core.step(self._actions)
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def seed(self, seed=None):
+        self.core.seed(seed)
+        return [seed] * self.num_envs
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        target = self.core if hasattr(self.core, attr_name) else self
+        return [getattr(target, attr_name)] * len(self._indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self.core, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        result = getattr(self.core, method_name)(*method_args, **method_kwargs)
+        return [result] * len(self._indices(indices))
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._indices(indices))
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+
+def make_gym_env(arrays=None, **env_kwargs):
+    """
+    Versi satu episode (`gymnasium.Env`) untuk evaluasi atau debugging.
+
+    Untuk training gunakan `SectorRebalanceVecEnv`, karena jauh lebih cepat.
+    """
+    import gymnasium as gym
+
+    arrays = arrays if arrays is not None else load_drl_arrays()
+
+    class SectorRebalanceEnv(gym.Env):
+        metadata = {"render_modes": []}
+        render_mode = None
+
+        def __init__(self):
+            self.core = BatchedRebalanceEnv(arrays, n_envs=1, **env_kwargs)
+            self.observation_space, self.action_space = _spaces(self.core.obs_dim, self.core.n_sectors)
+
+        def reset(self, seed=None, options=None):
+            super().reset(seed=seed)
+            if seed is not None:
+                self.core.seed(seed)
+            return self.core.reset()[0], {}
+
+        def step(self, action):
+            # Auto-reset core tidak dipakai: observasi terminal dikembalikan apa adanya
+            obs, rewards, dones, infos = self.core.step(np.asarray(action)[None, :])
+            if dones[0]:
+                obs = infos[0]["terminal_observation"][None, :]
+            # Tidak ada keadaan terminal: akhir episode/data selalu berupa truncation
+            return obs[0], float(rewards[0]), False, bool(dones[0]), infos[0]
+
+    return SectorRebalanceEnv()
+
+
+def benchmark_env(n_envs=256, n_steps=2000, seed=0):
+    """
+    Mengukur throughput env (env-steps per detik) dengan aksi acak.
+
+    Returns:
+        dict: n_envs, steps dan steps_per_sec.
+    """
+    env = BatchedRebalanceEnv(load_drl_arrays(), n_envs=n_envs, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.uniform(-1, 1, size=(n_steps, n_envs, env.n_sectors))
+    env.reset()
+    t0 = time.perf_counter()
+    for k in range(n_steps):
+        env.step(actions[k])
+    elapsed = time.perf_counter() - t0
+    return {"n_envs": n_envs, "steps": n_envs * n_steps, "steps_per_sec": n_envs * n_steps / elapsed}
+
+
+if __name__ == "__main__":
+    for n_envs in (1, 64, 256, 1024):
+        result = benchmark_env(n_envs=n_envs, n_steps=max(200, 200_000 // n_envs))
+        print(f"⚡ n_envs={n_envs:>4}: {result['steps_per_sec']:,.0f} env-steps/detik")
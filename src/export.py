@@ -0,0 +1,383 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Artefak ekspor per model: folder berisi TorchScript + metadata, strukturnya sama dengan
+# folder checkpoint (satu subfolder per sektor), sehingga bisa langsung dipakai ModelRegistry.
+EXPORT_FILE = "model.pt"
+EXPORT_META = "export.json"
+FORMAT_VERSION = "torchscript-v1"
+
+# Toleransi verifikasi terhadap `NeuralForecast.predict`: selisih absolut maksimum dibagi
+# nilai absolut prediksi terbesar. int8 kehilangan presisi pada bobot Linear.
+VERIFY_TOLERANCE = {"fp32": 1e-4, "int8": 2e-2}
+
+
+def default_export_dir(model_save_dir):
+    return os.path.join(model_save_dir, "_export")
+
+
+def is_exported(model_path):
+    """True bila `model_path` adalah folder hasil `export_model` (bukan checkpoint NeuralForecast)."""
+    return os.path.isfile(os.path.join(model_path, EXPORT_META))
+
+
+class ExportedForecaster:
+    """
+    Prediktor ringan dari artefak TorchScript: tanpa NeuralForecast, Lightning maupun
+    DataLoader. Satu forward pass per batch jendela input (ukuran batch ikut terekam di graf).
+
+    Antarmuka `predict(df)` sama dengan `NeuralForecast.predict` untuk kebutuhan
+    `src.predict` (kolom unique_id, ds, <nama model>), sehingga bisa dimuat oleh
+    `ModelRegistry` sebagai pengganti checkpoint.
+
+    Args:
+        model_path (str): Folder hasil `export_model`.
+    """
+
+    def __init__(self, model_path):
+        import torch
+
+        with open(os.path.join(model_path, EXPORT_META)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"❌ Format ekspor tidak dikenal di '{model_path}': {self.meta.get('format')}")
+        self.module = torch.jit.load(os.path.join(model_path, EXPORT_FILE), map_location="cpu")
+        self.module.eval()
+        self.model_name = self.meta["model"]
+        self.input_size = self.meta["input_size"]
+        self.h = self.meta["h"]
+        self.hist_exog_list = self.meta["hist_exog_list"]
+        self.nbytes = os.path.getsize(os.path.join(model_path, EXPORT_FILE))
+        # Executor TorchScript mengoptimasi graf pada beberapa panggilan pertama; dijalankan
+        # di sini supaya biaya itu masuk ke waktu muat (warm-up), bukan ke request pertama
+        dummy = [np.linspace(0.0, 1.0, self.input_size)] * self.meta["batch_size"]
+        for _ in range(2):
+            self.forecast_batch(dummy, [np.zeros(self.input_size)] * len(dummy) if self.hist_exog_list else None)
+
+    def forecast(self, y, x=None):
+        """
+        Prediksi langsung dari jendela NumPy mentah.
+
+        Args:
+            y (np.ndarray): Histori target, shape [T]. Hanya `input_size` nilai terakhir yang
+                dipakai; histori yang lebih pendek diberi padding nol (dimask, sama dengan
+                NeuralForecast).
+            x (np.ndarray, optional): Fitur eksogen historis, shape [T] atau [T, n_exog],
+                urutan kolom sama dengan `hist_exog_list`.
+
+        Returns:
+            np.ndarray: Prediksi dengan shape [h].
+        """
+        return self.forecast_batch([y], None if x is None else [x])[0]
+
+    def forecast_batch(self, ys, xs=None):
+        """
+        Seperti `forecast` untuk beberapa series sekaligus (mis. semua sektor pada model global).
+
+        Returns:
+            np.ndarray: Prediksi dengan shape [n_series, h].
+        """
+        import torch
+
+        n_exog = len(self.hist_exog_list)
+        if n_exog and xs is None:
+            raise ValueError(f"Model {self.model_name} butuh fitur eksogen {self.hist_exog_list}.")
+
+        # Kolom: y, fitur eksogen..., available_mask; h baris terakhir adalah horizon (dimask)
+        windows = np.zeros((len(ys), self.input_size + self.h, n_exog + 2), dtype=np.float32)
+        for i, y in enumerate(ys):
+            y = np.asarray(y, dtype=np.float32)[-self.input_size:]
+            start = self.input_size - len(y)
+            windows[i, start:self.input_size, 0] = y
+            windows[i, start:self.input_size, -1] = 1.0
+            if n_exog:
+                windows[i, start:self.input_size, 1:-1] = np.asarray(xs[i], dtype=np.float32).reshape(-1, n_exog)[-len(y):]
+
+        # Graf dilacak untuk batch tetap; potongan terakhir diisi salinan series pertama
+        batch_size, outputs = self.meta["batch_size"], []
+        with torch.inference_mode():
+            for start in range(0, len(windows), batch_size):
+                chunk = windows[start:start + batch_size]
+                n = len(chunk)
+                if n < batch_size:
+                    chunk = np.concatenate([chunk, np.repeat(chunk[:1], batch_size - n, axis=0)])
+                y_hat = self.module(torch.from_numpy(chunk))
+                outputs.append(y_hat.reshape(batch_size, -1)[:n, :self.h].numpy())
+        return np.concatenate(outputs)
+
+    def predict(self, df):
+        """
+        Args:
+            df (pd.DataFrame): Kolom unique_id, ds, y dan fitur eksogen (format input NeuralForecast).
+
+        Returns:
+            pd.DataFrame: Kolom unique_id, ds dan <nama model>, `h` baris per series.
+        """
+        codes, unique_ids = pd.factorize(df["unique_id"], sort=False)
+        ds = pd.DatetimeIndex(df["ds"])
+        order = np.lexsort((ds.asi8, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(unique_ids) + 1))
+        y = df["y"].to_numpy(dtype=np.float32)[order]
+        x = np.column_stack([df[c].to_numpy(dtype=np.float32) for c in self.hist_exog_list])[order] if self.hist_exog_list else None
+
+        spans = list(zip(bounds[:-1], bounds[1:]))
+        y_hat = self.forecast_batch([y[a:b] for a, b in spans], None if x is None else [x[a:b] for a, b in spans])
+
+        last = ds.to_numpy()[order][bounds[1:] - 1]
+        step = pd.to_timedelta(f"1{self.meta['freq']}").to_timedelta64()
+        dates = last[:, None] + step * np.arange(1, self.h + 1)
+        return pd.DataFrame({
+            "unique_id": np.repeat(np.asarray(unique_ids), self.h),
+            "ds": dates.ravel(),
+            self.model_name: y_hat.ravel(),
+        })
+
+
+def load_exported(model_path):
+    return ExportedForecaster(model_path)
+
+
+def _traced_module(model, quantize, batch_size=1):
+    # Jalur prediksi NeuralForecast (_normalization -> _parse_windows -> forward -> invers
+    # scaler) dilacak sekali menjadi graf TorchScript untuk jendela [batch_size, L + h, C].
+    # Bentuk batch ikut terekam di graf, jadi batch_size disimpan di metadata.
+    import torch
+
+    if model.RECURRENT or model.loss.is_distribution_output:
+        raise ValueError(f"Model {type(model).__name__} (recurrent/distribusi) belum didukung untuk ekspor.")
+    if len(model.futr_exog_list) or len(model.stat_exog_list):
+        raise ValueError(f"Model {type(model).__name__} memakai fitur futr/stat exog; ekspor hanya mendukung hist exog.")
+
+    model.eval()
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    temporal_cols = pd.Index(["y", *model.hist_exog_list, "available_mask"])
+
+    class _Window(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            # LightningModule sendiri tidak bisa dilacak (properti trainer), jadi yang
+            # didaftarkan hanya submodulnya
+            self.__dict__["model"] = model
+            for name, child in model.named_children():
+                self.add_module(name, child)
+
+        def forward(self, temporal):
+            # _normalization menulis balik ke tensor input, jadi input disalin dulu
+            windows = {"temporal": temporal.clone().unsqueeze(-1), "temporal_cols": temporal_cols,
+                       "static": None, "static_cols": None}
+            windows = model._normalization(windows=windows, y_idx=0)
+            insample_y, insample_mask, _, _, hist_exog, futr_exog, stat_exog = model._parse_windows(
+                {"y_idx": 0, "temporal_cols": temporal_cols}, windows
+            )
+            return model._predict_step_direct_batch(
+                insample_y=insample_y, insample_mask=insample_mask, hist_exog=hist_exog,
+                futr_exog=futr_exog, stat_exog=stat_exog, y_idx=0,
+            )
+
+    example = torch.zeros(batch_size, model.input_size + model.h, len(temporal_cols))
+    example[:, :model.input_size, -1] = 1.0
+    example[:, :model.input_size, 0] = torch.linspace(0.0, 1.0, model.input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(_Window(), example, check_trace=False)
+    # Bobot dibekukan menjadi konstanta graf: file lebih cepat dimuat dan bisa dioptimasi
+    return torch.jit.freeze(traced.eval())
+
+
+def _swap_dir(tmp_path, path):
+    # Sama seperti save_checkpoint_atomic: pembaca tidak pernah melihat folder setengah tertulis
+    old_path = None
+    if os.path.exists(path):
+        old_path = f"{path}.old-{uuid.uuid4().hex[:8]}"
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings) * 1000)
+
+
+def export_model(model_path, out_path, sample_input, quantize=False, tolerance=None, repeats=5):
+    """
+    Mengekspor satu checkpoint NeuralForecast menjadi artefak TorchScript lalu
+    memverifikasinya terhadap `NeuralForecast.predict` sebelum dipublikasikan.
+
+    Args:
+        model_path (str): Folder checkpoint NeuralForecast.
+        out_path (str): Folder artefak (ditulis atomik).
+        sample_input (pd.DataFrame): Input verifikasi (unique_id, ds, y, [x]), biasanya
+            histori terbaru dari `src.predict.prepare_sector_input`.
+        quantize (bool): True = dynamic int8 quantization pada layer Linear.
+        tolerance (float, optional): Batas galat relatif. Default `VERIFY_TOLERANCE`.
+        repeats (int): Jumlah pengulangan pengukuran latensi.
+
+    Returns:
+        dict: Hasil verifikasi dan perbandingan (galat, latensi, ukuran), juga ditulis ke
+            `export.json`.
+
+    Raises:
+        RuntimeError: Prediksi artefak di luar toleransi (artefak tidak dipublikasikan).
+    """
+    import torch
+    from neuralforecast.core import NeuralForecast
+    from src.model_registry import _model_nbytes, checkpoint_fingerprint, read_checkpoint_setting, write_checkpoint_setting
+
+    precision = "int8" if quantize else "fp32"
+    tolerance = VERIFY_TOLERANCE[precision] if tolerance is None else tolerance
+    nf = NeuralForecast.load(path=model_path)
+    model = nf.models[0]
+    model_name = type(model).__name__
+
+    batch_size = int(sample_input['unique_id'].nunique())
+
+    tmp_path = f"{out_path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp_path)
+    try:
+        torch.jit.save(_traced_module(model, quantize, batch_size), os.path.join(tmp_path, EXPORT_FILE))
+        meta = {
+            "format": FORMAT_VERSION,
+            "model": model_name,
+            "input_size": int(model.input_size),
+            "h": int(model.h),
+            "hist_exog_list": list(model.hist_exog_list),
+            "freq": "D",
+            "batch_size": batch_size,
+            "precision": precision,
+            "source_fingerprint": checkpoint_fingerprint(model_path),
+            "exported_at": pd.Timestamp.now().isoformat(),
+            "torch_version": torch.__version__,
+        }
+        with open(os.path.join(tmp_path, EXPORT_META), "w") as f:
+            json.dump(meta, f, indent=2)
+        # Metadata training ikut ke artefak agar src.predict tetap bisa menolak fitur yang tidak cocok
+        stored = read_checkpoint_setting(model_path)
+        if stored is not None:
+            write_checkpoint_setting(tmp_path, stored)
+
+        # Verifikasi artefak yang benar-benar akan dipakai (dibaca ulang dari disk)
+        exported = ExportedForecaster(tmp_path)
+        expected = nf.predict(df=sample_input)
+        expected = expected.reset_index() if "unique_id" not in expected.columns else expected
+        actual = exported.predict(sample_input)
+        merged = expected.merge(actual, on=["unique_id", "ds"], suffixes=("_nf", "_export"))
+        if len(merged) != len(expected):
+            raise RuntimeError(f"❌ Tanggal prediksi ekspor {model_name} tidak sama dengan NeuralForecast.")
+        diff = np.abs(merged[f"{model_name}_nf"].to_numpy() - merged[f"{model_name}_export"].to_numpy())
+        max_abs_err = float(diff.max())
+        rel_err = max_abs_err / (float(np.abs(merged[f"{model_name}_nf"]).max()) + 1e-12)
+
+        meta["verification"] = {
+            "max_abs_err": max_abs_err,
+            "rel_err": rel_err,
+            "tolerance": tolerance,
+            "nf_predict_ms": _median_ms(lambda: nf.predict(df=sample_input), repeats),
+            "export_predict_ms": _median_ms(lambda: exported.predict(sample_input), repeats),
+            "nf_param_mb": _model_nbytes(nf) / 2**20,
+            "export_mb": exported.nbytes / 2**20,
+        }
+        if rel_err > tolerance:
+            raise RuntimeError(
+                f"❌ Ekspor {model_name} di luar toleransi: galat relatif {rel_err:.2e} > {tolerance:.0e}."
+            )
+        with open(os.path.join(tmp_path, EXPORT_META), "w") as f:
+            json.dump(meta, f, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    _swap_dir(tmp_path, out_path)
+    return meta
+
+
+def export_all(model_save_dir, export_dir=None, data="./data/df_final_update.csv", quantize=False,
+               tolerance=None, include_global=True):
+    """
+    Mengekspor semua model sektor (dan model global bila ada) ke `export_dir`.
+
+    Args:
+        model_save_dir (str): Folder checkpoint NeuralForecast.
+        export_dir (str, optional): Folder tujuan. Default `<model_save_dir>/_export`.
+        data (str | pd.DataFrame): Data untuk input verifikasi (histori terbaru per sektor).
+        quantize (bool): Dynamic int8 quantization.
+        tolerance (float, optional): Lihat `export_model`.
+        include_global (bool): Ikut ekspor model global (`_global`) bila checkpoint-nya ada.
+
+    Returns:
+        pd.DataFrame: Satu baris per model dengan status, galat, latensi dan ukuran.
+    """
+    from src.dataset import load_frame
+    from src.model_registry import GLOBAL_MODEL_KEY, sector_dir_name
+    from src.predict import HISTORY_ROWS, SECTOR_SETTINGS, prepare_global_input, prepare_sector_input
+
+    export_dir = export_dir or default_export_dir(model_save_dir)
+    os.makedirs(export_dir, exist_ok=True)
+    df = data if isinstance(data, pd.DataFrame) else load_frame(data, sectors=[s['sector'] for s in SECTOR_SETTINGS])
+    df = df.groupby('Sector', sort=False).tail(HISTORY_ROWS)
+    inputs = {s['sector']: prepare_sector_input(df, s) for s in SECTOR_SETTINGS}
+
+    jobs = [(s['sector'], sector_dir_name(s['sector']), inputs[s['sector']]) for s in SECTOR_SETTINGS]
+    if include_global and os.path.isdir(os.path.join(model_save_dir, GLOBAL_MODEL_KEY)):
+        jobs.append((GLOBAL_MODEL_KEY, GLOBAL_MODEL_KEY, prepare_global_input(list(inputs.values()))))
+
+    rows = []
+    for key, dir_name, sample_input in jobs:
+        model_path = os.path.join(model_save_dir, dir_name)
+        if not os.path.isdir(model_path):
+            print(f"  ⚠️ Model untuk '{key}' tidak ditemukan. Melewati...")
+            continue
+        row = {'Sector': key, 'status': 'ok'}
+        try:
+            try:
+                meta = export_model(model_path, os.path.join(export_dir, dir_name), sample_input,
+                                    quantize=quantize, tolerance=tolerance)
+            except RuntimeError as e:
+                if not quantize:
+                    raise
+                # Model yang tidak tahan int8 tetap diekspor, dengan presisi penuh
+                print(f"  ⚠️ {key}: {e} Ekspor ulang tanpa quantization...")
+                meta = export_model(model_path, os.path.join(export_dir, dir_name), sample_input, tolerance=tolerance)
+                row['status'] = 'fp32_fallback'
+            row.update({'Model': meta['model'], 'precision': meta['precision'], **meta['verification']})
+            v = meta['verification']
+            print(f"  ✅ {key} [{meta['precision']}] galat {v['rel_err']:.1e} | "
+                  f"{v['nf_predict_ms']:.1f} ms -> {v['export_predict_ms']:.2f} ms | "
+                  f"{v['nf_param_mb']:.1f} MB -> {v['export_mb']:.1f} MB")
+        except Exception as e:
+            row.update({'status': 'failed', 'error': str(e)})
+            print(f"  ❌ {key} gagal diekspor: {e}")
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor model ke TorchScript untuk inferensi CPU tanpa Lightning.")
+    parser.add_argument("--model-dir", default="./saved_models/Forecast_Model")
+    parser.add_argument("--export-dir", help="Default <model-dir>/_export.")
+    parser.add_argument("--data", default="./data/df_final_update.csv", help="Data untuk verifikasi.")
+    parser.add_argument("--quantize", action="store_true", help="Dynamic int8 quantization (layer Linear).")
+    parser.add_argument("--tolerance", type=float, help="Batas galat relatif terhadap NeuralForecast.predict.")
+    args = parser.parse_args(argv)
+
+    report = export_all(args.model_dir, args.export_dir, data=args.data, quantize=args.quantize, tolerance=args.tolerance)
+    if report.empty:
+        print("❌ Tidak ada model yang diekspor.")
+        return 1
+    return 0 if (report['status'] != 'failed').all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
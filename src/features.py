@@ -0,0 +1,256 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def build_sector_index(sektor_csv_path="./data/Sector-Faktur.csv"):
+    """
+    Indeks ticker -> sektor dari Sector-Faktur.csv.
+
+    Returns:
+        dict: {ticker (tanpa '.JK'): sektor}
+    """
+    df_sektor = pd.read_csv(sektor_csv_path)
+    return pd.Series(df_sektor.Sector.values, index=df_sektor.Faktur.str.strip()).to_dict()
+
+
+def sector_metrics_pandas(combined_df, window=7):
+    """
+    Implementasi referensi berbasis groupby (dipakai untuk verifikasi dan benchmark).
+
+    Args:
+        combined_df (pd.DataFrame): Bar harian dengan kolom Date, Ticker, Sector, Close.
+        window (int): Panjang rolling volatility.
+    """
+    combined_df = combined_df.sort_values(['Ticker', 'Date']).copy()
+    combined_df['Return'] = combined_df.groupby('Ticker')['Close'].pct_change()
+    combined_df['Volatility_Individual'] = (
+        combined_df.groupby('Ticker')['Return']
+        .rolling(window=window)
+        .std()
+        .reset_index(0, drop=True)
+    )
+    sector_metrics = (
+        combined_df.groupby(['Date', 'Sector'])[['Volatility_Individual', 'Return']]
+        .median()
+        .reset_index()
+        .rename(columns={
+            'Volatility_Individual': f'SectorVolatility_{window}d',
+            'Return': 'SectorReturn_avg'
+        })
+    )
+    return sector_metrics.dropna(subset=[f'SectorVolatility_{window}d', 'SectorReturn_avg']).reset_index(drop=True)
+
+
+def _compact(values, observed):
+    # Urutkan setiap kolom sehingga baris yang ada datanya berada di atas (urutan tanggal tetap)
+    order = np.argsort(~observed, axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), order
+
+
+def _rolling_std(x, window):
+    # Strided window (n - window + 1, tickers, window); NaN di jendela -> hasil NaN, sama seperti pandas
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+        out[window - 1:] = windows.std(axis=-1, ddof=1)
+    return out
+
+
+class SectorFeatureEngine:
+    """
+    Menghitung return harian, rolling volatility per ticker dan median per sektor
+    di atas matriks harga (tanggal x ticker) NumPy.
+
+    Hasilnya sama dengan `sector_metrics_pandas` (kolom `SectorVolatility_{window}d`
+    dan `SectorReturn_avg`), termasuk perilaku untuk ticker yang tidak punya bar di
+    tanggal tertentu: return dan rolling dihitung atas urutan bar milik ticker itu sendiri.
+
+    Setelah `compute`, state terakhir (close terakhir dan `window` return terakhir per
+    ticker) disimpan sehingga hari baru bisa ditambahkan lewat `update` tanpa menghitung
+    ulang seluruh histori.
+
+    Args:
+        ticker_to_sector (dict): {ticker: sektor}, lihat `build_sector_index`.
+        window (int): Panjang rolling volatility.
+    """
+
+    def __init__(self, ticker_to_sector, window=7):
+        self.window = window
+        self.tickers = np.array(sorted(ticker_to_sector))
+        self.ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self.sectors = np.array(sorted(set(ticker_to_sector.values())))
+        sector_pos = {s: i for i, s in enumerate(self.sectors)}
+        self.sector_codes = np.array([sector_pos[ticker_to_sector[t]] for t in self.tickers])
+        self.vol_column = f'SectorVolatility_{window}d'
+        self._reset_state()
+
+    def _reset_state(self):
+        n = len(self.tickers)
+        self.last_close = np.full(n, np.nan)
+        self.return_buffer = np.full((self.window, n), np.nan)
+
+    def _sector_medians(self, values):
+        # values: (tanggal, ticker) -> (tanggal, sektor), NaN diabaikan seperti groupby().median()
+        out = np.full((values.shape[0], len(self.sectors)), np.nan)
+        rows = np.arange(values.shape[0])
+        for code in range(len(self.sectors)):
+            # np.sort menaruh NaN di akhir, jadi median = tengah dari n nilai pertama
+            block = np.sort(values[:, self.sector_codes == code], axis=1)
+            n = (~np.isnan(block)).sum(axis=1)
+            lo = block[rows, np.maximum(n - 1, 0) // 2]
+            hi = block[rows, np.minimum(n // 2, block.shape[1] - 1)]
+            out[:, code] = np.where(n > 0, (lo + hi) / 2, np.nan)
+        return out
+
+    def _to_frame(self, dates, vol, ret):
+        n_dates, n_sectors = vol.shape
+        frame = pd.DataFrame({
+            'Date': np.repeat(np.asarray(dates, dtype=object), n_sectors),
+            'Sector': np.tile(self.sectors, n_dates),
+            self.vol_column: vol.ravel(),
+            'SectorReturn_avg': ret.ravel(),
+        })
+        return frame.dropna(subset=[self.vol_column, 'SectorReturn_avg']).reset_index(drop=True)
+
+    def pivot_closes(self, combined_df):
+        """Bar long (Date, Ticker, Close) -> (daftar tanggal, matriks close tanggal x ticker)."""
+        df = combined_df[combined_df['Ticker'].isin(self.ticker_pos)]
+        date_idx, dates = pd.factorize(df['Date'], sort=True)
+        closes = np.full((len(dates), len(self.tickers)), np.nan)
+        ticker_idx = df['Ticker'].map(self.ticker_pos).to_numpy()
+        closes[date_idx, ticker_idx] = df['Close'].to_numpy(dtype=float)
+        return dates, closes
+
+    def compute(self, combined_df):
+        """
+        Menghitung metrik sektor untuk seluruh histori dan menyimpan state untuk `update`.
+
+        Args:
+            combined_df (pd.DataFrame): Bar harian dengan kolom Date, Ticker, Close.
+
+        Returns:
+            pd.DataFrame: Kolom Date, Sector, SectorVolatility_{window}d, SectorReturn_avg.
+        """
+        dates, closes = self.pivot_closes(combined_df)
+        observed = ~np.isnan(closes)
+
+        compact_close, order = _compact(closes, observed)
+        compact_ret = np.full(compact_close.shape, np.nan)
+        compact_ret[1:] = compact_close[1:] / compact_close[:-1] - 1
+        compact_vol = _rolling_std(compact_ret, self.window)
+
+        # Kembalikan dari urutan per-ticker ke grid tanggal
+        ret = np.full(closes.shape, np.nan)
+        vol = np.full(closes.shape, np.nan)
+        np.put_along_axis(ret, order, compact_ret, axis=0)
+        np.put_along_axis(vol, order, compact_vol, axis=0)
+        ret[~observed] = np.nan
+        vol[~observed] = np.nan
+
+        # State untuk update inkremental
+        self._reset_state()
+        counts = observed.sum(axis=0)
+        for j in np.flatnonzero(counts):
+            n_obs = counts[j]
+            self.last_close[j] = compact_close[n_obs - 1, j]
+            tail = compact_ret[max(0, n_obs - self.window):n_obs, j]
+            self.return_buffer[self.window - len(tail):, j] = tail
+
+        return self._to_frame(dates, self._sector_medians(vol), self._sector_medians(ret))
+
+    def update(self, date, closes):
+        """
+        Menambahkan satu hari baru tanpa menghitung ulang histori.
+
+        Args:
+            date: Tanggal bar baru.
+            closes (dict | pd.Series): {ticker: close} untuk ticker yang punya bar hari itu.
+
+        Returns:
+            pd.DataFrame: Baris metrik sektor untuk `date` (bisa kosong).
+        """
+        closes = pd.Series(closes, dtype=float).dropna()
+        closes = closes[closes.index.isin(self.ticker_pos)]
+        idx = np.array([self.ticker_pos[t] for t in closes.index], dtype=int)
+        values = closes.to_numpy()
+
+        ret = np.full(len(self.tickers), np.nan)
+        vol = np.full(len(self.tickers), np.nan)
+        ret[idx] = values / self.last_close[idx] - 1
+
+        self.return_buffer[:, idx] = np.roll(self.return_buffer[:, idx], -1, axis=0)
+        self.return_buffer[-1, idx] = ret[idx]
+        vol[idx] = self.return_buffer[:, idx].std(axis=0, ddof=1)
+        self.last_close[idx] = values
+
+        return self._to_frame([date], self._sector_medians(vol[None, :]), self._sector_medians(ret[None, :]))
+
+
+def compute_sector_metrics(combined_df, window=7, ticker_to_sector=None):
+    """
+    Versi vektorisasi dari perhitungan sektor di `get_processed_stock_data`.
+
+    Args:
+        combined_df (pd.DataFrame): Bar harian dengan kolom Date, Ticker, Sector, Close.
+        window (int): Panjang rolling volatility.
+        ticker_to_sector (dict, optional): Default diambil dari kolom Sector di `combined_df`.
+    """
+    if ticker_to_sector is None:
+        ticker_to_sector = combined_df.drop_duplicates('Ticker').set_index('Ticker')['Sector'].to_dict()
+    return SectorFeatureEngine(ticker_to_sector, window=window).compute(combined_df)
+
+
+def _synthetic_prices(n_days=2800, sektor_csv_path="./data/Sector-Faktur.csv", missing_rate=0.03, seed=0):
+    rng = np.random.default_rng(seed)
+    ticker_to_sector = build_sector_index(sektor_csv_path)
+    dates = pd.bdate_range('2015-01-01', periods=n_days).date
+    frames = []
+    for ticker, sector in ticker_to_sector.items():
+        close = np.round(1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days))), 2)
+        keep = rng.random(n_days) > missing_rate
+        frames.append(pd.DataFrame({'Date': dates[keep], 'Ticker': ticker, 'Sector': sector, 'Close': close[keep]}))
+    return pd.concat(frames, ignore_index=True), ticker_to_sector
+
+
+def benchmark_feature_engine(n_days=2800, window=7, repeats=3):
+    """
+    Membandingkan `sector_metrics_pandas` dengan `SectorFeatureEngine` pada data sintetis
+    (165 ticker dari Sector-Faktur.csv, ~3% bar hilang acak).
+
+    Returns:
+        dict: waktu terbaik (detik) tiap implementasi, speedup dan selisih maksimum.
+    """
+    prices, ticker_to_sector = _synthetic_prices(n_days)
+
+    def best_of(fn):
+        best, result = float('inf'), None
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
+
+    t_pandas, expected = best_of(lambda: sector_metrics_pandas(prices, window))
+    t_numpy, actual = best_of(lambda: compute_sector_metrics(prices, window, ticker_to_sector))
+
+    vol_col = f'SectorVolatility_{window}d'
+    assert expected[['Date', 'Sector']].equals(actual[['Date', 'Sector']]), "Urutan/isi baris berbeda"
+    max_diff = float(max(
+        np.abs(expected[vol_col].to_numpy() - actual[vol_col].to_numpy()).max(),
+        np.abs(expected['SectorReturn_avg'].to_numpy() - actual['SectorReturn_avg'].to_numpy()).max(),
+    ))
+    return {
+        'rows': len(prices),
+        'pandas_s': t_pandas,
+        'numpy_s': t_numpy,
+        'speedup': t_pandas / t_numpy,
+        'max_abs_diff': max_diff,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_feature_engine()
+    print(f"📊 {result['rows']} bar | pandas {result['pandas_s']:.3f}s | numpy {result['numpy_s']:.3f}s "
+          f"| speedup {result['speedup']:.1f}x | selisih maks {result['max_abs_diff']:.2e}")
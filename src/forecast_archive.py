@@ -0,0 +1,503 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import get_logger
+
+logger = get_logger("archive")
+
+FORMAT_VERSION = "fcarchive-v1"
+DEFAULT_ARCHIVE = "./data/forecast_archive"
+ACCURACY_FILE = "accuracy.json"
+# Jendela (hari tanggal target) ringkasan akurasi yang ditulis setiap kali actual baru masuk
+ACCURACY_WINDOWS = (7, 30)
+VALUE_COLUMN = "SectorVolatility_7d"
+
+# Skema kolom per tabel. category = kode int32 + label di meta segmen, date = int32 hari sejak 1970-01-01
+FORECAST_SCHEMA = {
+    "run_id": "category",
+    "run_ts": "float64",
+    "Sector": "category",
+    "as_of": "date",
+    "target": "date",
+    "step": "int16",
+    "forecast": "float32",
+    "model_version": "category",
+    "input_fingerprint": "category",
+    "mode": "category",
+}
+ERROR_SCHEMA = {
+    "run_id": "category",
+    "run_ts": "float64",
+    "Sector": "category",
+    "as_of": "date",
+    "target": "date",
+    "step": "int16",
+    "forecast": "float32",
+    "actual": "float32",
+    "scored_at": "float64",
+}
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+_DAY_BITS = 16  # tanggal (hari sejak 1970) muat di 16 bit sampai tahun 2149
+
+
+def _to_days(values):
+    return (pd.to_datetime(values).to_numpy().astype("datetime64[D]") - _EPOCH).astype(np.int32)
+
+
+def _to_dates(days):
+    return (_EPOCH + np.asarray(days).astype("timedelta64[D]")).astype("datetime64[ns]")
+
+
+def _day(value):
+    return None if value is None else int(_to_days([value])[0])
+
+
+def _write_segment(table_dir, frame, schema, **meta):
+    """
+    Menulis satu segmen immutable: satu `.npy` per kolom plus `meta.json`.
+
+    Segmen ditulis ke folder tersembunyi lalu di-rename, jadi pembaca tidak pernah
+    melihat segmen setengah tertulis. Nama segmen berawalan waktu (ns) sehingga urutan
+    nama = urutan tulis.
+
+    Returns:
+        str: Nama segmen.
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+    tmp_path = os.path.join(table_dir, f".{name}.tmp")
+    os.makedirs(tmp_path)
+
+    categories = {}
+    for col, kind in schema.items():
+        if kind == "category":
+            codes, uniques = pd.factorize(frame[col].astype(str))
+            values = codes.astype(np.int32)
+            categories[col] = [str(u) for u in uniques]
+        elif kind == "date":
+            values = _to_days(frame[col])
+        else:
+            values = frame[col].to_numpy(dtype=kind)
+        np.save(os.path.join(tmp_path, f"{col}.npy"), values)
+
+    meta = {"format": FORMAT_VERSION, "rows": len(frame), "categories": categories,
+            "created_at": time.time(), **meta}
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    os.rename(tmp_path, os.path.join(table_dir, name))
+    return name
+
+
+class _Table:
+    """
+    Tabel append-only dari segmen-segmen `_write_segment`, dengan indeks terurut
+    (Sector, as_of, target, `order`) di memori.
+
+    Segmen baru dimuat secara inkremental saat `refresh`; segmen hasil `compact` menandai
+    segmen yang digantikannya (`replaces` di meta) sehingga tidak terbaca dua kali.
+    """
+
+    def __init__(self, path, schema, order):
+        self.path = path
+        self.schema = schema
+        self.order = order
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.loaded = []
+        self.metas = {}
+        self.labels = {col: [] for col, kind in self.schema.items() if kind == "category"}
+        self._label_codes = {col: {} for col in self.labels}
+        self.columns = {col: np.empty(0, dtype=np.int32 if kind in ("category", "date") else kind)
+                        for col, kind in self.schema.items()}
+        self.key = np.empty(0, dtype=np.int64)
+
+    def _meta(self, name):
+        if name not in self.metas:
+            with open(os.path.join(self.path, name, "meta.json")) as f:
+                self.metas[name] = json.load(f)
+        return self.metas[name]
+
+    def _live_segments(self):
+        if not os.path.isdir(self.path):
+            return []
+        names = sorted(n for n in os.listdir(self.path) if not n.startswith("."))
+        replaced = {old for n in names for old in self._meta(n).get("replaces", [])}
+        return [n for n in names if n not in replaced]
+
+    def _global_codes(self, col, labels):
+        mapping = self._label_codes[col]
+        for label in labels:
+            if label not in mapping:
+                mapping[label] = len(self.labels[col])
+                self.labels[col].append(label)
+        return np.array([mapping[label] for label in labels], dtype=np.int32)
+
+    def refresh(self):
+        """Memuat segmen baru (atau ulang semuanya setelah compaction). Returns: jumlah baris."""
+        with self._lock:
+            try:
+                return self._load_new()
+            except FileNotFoundError:
+                # Segmen dihapus oleh compaction proses lain di tengah pembacaan: muat ulang
+                self._reset()
+                return self._load_new()
+
+    def _load_new(self):
+        live = self._live_segments()
+        if live[:len(self.loaded)] != self.loaded:
+            self._reset()
+        new = live[len(self.loaded):]
+        if not new:
+            return len(self.key)
+
+        parts = {col: [self.columns[col]] for col in self.schema}
+        for name in new:
+            meta = self._meta(name)
+            if meta.get("format") != FORMAT_VERSION:
+                raise ValueError(f"Format segmen arsip tidak dikenal di {name}: {meta.get('format')}")
+            for col, kind in self.schema.items():
+                values = np.load(os.path.join(self.path, name, f"{col}.npy"))
+                if kind == "category":
+                    values = self._global_codes(col, meta["categories"][col])[values]
+                parts[col].append(values)
+        columns = {col: np.concatenate(values) for col, values in parts.items()}
+
+        key = ((columns["Sector"].astype(np.int64) << (2 * _DAY_BITS))
+               | (columns["as_of"].astype(np.int64) << _DAY_BITS)
+               | columns["target"].astype(np.int64))
+        sort = np.lexsort((columns[self.order], key))
+        self.columns = {col: values[sort] for col, values in columns.items()}
+        self.key = key[sort]
+        self.loaded = live
+        return len(self.key)
+
+    def sector_codes(self, sectors):
+        if sectors is None:
+            return list(range(len(self.labels["Sector"])))
+        return [self._label_codes["Sector"][s] for s in sectors if s in self._label_codes["Sector"]]
+
+    def slice(self, sector, as_of_start=None, as_of_end=None):
+        """Rentang baris satu sektor (kode) dengan as_of di [as_of_start, as_of_end]."""
+        base = np.int64(sector) << (2 * _DAY_BITS)
+        lo = base | (np.int64(as_of_start or 0) << _DAY_BITS)
+        hi = base | (np.int64((1 << _DAY_BITS) - 1 if as_of_end is None else as_of_end) << _DAY_BITS) | ((1 << _DAY_BITS) - 1)
+        return int(np.searchsorted(self.key, lo)), int(np.searchsorted(self.key, hi, side="right"))
+
+    def frame(self, idx):
+        """Baris `idx` sebagai DataFrame (label kategori dan tanggal sudah didekode)."""
+        data = {}
+        for col, kind in self.schema.items():
+            values = self.columns[col][idx]
+            if kind == "category":
+                data[col] = np.asarray(self.labels[col], dtype=object)[values] if len(values) else np.array([], dtype=object)
+            elif kind == "date":
+                data[col] = _to_dates(values)
+            else:
+                data[col] = values
+        return pd.DataFrame(data)
+
+
+def _latest_only(idx, key):
+    # Baris terurut (kunci, run): baris terakhir tiap kunci = run terbaru untuk (sektor, as_of, target)
+    if len(idx) == 0:
+        return idx
+    keys = key[idx]
+    return idx[np.append(keys[1:] != keys[:-1], True)]
+
+
+def summary_records(summary):
+    # NaN (mis. MAPE tanpa actual positif) -> null agar JSON tetap standar
+    summary = summary.round(6).astype(object)
+    return summary.where(summary.notna(), None).to_dict(orient="records")
+
+
+class ForecastArchive:
+    """
+    Arsip prediksi append-only berbasis kolom (`.npy` per kolom per segmen, satu segmen
+    per run) dengan indeks (Sector, as_of, target).
+
+    - `forecasts/`: prediksi setiap run beserta waktu run, versi model (sidik jari
+      checkpoint) dan sidik jari input.
+    - `errors/`: pasangan prediksi vs actual, ditambahkan oleh `record_actuals` setiap
+      kali data baru di-ingest.
+    - `accuracy.json`: ringkasan akurasi rolling terbaru untuk dashboard dan monitoring.
+
+    Data tidak pernah diubah; `compact` hanya menggabungkan segmen.
+
+    Args:
+        root (str): Folder arsip.
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE):
+        self.root = root
+        self.forecasts = _Table(os.path.join(root, "forecasts"), FORECAST_SCHEMA, order="run_ts")
+        self.errors = _Table(os.path.join(root, "errors"), ERROR_SCHEMA, order="run_ts")
+        self._write_lock = threading.Lock()
+
+    def append_run(self, predictions_df, run_id=None, run_ts=None, provenance=None, mode=None):
+        """
+        Menyimpan prediksi satu run sebagai segmen baru.
+
+        Args:
+            predictions_df (pd.DataFrame): Kolom Date, Sector, SectorVolatility_7d.
+            run_id (str, optional): Default UUID baru.
+            run_ts (float, optional): Waktu run (epoch detik). Default sekarang.
+            provenance (dict, optional): {sektor: {model_version, input_fingerprint, as_of}},
+                lihat `attrs['provenance']` hasil `generate_all_predictions`. Default
+                `predictions_df.attrs`. Tanpa as_of, as_of = sehari sebelum target pertama.
+            mode (str, optional): Mode prediksi (per_sector/global).
+
+        Returns:
+            dict: run_id dan rows.
+        """
+        run_id = run_id or uuid.uuid4().hex
+        run_ts = time.time() if run_ts is None else run_ts
+        provenance = predictions_df.attrs.get("provenance", {}) if provenance is None else provenance
+        mode = mode or predictions_df.attrs.get("mode")
+
+        frame = predictions_df[["Date", "Sector", VALUE_COLUMN]].rename(columns={"Date": "target", VALUE_COLUMN: "forecast"})
+        frame = frame.assign(target=pd.to_datetime(frame["target"]).dt.normalize())
+        frame = frame.sort_values(["Sector", "target"], kind="stable").reset_index(drop=True)
+        info = frame["Sector"].map(lambda s: provenance.get(s) or {})
+        first_target = frame.groupby("Sector")["target"].transform("min")
+        as_of = pd.to_datetime(info.map(lambda p: p.get("as_of")), errors="coerce")
+        frame["as_of"] = as_of.dt.normalize().fillna(first_target - pd.Timedelta(days=1))
+        frame["step"] = frame.groupby("Sector").cumcount() + 1
+        frame["model_version"] = info.map(lambda p: p.get("model_version") or "")
+        frame["input_fingerprint"] = info.map(lambda p: p.get("input_fingerprint") or "")
+        frame["run_id"], frame["run_ts"], frame["mode"] = run_id, float(run_ts), mode or ""
+
+        with self._write_lock:
+            _write_segment(self.forecasts.path, frame, FORECAST_SCHEMA, run_id=run_id, run_ts=run_ts)
+        return {"run_id": run_id, "rows": len(frame)}
+
+    def query(self, sectors=None, as_of_start=None, as_of_end=None, target_start=None, target_end=None, latest=True):
+        """
+        Query rentang lewat indeks (Sector, as_of, target).
+
+        Args:
+            sectors (list[str], optional): Default semua sektor.
+            as_of_start, as_of_end (date-like, optional): Rentang tanggal data terakhir saat
+                prediksi dibuat (inklusif).
+            target_start, target_end (date-like, optional): Rentang tanggal yang diprediksi (inklusif).
+            latest (bool): True = hanya run terbaru per (Sector, as_of, target).
+
+        Returns:
+            pd.DataFrame: Kolom FORECAST_SCHEMA, diurutkan per (Sector, as_of, target).
+        """
+        table = self.forecasts
+        table.refresh()
+        a0, a1, t0, t1 = _day(as_of_start), _day(as_of_end), _day(target_start), _day(target_end)
+        idx = [np.arange(*table.slice(code, a0, a1)) for code in table.sector_codes(sectors)]
+        idx = np.concatenate(idx) if idx else np.array([], dtype=np.int64)
+        if t0 is not None or t1 is not None:
+            target = table.columns["target"][idx]
+            idx = idx[(target >= (t0 if t0 is not None else 0)) & (target <= (t1 if t1 is not None else np.iinfo(np.int32).max))]
+        if latest:
+            idx = _latest_only(idx, table.key)
+        return table.frame(idx)
+
+    def as_of(self, date, sectors=None):
+        """
+        Prediksi yang berlaku pada `date` ("apa prediksi kita Selasa lalu"): per sektor,
+        run terbaru dengan as_of <= date.
+
+        Returns:
+            pd.DataFrame: Kolom FORECAST_SCHEMA, satu run per sektor.
+        """
+        table = self.forecasts
+        table.refresh()
+        day = _day(date)
+        idx = []
+        for code in table.sector_codes(sectors):
+            lo, hi = table.slice(code, None, day)
+            if hi == lo:
+                continue
+            start, _ = table.slice(code, table.columns["as_of"][hi - 1], table.columns["as_of"][hi - 1])
+            run_ts = table.columns["run_ts"][start:hi]
+            idx.append(np.arange(start, hi)[run_ts == run_ts.max()])
+        return table.frame(np.concatenate(idx) if idx else np.array([], dtype=np.int64))
+
+    def record_actuals(self, actuals_df, value_col=VALUE_COLUMN):
+        """
+        Menggabungkan actual yang baru di-ingest dengan prediksi arsip yang targetnya
+        sudah terjadi dan belum pernah dinilai, menambahkannya ke tabel `errors`, lalu
+        memperbarui `accuracy.json`.
+
+        Args:
+            actuals_df (pd.DataFrame): Kolom Date, Sector dan `value_col`.
+
+        Returns:
+            int: Jumlah pasangan prediksi-actual baru.
+        """
+        actuals = actuals_df[["Date", "Sector", value_col]].dropna()
+        if actuals.empty:
+            return 0
+        actuals = pd.DataFrame({
+            "Sector": actuals["Sector"].astype(str).to_numpy(),
+            "target": _to_dates(_to_days(actuals["Date"])),
+            "actual": actuals[value_col].to_numpy(dtype=np.float32),
+        }).drop_duplicates(["Sector", "target"], keep="last")
+
+        with self._write_lock:
+            candidates = self.query(sectors=list(actuals["Sector"].unique()),
+                                    target_start=actuals["target"].min(), target_end=actuals["target"].max(),
+                                    latest=False)
+            if candidates.empty:
+                return 0
+            self.errors.refresh()
+            scored = self.errors.frame(np.arange(len(self.errors.key)))[["run_id", "Sector", "target"]]
+            candidates = candidates.merge(scored, on=["run_id", "Sector", "target"], how="left", indicator=True)
+            candidates = candidates[candidates["_merge"] == "left_only"].drop(columns="_merge")
+            joined = candidates.merge(actuals, on=["Sector", "target"], how="inner")
+            if joined.empty:
+                return 0
+            joined["scored_at"] = time.time()
+            _write_segment(self.errors.path, joined, ERROR_SCHEMA)
+            self._write_accuracy_snapshot()
+        logger.info(f"🎯 {len(joined)} prediksi arsip dinilai terhadap actual baru.")
+        return len(joined)
+
+    def rolling_accuracy(self, window=30, by=("Sector", "step"), end=None):
+        """
+        Akurasi rolling dari tabel `errors` (tanpa menjalankan model ulang): prediksi
+        dengan tanggal target di (end - window hari, end], run terbaru per
+        (Sector, as_of, target).
+
+        Args:
+            window (int): Panjang jendela (hari kalender tanggal target).
+            by (tuple): Kolom pengelompokan, mis. ('Sector',) atau ('Sector', 'step').
+            end (date-like, optional): Default tanggal target terakhir yang sudah dinilai.
+
+        Returns:
+            pd.DataFrame: Kolom `by` + n, mae, rmse, mape, bias (forecast - actual).
+        """
+        table = self.errors
+        table.refresh()
+        columns = list(by) + ["n", "mae", "rmse", "mape", "bias"]
+        if not len(table.key):
+            return pd.DataFrame(columns=columns)
+        end = int(table.columns["target"].max()) if end is None else _day(end)
+        target = table.columns["target"]
+        idx = _latest_only(np.flatnonzero((target > end - window) & (target <= end)), table.key)
+        errors = table.frame(idx)
+        if errors.empty:
+            return pd.DataFrame(columns=columns)
+
+        err = errors["forecast"].astype(np.float64) - errors["actual"].astype(np.float64)
+        actual = errors["actual"].astype(np.float64).abs()
+        errors = errors.assign(err=err, abs_err=err.abs(), sq_err=err ** 2,
+                               pct_err=(err.abs() / actual).where(actual > 0))
+        summary = errors.groupby(list(by)).agg(
+            n=("err", "size"), mae=("abs_err", "mean"), rmse=("sq_err", "mean"),
+            mape=("pct_err", "mean"), bias=("err", "mean"),
+        ).reset_index()
+        summary["rmse"] = np.sqrt(summary["rmse"])
+        return summary[columns]
+
+    def _write_accuracy_snapshot(self):
+        self.errors.refresh()
+        last = int(self.errors.columns["target"].max())
+        snapshot = {"updated_at": time.time(), "last_target": str(_to_dates([last])[0].astype("datetime64[D]")), "windows": {}}
+        for window in ACCURACY_WINDOWS:
+            snapshot["windows"][str(window)] = {
+                "by_sector": summary_records(self.rolling_accuracy(window, by=("Sector",))),
+                "by_sector_step": summary_records(self.rolling_accuracy(window, by=("Sector", "step"))),
+            }
+        path = os.path.join(self.root, ACCURACY_FILE)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def accuracy(self):
+        """Ringkasan akurasi rolling terakhir (`accuracy.json`), atau None bila belum ada actual yang dinilai."""
+        path = os.path.join(self.root, ACCURACY_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def runs(self, limit=20):
+        """Run terbaru: run_id, run_ts, mode, jumlah sektor dan baris."""
+        table = self.forecasts
+        table.refresh()
+        frame = table.frame(np.arange(len(table.key)))
+        if frame.empty:
+            return frame
+        runs = frame.groupby(["run_id", "run_ts", "mode"]).agg(sectors=("Sector", "nunique"), rows=("Sector", "size"))
+        return runs.reset_index().sort_values("run_ts", ascending=False).head(limit).reset_index(drop=True)
+
+    def compact(self):
+        """
+        Menggabungkan semua segmen `forecasts` dan `errors` menjadi satu segmen per tabel
+        (isi tidak berubah). Segmen lama dihapus setelah segmen gabungan terpasang.
+        """
+        for table in (self.forecasts, self.errors):
+            with self._write_lock:
+                table.refresh()
+                old = list(table.loaded)
+                if len(old) < 2:
+                    continue
+                _write_segment(table.path, table.frame(np.arange(len(table.key))), table.schema, replaces=old)
+                for name in old:
+                    shutil.rmtree(os.path.join(table.path, name), ignore_errors=True)
+
+
+_open_lock = threading.Lock()
+_open_archives = {}
+
+
+def open_archive(root=DEFAULT_ARCHIVE):
+    """Arsip bersama per proses (indeks di memori dipakai ulang antar query)."""
+    key = os.path.abspath(root)
+    with _open_lock:
+        if key not in _open_archives:
+            _open_archives[key] = ForecastArchive(root)
+        return _open_archives[key]
+
+
+def archive_run(root, data, predictions_df, run_id=None, mode=None):
+    """
+    Langkah arsip pipeline prediksi: simpan prediksi run ini, lalu nilai prediksi
+    lama terhadap actual dari data yang baru di-ingest.
+
+    Returns:
+        dict: run_id, rows dan scored.
+    """
+    archive = open_archive(root)
+    result = archive.append_run(predictions_df, run_id=run_id, mode=mode)
+    result["scored"] = archive.record_actuals(data) if data is not None else 0
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Arsip prediksi: ringkasan run, akurasi dan penilaian actual.")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE)
+    parser.add_argument("--actuals", help="CSV/dataset biner berisi actual (Date, Sector, SectorVolatility_7d) untuk dinilai")
+    parser.add_argument("--compact", action="store_true", help="Gabungkan segmen")
+    args = parser.parse_args()
+
+    archive = open_archive(args.archive)
+    if args.actuals:
+        from src.dataset import load_frame
+        print(f"🎯 {archive.record_actuals(load_frame(args.actuals, columns=[VALUE_COLUMN]))} prediksi baru dinilai.")
+    if args.compact:
+        archive.compact()
+        print("🗜️ Segmen arsip digabung.")
+    print(archive.runs().to_string(index=False))
+    for window in ACCURACY_WINDOWS:
+        print(f"\n📏 Akurasi {window} hari terakhir:")
+        print(archive.rolling_accuracy(window, by=("Sector",)).to_string(index=False))
@@ -0,0 +1,108 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.metrics import count
+
+
+def input_fingerprint(historical_df, input_size, columns=('ds', 'y', 'x')):
+    """
+    Hash dari jendela input terakhir yang benar-benar dibaca model.
+
+    Args:
+        historical_df (pd.DataFrame): Input sektor hasil `prepare_sector_input`.
+        input_size (int): Jumlah baris terakhir yang dipakai model.
+        columns (tuple): Kolom yang ikut di-hash (kolom yang tidak ada dilewati).
+
+    Returns:
+        str: Hex digest SHA-1.
+    """
+    window = historical_df[[c for c in columns if c in historical_df.columns]].tail(input_size)
+    digest = hashlib.sha1()
+    digest.update(",".join(window.columns).encode())
+    digest.update(pd.util.hash_pandas_object(window, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def forecast_key(checkpoint_fp, input_fp, horizon):
+    """Kunci cache: checkpoint model + jendela input + horizon."""
+    return f"{checkpoint_fp}:{input_fp}:{horizon}"
+
+
+class ForecastCache:
+    """
+    Cache LRU + TTL untuk DataFrame prediksi per sektor.
+
+    Args:
+        max_entries (int): Jumlah entri maksimum sebelum entri paling lama tidak dipakai dibuang.
+        ttl_seconds (float): Umur maksimum entri (detik).
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Salinan prediksi untuk `key`, atau None jika tidak ada/kedaluwarsa."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._data[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+        count("idx_forecast_cache_requests_total", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1].copy()
+
+    def put(self, key, df):
+        with self._lock:
+            self._data[key] = (time.time(), df.copy())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: entries, hits, misses, evictions dan hit_rate.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_forecast_cache():
+    """Cache prediksi bersama untuk satu proses."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ForecastCache()
+        return _shared_cache
@@ -1,30 +1,69 @@
-import pandas as pd
-import yfinance as yf
-import time
-import warnings
 import os
+import warnings
 from datetime import datetime, timedelta
 
+import pandas as pd
+
+from src.metrics import count, get_logger, span
+
 warnings.filterwarnings("ignore")
 
-import os
-import time
-import pandas as pd
-from datetime import datetime, timedelta
-import yfinance as yf
-from tqdm import tqdm
+logger = get_logger("get_data")
+
+def _normalize_history(hist, ticker_clean, sector):
+    """Merapikan histori mentah dari fetcher ke format kolom standar."""
+    df = hist.reset_index() if 'Date' not in hist.columns else hist.copy()
+    df['Ticker'] = ticker_clean
+    df['Sector'] = sector
+    df['Date'] = pd.to_datetime(df['Date']).dt.date
+
+    df = df[['Date', 'Ticker', 'Sector', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    df[['Open', 'High', 'Low', 'Close']] = df[['Open', 'High', 'Low', 'Close']].round(2)
+    df['Volume'] = df['Volume'].astype('int64')
+    return df
+
 
 def get_processed_stock_data(
     window=7,
     lookback_days=70,
     delay=0,
     sektor_csv_path="./data/Sector-Faktur.csv",
-    full_data=False
+    full_data=False,
+    store_path="./data/market_store.sqlite",
+    fetcher=None,
+    max_workers=8,
+    timeout=30,
+    max_retries=3,
+    rate_limit=None,
+    end_date=None,
+    on_event=None,
 ):
     """
     Mengambil dan memproses data saham berdasarkan Sector-Faktur.csv
     Return: DataFrame dengan return harian + rolling sektor volatility & avg return
+
+    Args:
+        store_path (str | None): Lokasi store SQLite lokal. Jika diisi, hanya tanggal
+            yang belum tersimpan yang diunduh. None = selalu unduh penuh.
+        fetcher (callable, optional): fungsi `(ticker_jk, start_date, end_date) -> DataFrame`.
+            Default `yfinance_fetcher`; bisa diganti stand-in lokal untuk pengujian.
+        max_workers (int): Jumlah ticker yang diunduh bersamaan.
+        timeout (float): Batas waktu per request (detik).
+        max_retries (int): Jumlah retry (exponential backoff) per ticker.
+        rate_limit (float, optional): Maksimum request per detik. Jika None dan
+            `delay` > 0, dipakai 1 / delay.
+        end_date (date, optional): Tanggal akhir data. Default hari ini (diisi saat replay fixture).
+        on_event (callable, optional): Menerima event progress (tahap `features`).
+
+    Laporan unduhan per ticker tersedia di `result.attrs['download_report']`.
     """
+    from src.downloader import download_tickers
+    from src.features import compute_sector_metrics
+    from src.market_store import MarketDataStore, yfinance_fetcher
+
+    if fetcher is None:
+        fetcher = yfinance_fetcher
+
     # --- STEP 1: Load ticker-sektor mapping
     if not os.path.exists(sektor_csv_path):
         raise FileNotFoundError(f"❌ File '{sektor_csv_path}' tidak ditemukan.")
@@ -37,123 +76,128 @@ def get_processed_stock_data(
     tickers = [f"{ticker}.JK" for ticker in ticker_to_sector.keys()]
 
     # --- STEP 2: Tentukan tanggal mulai & akhir
-    end_date = datetime.today().date()
+    end_date = pd.to_datetime(end_date).date() if end_date is not None else datetime.today().date()
     if full_data:
         # start from 2015-01-01
         start_date = datetime(2015, 1, 1).date()
     else:
         start_date = end_date - timedelta(days=lookback_days)
 
-    # --- STEP 3: Download per ticker dengan loading bar
-    successful_data = []
-    
-    print()
-    print("🚀 Memulai pengambilan data saham...")
-    print("=" * 50)
-    
-    with tqdm(total=len(tickers), desc="📥 Collecting data", 
-              bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]") as pbar:
-        
-        for ticker_jk in tickers:
-            ticker_clean = ticker_jk.replace('.JK', '')
-            sector = ticker_to_sector.get(ticker_clean, 'Unknown')
-
-            try:
-                stock = yf.Ticker(ticker_jk)
-                hist = stock.history(start=start_date, end=end_date)
+    # Tentukan rentang yang perlu diunduh per ticker (hanya yang belum ada di store)
+    store = MarketDataStore(store_path) if store_path else None
+    coverage = store.coverage() if store else {}
+    fetch_tasks = []
+    for ticker_jk in tickers:
+        ticker_clean = ticker_jk.replace('.JK', '')
+        if store:
+            ranges = store.missing_ranges(ticker_clean, start_date, end_date, coverage=coverage)
+        else:
+            ranges = [(start_date, end_date)]
+        fetch_tasks.extend((ticker_jk, s, e) for s, e in ranges)
+
+    # --- STEP 3: Download paralel (worker terbatas, timeout, retry, rate limit)
+    logger.info(f"🚀 Memulai pengambilan data saham: {len(fetch_tasks)} rentang untuk {len(tickers)} ticker")
+
+    # `delay` lama (jeda antar request) diterjemahkan menjadi rate limit global
+    if rate_limit is None and delay:
+        rate_limit = 1.0 / delay
+
+    with span("ingest", stage="stocks_fetch"):
+        results, download_report = download_tickers(
+            fetch_tasks,
+            fetcher,
+            max_workers=max_workers,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit,
+        )
 
-                if hist.empty:
-                    pbar.set_postfix_str(f"❌ {ticker_jk} - No data")
-                    pbar.update(1)
-                    continue
-
-                df = hist.reset_index()
-                df['Ticker'] = ticker_clean
-                df['Sector'] = sector
-                df['Date'] = pd.to_datetime(df['Date']).dt.date
-
-                df = df[['Date', 'Ticker', 'Sector', 'Open', 'High', 'Low', 'Close', 'Volume']]
-                df[['Open', 'High', 'Low', 'Close']] = df[['Open', 'High', 'Low', 'Close']].round(2)
-                df['Volume'] = df['Volume'].astype('int64')
-
-                successful_data.append(df)
-                pbar.set_postfix_str(f"✅ {ticker_jk} - {len(df)} records")
-
-            except Exception as e:
-                pbar.set_postfix_str(f"❌ {ticker_jk} - {e}")
-            
-            pbar.update(1)
-            time.sleep(delay)
+    successful_data = []
+    for i, ((ticker_jk, task_start, task_end), hist) in enumerate(zip(fetch_tasks, results)):
+        ticker_clean = ticker_jk.replace('.JK', '')
+        sector = ticker_to_sector.get(ticker_clean, 'Unknown')
+        try:
+            df = _normalize_history(hist, ticker_clean, sector) if hist is not None else None
+        except Exception as e:
+            # Satu frame yang rusak hanya menggugurkan ticker tersebut, bukan seluruh ingest
+            logger.warning(f"⚠️ Data {ticker_clean} tidak valid, dilewati: {e}")
+            download_report.loc[i, ['status', 'error']] = ['failed', str(e)]
+            continue
+        status = download_report.at[i, 'status']
+
+        # Store memutuskan sendiri seberapa jauh respons kosong boleh dipercaya (bisa jadi
+        # rate limit); rentang yang gagal tidak dicatat supaya dicoba lagi pada refresh berikutnya
+        if store and status in ('ok', 'empty'):
+            store.append(ticker_clean, df, task_start, task_end)
+        if df is not None:
+            successful_data.append(df)
+
+    for status, n in download_report['status'].value_counts().items():
+        count("idx_tickers_fetched_total", int(n), status=status)
+
+    failed = download_report[~download_report['status'].isin(['ok', 'empty'])]
+    if not failed.empty:
+        logger.warning(f"⚠️ {len(failed)} rentang gagal diunduh: {', '.join(failed['Ticker'].head(10))}")
+
+    if store:
+        # Gabungkan bar lama dari store dengan bar yang baru diunduh
+        stored = store.load(
+            tickers=[t.replace('.JK', '') for t in tickers],
+            start_date=start_date,
+            end_date=end_date,
+        )
+        successful_data = [stored] if not stored.empty else []
 
-    
     if not successful_data:
         raise ValueError("❌ Tidak ada data saham yang berhasil diunduh.")
 
-    # --- STEP 4: Gabungkan dan hitung return harian
-    combined_df = pd.concat(successful_data, ignore_index=True)
-    combined_df.sort_values(['Ticker', 'Date'], inplace=True)
-    combined_df['Return'] = combined_df.groupby('Ticker')['Close'].pct_change()
-
-    # --- STEP 5: Rolling volatility individual
-    combined_df['Volatility_Individual'] = (
-        combined_df.groupby('Ticker')['Return']
-        .rolling(window=window)
-        .std()
-        .reset_index(0, drop=True)
-    )
-
-    # --- STEP 6: Hitung sektor median volatility & avg return harian
-    sector_metrics = (
-        combined_df.groupby(['Date', 'Sector'])[['Volatility_Individual', 'Return']]
-        .median()
-        .reset_index()
-        .rename(columns={
-            'Volatility_Individual': f'SectorVolatility_{window}d',
-            'Return': 'SectorReturn_avg'
-        })
+    # --- STEP 4-6: Return harian, rolling volatility individual, median sektor
+    # (vektorisasi di atas matriks tanggal x ticker, lihat src/features.py)
+    if on_event:
+        on_event({"type": "progress", "stage": "features", "message": "Menghitung fitur sektor..."})
+    with span("ingest", stage="features"):
+        combined_df = pd.concat(successful_data, ignore_index=True)
+        sector_metrics = compute_sector_metrics(combined_df, window=window, ticker_to_sector=ticker_to_sector)
+
+    logger.info(
+        f"✅ Selesai! {combined_df['Ticker'].nunique()} saham berhasil diproses | "
+        f"{sector_metrics['Date'].min()} s/d {sector_metrics['Date'].max()} | {len(sector_metrics)} records"
     )
+    sector_metrics = sector_metrics.reset_index(drop=True)
+    sector_metrics.attrs['download_report'] = download_report
+    return sector_metrics
 
-    # drop NaN values
-    sector_metrics = sector_metrics.dropna(subset=[f'SectorVolatility_{window}d', 'SectorReturn_avg'])
-
-    print(f"✅ Selesai! {len(successful_data)} saham berhasil diproses")
-    print(f"📅 Dari: {sector_metrics['Date'].min()}")
-    print(f"📅 Sampai: {sector_metrics['Date'].max()}")
-    print(f"📊 Total records: {len(sector_metrics)}")
-    print("=" * 50)
-    print()
-    return sector_metrics.reset_index(drop=True)
-
-def download_gpr_data(lookback_days=70, full_data=False):
+def download_gpr_data(lookback_days=70, full_data=False, offline=False, cache_dir="./data/gpr_cache", ttl_seconds=3600,
+                      end_date=None, gpr_loader=None):
     """
     Mendownload dan memproses data GPR harian dari Matteo Iacoviello
     Mengembalikan DataFrame untuk N hari terakhir
+
+    Args:
+        offline (bool): Hanya memakai salinan GPR lokal, tanpa akses jaringan.
+        cache_dir (str): Folder cache GPR (salinan parsed + metadata ETag).
+        ttl_seconds (float): Umur cache in-process sebelum dicek ulang ke server.
+        end_date (date, optional): Tanggal akhir data. Default hari ini.
+        gpr_loader (callable, optional): `() -> DataFrame` GPR mentah (kolom date, N10D,
+            GPRD, GPRD_ACT, GPRD_THREAT). Default `load_gpr_raw`; bisa diganti fixture lokal.
     """
-    import requests
-    from io import BytesIO
     from tqdm import tqdm
+    from src.gpr_cache import load_gpr_raw
 
-    url = "https://www.matteoiacoviello.com/gpr_files/data_gpr_daily_recent.xls"
-
-    # print("🌐 Mengunduh file GPR dari Matteo Iacoviello...")
-    
     # Loading bar untuk download
     try:
-        # Baca Excel langsung dari bytes
-        print("📊 Memproses data GPR...")
-        print("=" * 50)
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with tqdm(total=6, desc="🔄 Processing") as pbar_proc:
+        logger.info("📊 Memproses data GPR...")
+        with span("ingest", stage="gpr"), tqdm(total=6, desc="🔄 Processing") as pbar_proc:
             pbar_proc.update(1)
 
-            df_raw = pd.read_excel(BytesIO(response.content))
-            pbar_proc.update(1)
-            
-            df_raw['date'] = pd.to_datetime(df_raw['date'])
-            pbar_proc.update(1)
+            # Excel hanya di-parse ulang jika file di server berubah
+            if gpr_loader is None:
+                df_raw = load_gpr_raw(cache_dir=cache_dir, ttl_seconds=ttl_seconds, offline=offline)
+            else:
+                df_raw = gpr_loader()
+            pbar_proc.update(2)
             
-            end_date = pd.to_datetime(datetime.today())
+            end_date = pd.to_datetime(end_date if end_date is not None else datetime.today())
             if full_data:
                 start_date = pd.to_datetime('2015-01-01')
             else:
@@ -186,16 +230,15 @@ def download_gpr_data(lookback_days=70, full_data=False):
             (df_article['Date'] <= end_date)
         ].copy().sort_values('Date').reset_index(drop=True)
 
-        print(f"✅ GPR data berhasil diambil!")
-        print(f"📅 Dari: {df_filtered['Date'].min()}")
-        print(f"📅 Sampai: {df_filtered['Date'].max()}")
-        print(f"📊 Total records: {len(df_filtered)}")
-        print("=" * 50)
-        
+        logger.info(
+            f"✅ GPR data berhasil diambil: {df_filtered['Date'].min()} s/d {df_filtered['Date'].max()} "
+            f"| {len(df_filtered)} records"
+        )
+
         return df_filtered
 
     except Exception as e:
-        print("❌ Gagal mengunduh atau memproses data GPR:", e)
+        logger.error(f"❌ Gagal mengunduh atau memproses data GPR: {e}")
         return pd.DataFrame()
 
 
@@ -205,6 +248,12 @@ def get_sector_and_article_data(
     window=7,
     lookback_days=70,
     full_data=False,
+    offline=False,
+    on_event=None,
+    end_date=None,
+    fetcher=None,
+    gpr_loader=None,
+    store_path="./data/market_store.sqlite",
 ):
     """
     Mengambil data terbaru untuk sektor dan artikel dari internet
@@ -212,18 +261,32 @@ def get_sector_and_article_data(
         sektor_csv_path (str): Path ke file CSV yang berisi data sektor.
         window (int): Jumlah hari untuk rolling sum.
         lookback_days (int): Jumlah hari ke belakang yang ingin diambil.
+        offline (bool): Data GPR hanya dibaca dari salinan lokal.
+        on_event (callable, optional): Menerima event progress per tahap ingest.
+        end_date (date, optional): Tanggal akhir data. Default hari ini.
+        fetcher (callable, optional): Fetcher harga saham, lihat `get_processed_stock_data`.
+        gpr_loader (callable, optional): Sumber GPR mentah, lihat `download_gpr_data`.
+        store_path (str | None): Store harga lokal. None = selalu unduh penuh.
     """
+    emit = on_event or (lambda event: None)
+    emit({"type": "progress", "stage": "stocks", "message": "Mengambil data saham..."})
     df_sector = get_processed_stock_data(
         sektor_csv_path=sektor_csv_path,
         window=window,
         lookback_days=lookback_days,
-        full_data=full_data
+        full_data=full_data,
+        store_path=store_path,
+        fetcher=fetcher,
+        end_date=end_date,
+        on_event=on_event,
     )
-    df_article = download_gpr_data(lookback_days=lookback_days, full_data=full_data)
+    emit({"type": "progress", "stage": "gpr", "message": "Mengambil data GPR..."})
+    df_article = download_gpr_data(lookback_days=lookback_days, full_data=full_data, offline=offline,
+                                   end_date=end_date, gpr_loader=gpr_loader)
 
     # Pastikan kedua DataFrame tidak kosong
     if df_sector.empty or df_article.empty:
-        print("❌ Gagal mengambil data sektor atau artikel.")
+        logger.error("❌ Gagal mengambil data sektor atau artikel.")
         return None, None
 
     # Pastikan kolom 'Date' ada dan bertipe datetime
@@ -234,11 +297,11 @@ def get_sector_and_article_data(
     df_final = pd.merge(df_sector, df_article, on='Date', how='inner')
     df_final = df_final.sort_values(['Sector', 'Date']).reset_index(drop=True)
 
-    print()
-    print(f"✅ Data sektor dan artikel berhasil diperoleh: {len(df_final)} records")
-    print(f"📅 Tanggal mulai: {df_final['Date'].min().date()}, Tanggal akhir: {df_final['Date'].max().date()}")
-    print(f"📊 Total records per sektor: {len(df_final) / 11}")
-    print("")
+    logger.info(
+        f"✅ Data sektor dan artikel berhasil diperoleh: {len(df_final)} records "
+        f"({df_final['Date'].min().date()} s/d {df_final['Date'].max().date()}, {len(df_final) / 11:.0f} per sektor)"
+    )
+    emit({"type": "progress", "stage": "ingest_done", "message": f"Data siap: {len(df_final)} records"})
 
     return df_final
 
@@ -251,5 +314,8 @@ if __name__ == "__main__":
     # Contoh penggunaan (full_data=False) untuk mendapatkan data terbaru 70 hari kebelakang
     # df = get_sector_and_article_data()
     df.to_csv('./data/df_final_update.csv', index=False)
+    # Salinan biner (mmap) untuk API/training, lihat src.dataset
+    from src.dataset import convert_csv
+    convert_csv('./data/df_final_update.csv')
 
-    print("✅ Data berhasil diproses dan disimpan sebagai 'processed_stock_data.csv'.")
\ No newline at end of file
+    logger.info("✅ Data berhasil diproses dan disimpan sebagai 'df_final_update.csv'.")
\ No newline at end of file
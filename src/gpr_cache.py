@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from src.metrics import count
+
+GPR_URL = "https://www.matteoiacoviello.com/gpr_files/data_gpr_daily_recent.xls"
+GPR_COLUMNS = ['date', 'N10D', 'GPRD', 'GPRD_ACT', 'GPRD_THREAT']
+
+# Cache in-process: {url: (waktu_dimuat, DataFrame)}
+_memory_cache = {}
+_memory_lock = threading.Lock()
+
+
+def _cache_paths(cache_dir):
+    return (
+        os.path.join(cache_dir, "gpr_parsed.pkl"),
+        os.path.join(cache_dir, "gpr_meta.json"),
+    )
+
+
+def _read_disk(cache_dir):
+    frame_path, meta_path = _cache_paths(cache_dir)
+    if not os.path.exists(frame_path):
+        return None, {}
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    return pd.read_pickle(frame_path), meta
+
+
+def _write_disk(cache_dir, meta, df=None):
+    # Tulis ke file sementara lalu rename agar pembaca lain tidak melihat file setengah jadi
+    os.makedirs(cache_dir, exist_ok=True)
+    frame_path, meta_path = _cache_paths(cache_dir)
+    if df is not None:
+        df.to_pickle(frame_path + ".tmp")
+        os.replace(frame_path + ".tmp", frame_path)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def _parse_excel(content):
+    df_raw = pd.read_excel(BytesIO(content))
+    df_raw = df_raw[GPR_COLUMNS].copy()
+    df_raw['date'] = pd.to_datetime(df_raw['date'])
+    return df_raw
+
+
+def clear_memory_cache():
+    """Mengosongkan cache in-process (mis. untuk pengujian)."""
+    with _memory_lock:
+        _memory_cache.clear()
+
+
+def load_gpr_raw(
+    url=GPR_URL,
+    cache_dir="./data/gpr_cache",
+    ttl_seconds=3600,
+    offline=False,
+    http_get=None,
+    timeout=30,
+):
+    """
+    Mengambil data GPR mentah (kolom date, N10D, GPRD, GPRD_ACT, GPRD_THREAT) dengan cache berlapis.
+
+    Urutan pencarian:
+        1. Cache in-process yang belum melewati `ttl_seconds`.
+        2. Jika `offline=True`: salinan parsed di disk saja, tanpa jaringan.
+        3. Request kondisional (If-None-Match / If-Modified-Since). Respons 304
+           memakai salinan parsed di disk sehingga Excel tidak di-parse ulang.
+
+    Args:
+        url (str): URL file Excel GPR.
+        cache_dir (str): Folder penyimpanan salinan parsed dan metadata HTTP.
+        ttl_seconds (float): Umur maksimum cache in-process (detik).
+        offline (bool): Hanya membaca salinan lokal.
+        http_get (callable, optional): Pengganti `requests.get` (signature sama).
+        timeout (float): Timeout request HTTP (detik).
+
+    Returns:
+        pd.DataFrame: Data GPR mentah dengan kolom `date` bertipe datetime.
+    """
+    now = time.time()
+    with _memory_lock:
+        cached = _memory_cache.get(url)
+    if cached and now - cached[0] < ttl_seconds:
+        count("idx_gpr_cache_requests_total", result="memory")
+        return cached[1]
+
+    df_disk, meta = _read_disk(cache_dir)
+
+    if offline:
+        if df_disk is None:
+            raise FileNotFoundError(f"❌ Salinan GPR lokal di '{cache_dir}' tidak ditemukan (mode offline).")
+        df = df_disk
+        count("idx_gpr_cache_requests_total", result="offline")
+    else:
+        if http_get is None:
+            import requests
+            http_get = requests.get
+
+        headers = {}
+        if df_disk is not None and meta.get('url') == url:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = http_get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and df_disk is not None:
+            df = df_disk
+            meta['checked_at'] = now
+            _write_disk(cache_dir, meta)
+            count("idx_gpr_cache_requests_total", result="not_modified")
+        else:
+            response.raise_for_status()
+            df = _parse_excel(response.content)
+            meta = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': now,
+            }
+            _write_disk(cache_dir, meta, df)
+            count("idx_gpr_cache_requests_total", result="downloaded")
+
+    with _memory_lock:
+        _memory_cache[url] = (now, df)
+    return df
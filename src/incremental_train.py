@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.model_registry import check_checkpoint_setting, checkpoint_fingerprint, read_checkpoint_setting, sector_dir_name
+from src.train_orchestrator import save_checkpoint_atomic
+
+
+def rolling_validation_mae(nf, df_sector, horizon, n_windows):
+    """
+    MAE rolling-window pada `n_windows` jendela terakhir (tanpa retrain).
+
+    Untuk setiap cutoff, model memprediksi `horizon` langkah dari data sebelum cutoff
+    lalu dibandingkan secara posisional dengan `horizon` baris sesudahnya (data hanya
+    berisi hari bursa, sedangkan model memakai freq='D').
+
+    Returns:
+        float: Rata-rata MAE semua jendela.
+    """
+    model_type = type(nf.models[0]).__name__
+    df_sector = df_sector.reset_index(drop=True)
+    errors = []
+    for k in range(n_windows, 0, -1):
+        cut = len(df_sector) - k * horizon
+        history = df_sector.iloc[:cut]
+        actual = df_sector['y'].iloc[cut:cut + horizon].to_numpy()
+        forecast = nf.predict(df=history)[model_type].to_numpy()[:len(actual)]
+        errors.append(np.mean(np.abs(forecast - actual)))
+    return float(np.mean(errors))
+
+
+def _set_step_budget(nf, max_steps):
+    for model in nf.models:
+        model.max_steps = max_steps
+        model.trainer_kwargs['max_steps'] = max_steps
+        # Early stopping butuh validation set yang tidak dipakai saat fine-tune
+        model.early_stop_patience_steps = -1
+
+
+def incremental_update(
+    df,
+    setting,
+    save_dir='./saved_models/Forecast_Model',
+    horizon=7,
+    recent_days=365,
+    finetune_steps=100,
+    n_val_windows=4,
+    tolerance=0.0,
+    versions_dir=None,
+):
+    """
+    Warm-start retraining satu sektor: lanjutkan training checkpoint yang ada pada
+    data terbaru dengan budget step kecil, lalu promosikan hanya jika error validasi
+    rolling tidak memburuk.
+
+    Gerbang promosi: kandidat di-fine-tune pada jendela terbaru tanpa `n_val_windows * horizon`
+    baris terakhir, lalu kandidat dan model lama dinilai pada jendela validasi tersebut.
+    Ini perbandingan relatif, bukan skor out-of-sample: model lama dilatih dengan seluruh
+    data (termasuk jendela validasi) dan kandidat mewarisi bobotnya, sehingga kedua MAE
+    optimistis dan gerbang ini hanya menolak fine-tune yang jelas merusak model.
+
+    Bila lolos, fine-tune diulang dari checkpoint lama pada seluruh jendela terbaru
+    (termasuk jendela validasi) dengan budget yang sama, dan model itulah yang disimpan
+    sebagai versi baru dan dipromosikan, sehingga model produksi ikut mempelajari
+    minggu-minggu terakhir. Kandidat yang gagal disimpan sebagai versi untuk inspeksi.
+
+    Args:
+        df (pd.DataFrame): Data lengkap (mis. dari `get_sector_and_article_data(full_data=True)`).
+        setting (dict): {sector, feature, model}.
+        save_dir (str): Folder model aktif (yang dibaca API).
+        recent_days (int): Panjang jendela data terbaru untuk fine-tune (hari kalender).
+        finetune_steps (int): Jumlah step training tambahan.
+        n_val_windows (int): Jumlah jendela validasi rolling.
+        tolerance (float): Toleransi kenaikan MAE relatif, 0.0 = tidak boleh lebih buruk.
+        versions_dir (str, optional): Folder checkpoint berversi. Default `<save_dir>/_versions`.
+
+    Returns:
+        dict: Ringkasan (Sektor, version, old_mae, new_mae, promoted, ...).
+    """
+    from neuralforecast.core import NeuralForecast
+    from src.train import prepare_data
+
+    sector = setting['sector']
+    model_path = os.path.join(save_dir, sector_dir_name(sector))
+    versions_dir = versions_dir or os.path.join(save_dir, '_versions')
+    parent_fp = checkpoint_fingerprint(model_path)
+    stored = read_checkpoint_setting(model_path)
+
+    df_sector = prepare_data(df, sector, setting['feature']).reset_index(drop=True)
+    holdout = n_val_windows * horizon
+    recent = df_sector[df_sector['ds'] >= df_sector['ds'].max() - pd.Timedelta(days=recent_days)]
+    train_part = recent.iloc[:-holdout]
+
+    nf_old = NeuralForecast.load(path=model_path)
+    # Fine-tune hanya melanjutkan checkpoint dengan model & fitur yang sama
+    check_checkpoint_setting(setting, stored, nf_old)
+    old_mae = rolling_validation_mae(nf_old, df_sector, horizon, n_val_windows)
+
+    print(f"  🔁 Fine-tune {sector}: {len(train_part)} baris, {finetune_steps} step")
+    nf_new = NeuralForecast.load(path=model_path)
+    _set_step_budget(nf_new, finetune_steps)
+    nf_new.fit(df=train_part, use_init_models=False)
+    new_mae = rolling_validation_mae(nf_new, df_sector, horizon, n_val_windows)
+
+    promoted = new_mae <= old_mae * (1 + tolerance)
+    if promoted:
+        # Model yang dipromosikan juga belajar dari jendela validasi (data paling baru)
+        print(f"  🔁 Fine-tune final {sector}: {len(recent)} baris (termasuk jendela validasi)")
+        nf_new = NeuralForecast.load(path=model_path)
+        _set_step_budget(nf_new, finetune_steps)
+        nf_new.fit(df=recent, use_init_models=False)
+
+    version = pd.Timestamp.now().strftime('v%Y%m%d-%H%M%S')
+    version_path = os.path.join(versions_dir, sector_dir_name(sector), version)
+    save_checkpoint_atomic(nf_new, version_path, setting)
+    if promoted:
+        save_checkpoint_atomic(nf_new, model_path, setting)
+        print(f"  ✅ {sector}: MAE {old_mae:.5f} -> {new_mae:.5f}, versi {version} dipromosikan")
+    else:
+        print(f"  ⚠️ {sector}: MAE {old_mae:.5f} -> {new_mae:.5f}, versi {version} tidak dipromosikan")
+
+    summary = {
+        'Sektor': sector,
+        'Model': setting['model'],
+        'version': version,
+        'parent_fingerprint': parent_fp,
+        'old_mae': old_mae,
+        'new_mae': new_mae,
+        'promoted': promoted,
+        'created_at': pd.Timestamp.now().isoformat(),
+    }
+    log_path = os.path.join(versions_dir, 'versions.csv')
+    pd.DataFrame([summary]).to_csv(log_path, mode='a', header=not os.path.exists(log_path), index=False)
+    return summary
+
+
+def run_incremental_update(df, settings, save_dir='./saved_models/Forecast_Model', **kwargs):
+    """
+    Menjalankan `incremental_update` untuk semua sektor.
+
+    Returns:
+        pd.DataFrame: Satu baris ringkasan per sektor.
+    """
+    results = []
+    for setting in settings:
+        print(f"\n{'='*50}\n🔬 UPDATE: {setting['sector']} | MODEL: {setting['model']}\n{'='*50}")
+        try:
+            results.append(incremental_update(df, setting, save_dir=save_dir, **kwargs))
+        except FileNotFoundError:
+            print(f"  ⚠️ Peringatan: Model untuk '{setting['sector']}' tidak ditemukan. Jalankan training penuh dulu.")
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    from src.get_data import get_sector_and_article_data
+    from src.predict import SECTOR_SETTINGS
+
+    # Refresh mingguan: data lengkap diambil inkremental dari store lokal
+    df = get_sector_and_article_data(full_data=True)
+    summary = run_incremental_update(df, SECTOR_SETTINGS)
+    print(summary.to_string(index=False))
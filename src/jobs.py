@@ -0,0 +1,404 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("done", "error")
+
+
+class QueueFullError(Exception):
+    """Dilempar ketika antrian job sudah penuh."""
+
+
+def request_key(params):
+    """Kunci deduplikasi: hash dari parameter request yang sudah dinormalisasi."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _new_job(params, key):
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "request_key": key,
+        "status": "queued",
+        "message": "Menunggu antrian...",
+        "params": params,
+        "created_at": now,
+        "updated_at": now,
+        "result": None,
+        "error": None,
+    }
+
+
+class InMemoryJobStore:
+    """Penyimpanan job di memori proses (cukup untuk satu worker uvicorn)."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def create_or_get_active(self, params, key, stale_after):
+        """
+        Membuat job baru, kecuali sudah ada job aktif dengan `key` yang sama.
+
+        Returns:
+            tuple[dict, bool]: (job, True jika job baru dibuat).
+        """
+        now = time.time()
+        with self._lock:
+            for job in self._jobs.values():
+                if (job["request_key"] == key and job["status"] in ACTIVE_STATUSES
+                        and now - job["updated_at"] < stale_after):
+                    return dict(job), False
+            job = _new_job(params, key)
+            self._jobs[job["job_id"]] = job
+            return dict(job), True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def append_event(self, job_id, event):
+        with self._lock:
+            self._events.setdefault(job_id, []).append(event)
+
+    def events_since(self, job_id, after=0):
+        """Event job dengan nomor urut > `after`, sebagai list `(seq, event)`."""
+        with self._lock:
+            events = self._events.get(job_id, [])
+            return [(seq, event) for seq, event in enumerate(events[after:], start=after + 1)]
+
+    def list(self, limit=50):
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [{k: v for k, v in job.items() if k != "result"} for job in jobs[:limit]]
+
+    def latest(self, status):
+        """Job terbaru (menurut `updated_at`) dengan status `status`, tanpa result, atau None."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j["status"] == status]
+            job = max(jobs, key=lambda j: j["updated_at"], default=None)
+            return {k: v for k, v in job.items() if k != "result"} if job else None
+
+    def evict(self, older_than, keep_last):
+        """Menghapus job selesai yang lebih tua dari `older_than` detik atau di luar `keep_last` terbaru."""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if j["status"] in FINISHED_STATUSES),
+                key=lambda j: j["updated_at"], reverse=True,
+            )
+            for i, job in enumerate(finished):
+                if i >= keep_last or now - job["updated_at"] > older_than:
+                    del self._jobs[job["job_id"]]
+                    self._events.pop(job["job_id"], None)
+
+
+class SQLiteJobStore:
+    """
+    Penyimpanan job di file SQLite, dipakai bersama oleh beberapa worker uvicorn.
+
+    Job dijalankan oleh worker yang membuatnya; worker lain cukup membaca status
+    dan hasil dari file yang sama sehingga polling bisa masuk ke worker mana pun.
+    """
+
+    _COLUMNS = ("job_id", "request_key", "status", "message", "params",
+                "created_at", "updated_at", "result", "error")
+
+    def __init__(self, db_path="./data/jobs.sqlite"):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    request_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    message TEXT,
+                    params TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (request_key, status)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _row_to_job(self, row):
+        job = dict(zip(self._COLUMNS, row))
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create_or_get_active(self, params, key, stale_after):
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE mengunci tulis sehingga dua worker tidak membuat job kembar
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs "
+                "WHERE request_key = ? AND status IN ('queued', 'running') AND updated_at > ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, now - stale_after),
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return self._row_to_job(row), False
+
+            job = _new_job(params, key)
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                (job["job_id"], key, job["status"], job["message"], json.dumps(params, default=str),
+                 job["created_at"], job["updated_at"], None, None),
+            )
+            conn.execute("COMMIT")
+            return job, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def append_event(self, job_id, event):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?",
+                (job_id, json.dumps(event, default=str), job_id),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def events_since(self, job_id, after=0):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(seq, json.loads(event)) for seq, event in rows]
+
+    def list(self, limit=50):
+        columns = [c for c in self._COLUMNS if c != "result"]
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        jobs = [dict(zip(columns, row)) for row in rows]
+        for job in jobs:
+            job["params"] = json.loads(job["params"]) if job["params"] else {}
+        return jobs
+
+    def latest(self, status):
+        columns = [c for c in self._COLUMNS if c != "result"]
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(columns)} FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT 1", (status,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        return job
+
+    def evict(self, older_than, keep_last):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') AND (updated_at < ? OR job_id NOT IN ("
+                "SELECT job_id FROM jobs WHERE status IN ('done', 'error') ORDER BY updated_at DESC LIMIT ?))",
+                (now - older_than, keep_last),
+            )
+            conn.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        finally:
+            conn.close()
+
+
+class JobManager:
+    """
+    Menjalankan job prediksi di executor terbatas dengan deduplikasi dan retensi hasil.
+
+    Args:
+        store: `InMemoryJobStore` atau `SQLiteJobStore`.
+        runner (callable): Fungsi `(params, emit) -> result`. `emit(event)` menerima dict
+            JSON-serializable; event disimpan berurutan (untuk streaming) dan field
+            `message`-nya, jika ada, menjadi pesan status job.
+        max_workers (int): Jumlah job yang berjalan bersamaan.
+        max_queue (int): Jumlah job (berjalan + menunggu) maksimum di proses ini. Batas ini
+            per proses, tidak dibagi lewat store: dengan N worker uvicorn yang memakai
+            `SQLiteJobStore` yang sama, total antrian bisa mencapai N * max_queue.
+        retention_seconds (float): Umur maksimum hasil job yang sudah selesai.
+        keep_last (int): Jumlah job selesai terbaru yang tetap disimpan.
+        stale_after (float): Job aktif yang tidak diperbarui selama ini dianggap mati
+            (mis. worker crash) dan tidak dipakai untuk deduplikasi.
+        heartbeat_interval (float, optional): Selang pembaruan `updated_at` selama job
+            berjalan, agar job panjang yang tidak mengirim event tidak dianggap mati.
+            Default `stale_after / 3`.
+    """
+
+    def __init__(self, store, runner, max_workers=1, max_queue=8,
+                 retention_seconds=3600, keep_last=20, stale_after=1800, heartbeat_interval=None):
+        self.store = store
+        self.runner = runner
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self.keep_last = keep_last
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval or stale_after / 3
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="predict-job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, params):
+        """
+        Mendaftarkan job untuk `params`. Request identik yang masih berjalan memakai job yang sama.
+
+        Returns:
+            tuple[dict, bool]: (job, True jika job baru dibuat).
+
+        Raises:
+            QueueFullError: Antrian di proses ini sudah penuh.
+        """
+        self.store.evict(self.retention_seconds, self.keep_last)
+        key = request_key(params)
+
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFullError("Antrian prediksi penuh, coba lagi nanti.")
+            job, created = self.store.create_or_get_active(params, key, self.stale_after)
+            if created:
+                self._pending += 1
+        if created:
+            self._executor.submit(self._run, job["job_id"], params)
+        return job, created
+
+    def _run(self, job_id, params):
+        def emit(event):
+            self.store.append_event(job_id, event)
+            if event.get("message"):
+                self.store.update(job_id, message=event["message"])
+
+        finished = threading.Event()
+
+        def heartbeat():
+            # Job hidup tetapi sunyi (mis. training/ingest lama) tetap terlihat aktif
+            while not finished.wait(self.heartbeat_interval):
+                self.store.update(job_id)
+
+        threading.Thread(target=heartbeat, name=f"job-heartbeat-{job_id[:8]}", daemon=True).start()
+        try:
+            self.store.update(job_id, status="running", message="Memulai pipeline...")
+            result = self.runner(params, emit)
+            self.store.update(job_id, status="done", message="Selesai", result=result)
+            self.store.append_event(job_id, {"type": "done", "message": "Selesai"})
+        except Exception as e:
+            self.store.update(job_id, status="error", message=f"Error: {e}", error=str(e))
+            self.store.append_event(job_id, {"type": "error", "message": f"Error: {e}"})
+        finally:
+            finished.set()
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list(self, limit=50):
+        return self.store.list(limit)
+
+    def latest(self, status="done"):
+        """Job terbaru dengan `status` langsung dari store (tidak terbatas jendela `list`)."""
+        return self.store.latest(status)
+
+    async def events(self, job_id, poll_interval=0.25, heartbeat=15.0):
+        """
+        Async generator event job (`(seq, event)`) sampai job selesai.
+
+        Membaca dari store sehingga bisa dipakai oleh worker mana pun. Menghasilkan
+        `(None, None)` sebagai heartbeat bila tidak ada event selama `heartbeat` detik.
+        Menunggu dengan `asyncio.sleep`: klien SSE yang terbuka lama tidak menahan thread
+        threadpool; bacaan store (SQLite memblok) dijalankan sebentar di thread terpisah.
+        """
+        last_seq, last_sent = 0, time.time()
+        while True:
+            new_events = await asyncio.to_thread(self.store.events_since, job_id, last_seq)
+            for seq, event in new_events:
+                last_seq = seq
+                last_sent = time.time()
+                yield seq, event
+                if event.get("type") in ("done", "error"):
+                    return
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None:
+                return
+            if time.time() - last_sent > heartbeat:
+                last_sent = time.time()
+                yield None, None
+            await asyncio.sleep(poll_interval)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
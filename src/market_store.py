@@ -0,0 +1,241 @@
+import contextlib
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+PRICE_COLUMNS = ['Date', 'Ticker', 'Sector', 'Open', 'High', 'Low', 'Close', 'Volume']
+# Rentang backfill yang kosong (mis. sebelum IPO) diperiksa ulang setelah selang ini
+REPROBE_AFTER_DAYS = 7
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.to_datetime(value).date()
+
+
+def yfinance_fetcher(ticker_jk, start_date, end_date):
+    """
+    Fetcher default: mengambil histori harga satu ticker dari Yahoo Finance.
+
+    Args:
+        ticker_jk (str): Kode ticker lengkap, contoh 'BBCA.JK'.
+        start_date (date): Tanggal mulai (inklusif).
+        end_date (date): Tanggal akhir (eksklusif, sama seperti yfinance).
+
+    Returns:
+        pd.DataFrame: Histori mentah dengan kolom Date, Open, High, Low, Close, Volume.
+    """
+    import yfinance as yf
+
+    hist = yf.Ticker(ticker_jk).history(start=start_date, end=end_date)
+    return hist.reset_index()
+
+
+class MarketDataStore:
+    """
+    Penyimpanan lokal (SQLite) untuk bar harian saham dengan kunci (Ticker, Date).
+
+    Selain tabel harga, store mencatat rentang tanggal yang sudah pernah diminta
+    per ticker (tabel `coverage`). Dengan begitu refresh berikutnya hanya perlu
+    mengunduh tanggal di luar rentang tersebut, termasuk hari libur bursa yang
+    memang tidak punya bar.
+
+    Respons kosong tidak dipercaya sepenuhnya (yfinance sering mengembalikan frame kosong
+    saat rate limit alih-alih error): coverage hanya diperluas sampai bar terakhir yang
+    benar-benar diterima, dan backfill kosong sebelum bar pertama dicatat sebagai probe
+    yang diperiksa ulang setelah `REPROBE_AFTER_DAYS` hari.
+    """
+
+    def __init__(self, db_path="./data/market_store.sqlite"):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS prices (
+                    Ticker TEXT NOT NULL,
+                    Date TEXT NOT NULL,
+                    Sector TEXT,
+                    Open REAL, High REAL, Low REAL, Close REAL,
+                    Volume INTEGER,
+                    PRIMARY KEY (Ticker, Date)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS coverage (
+                    Ticker TEXT PRIMARY KEY,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL,
+                    empty_start TEXT,
+                    empty_probed_at TEXT
+                )
+                """
+            )
+            # Store lama: tambahkan kolom probe kosong
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(coverage)")}
+            for column in ("empty_start", "empty_probed_at"):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE coverage ADD COLUMN {column} TEXT")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # `with sqlite3.connect(...)` hanya commit/rollback, tidak menutup koneksi
+        with contextlib.closing(sqlite3.connect(self.db_path)) as conn:
+            with conn:
+                yield conn
+
+    def coverage(self):
+        """
+        Returns:
+            dict: {ticker: (start_date, end_date, empty_start, empty_probed_at)} rentang yang
+                sudah tersimpan (end_date eksklusif) dan probe backfill kosong terakhir
+                (None bila tidak ada).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT Ticker, start_date, end_date, empty_start, empty_probed_at FROM coverage"
+            ).fetchall()
+        return {
+            t: (_to_date(s), _to_date(e), _to_date(es), pd.Timestamp(pa) if pa else None)
+            for t, s, e, es, pa in rows
+        }
+
+    def missing_ranges(self, ticker, start_date, end_date, coverage=None):
+        """
+        Menghitung rentang tanggal yang belum ada di store untuk satu ticker.
+
+        Args:
+            ticker (str): Kode ticker tanpa akhiran '.JK'.
+            start_date (date): Tanggal mulai yang diminta (inklusif).
+            end_date (date): Tanggal akhir yang diminta (eksklusif).
+            coverage (dict, optional): Hasil `coverage()` agar tidak query berulang.
+
+        Returns:
+            list[tuple[date, date]]: Rentang (start, end) yang perlu diunduh.
+        """
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        if coverage is None:
+            coverage = self.coverage()
+        if ticker not in coverage:
+            return [(start_date, end_date)]
+
+        cov_start, cov_end, empty_start, probed_at = coverage[ticker]
+        ranges = []
+        recently_probed = (
+            empty_start is not None and empty_start <= start_date
+            and probed_at is not None and pd.Timestamp.now() - probed_at < pd.Timedelta(days=REPROBE_AFTER_DAYS)
+        )
+        if start_date < cov_start and not recently_probed:
+            ranges.append((start_date, cov_start))
+        if end_date > cov_end:
+            ranges.append((cov_end, end_date))
+        return ranges
+
+    def append(self, ticker, df, start_date, end_date):
+        """
+        Menyimpan bar baru untuk satu ticker dan memperluas rentang coverage-nya.
+
+        Coverage hanya diperluas sampai hari setelah bar terakhir yang diterima, jadi ekor
+        rentang yang kosong (hari ini, atau respons kosong karena rate limit) diunduh lagi
+        pada refresh berikutnya. Respons kosong untuk backfill sebelum coverage yang ada
+        dicatat sebagai probe (lihat `missing_ranges`); respons kosong lainnya tidak dicatat.
+
+        Args:
+            ticker (str): Kode ticker tanpa akhiran '.JK'.
+            df (pd.DataFrame): Bar dengan kolom PRICE_COLUMNS (boleh kosong).
+            start_date (date): Awal rentang yang baru saja diunduh.
+            end_date (date): Akhir rentang yang baru saja diunduh (eksklusif).
+        """
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        has_bars = df is not None and not df.empty
+        with self._connect() as conn:
+            if has_bars:
+                rows = [
+                    (
+                        ticker, str(_to_date(r.Date)), r.Sector,
+                        float(r.Open), float(r.High), float(r.Low), float(r.Close),
+                        int(r.Volume),
+                    )
+                    for r in df[PRICE_COLUMNS].itertuples(index=False)
+                ]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO prices "
+                    "(Ticker, Date, Sector, Open, High, Low, Close, Volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+            current = conn.execute(
+                "SELECT start_date, end_date, empty_start, empty_probed_at FROM coverage WHERE Ticker = ?", (ticker,)
+            ).fetchone()
+            if not has_bars:
+                if current and end_date <= _to_date(current[0]):
+                    conn.execute(
+                        "UPDATE coverage SET empty_start = ?, empty_probed_at = ? WHERE Ticker = ?",
+                        (str(start_date), pd.Timestamp.now().isoformat(), ticker),
+                    )
+                return
+
+            last_bar = max(_to_date(d) for d in df['Date'])
+            end_date = min(end_date, last_bar + timedelta(days=1))
+            empty_start, probed_at = None, None
+            if current:
+                empty_start, probed_at = current[2], current[3]
+                if empty_start and start_date <= _to_date(empty_start):
+                    empty_start, probed_at = None, None
+                start_date = min(start_date, _to_date(current[0]))
+                end_date = max(end_date, _to_date(current[1]))
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage (Ticker, start_date, end_date, empty_start, empty_probed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (ticker, str(start_date), str(end_date), empty_start, probed_at),
+            )
+
+    def load(self, tickers=None, start_date=None, end_date=None):
+        """
+        Membaca bar dari store.
+
+        Args:
+            tickers (list[str], optional): Filter ticker (tanpa '.JK').
+            start_date (date, optional): Tanggal mulai (inklusif).
+            end_date (date, optional): Tanggal akhir (eksklusif).
+
+        Returns:
+            pd.DataFrame: Bar dengan kolom PRICE_COLUMNS, Date bertipe `date`.
+        """
+        query = "SELECT Date, Ticker, Sector, Open, High, Low, Close, Volume FROM prices WHERE 1=1"
+        params = []
+        if start_date is not None:
+            query += " AND Date >= ?"
+            params.append(str(_to_date(start_date)))
+        if end_date is not None:
+            query += " AND Date < ?"
+            params.append(str(_to_date(end_date)))
+        if tickers is not None:
+            tickers = list(tickers)
+            query += f" AND Ticker IN ({','.join('?' * len(tickers))})"
+            params.extend(tickers)
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+
+        df['Date'] = pd.to_datetime(df['Date']).dt.date
+        df['Volume'] = df['Volume'].astype('int64')
+        return df[PRICE_COLUMNS]
+
+    def last_date(self, ticker):
+        """Tanggal bar terakhir yang tersimpan untuk `ticker`, atau None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(Date) FROM prices WHERE Ticker = ?", (ticker,)).fetchone()
+        return _to_date(row[0]) if row and row[0] else None
@@ -0,0 +1,244 @@
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+
+# Bucket latensi (detik), cukup lebar untuk unduhan saham sampai inferensi per sektor
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_METRIC_HELP = {
+    "idx_stage_duration_seconds": "Durasi tahap pipeline (ingest, fitur, prediksi, serialisasi).",
+    "idx_predict_duration_seconds": "Durasi inferensi satu sektor per tipe model.",
+    "idx_model_load_seconds": "Durasi memuat checkpoint model per sektor.",
+    "idx_tickers_fetched_total": "Rentang ticker yang diunduh, per status.",
+    "idx_forecast_cache_requests_total": "Lookup cache prediksi (hit/miss).",
+    "idx_gpr_cache_requests_total": "Sumber data GPR (memory/offline/not_modified/downloaded).",
+    "idx_jobs_total": "Job prediksi yang selesai, per status.",
+    "idx_http_request_duration_seconds": "Durasi request HTTP per route.",
+}
+
+
+def configure_logging(level=None):
+    """
+    Logging berlevel untuk modul `src.*` dan API. Level dari argumen atau env `LOG_LEVEL`
+    (default INFO). Aman dipanggil berulang kali.
+    """
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    root = logging.getLogger("idx")
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        root.addHandler(handler)
+        root.propagate = False
+    return root
+
+
+def get_logger(name):
+    """Logger di bawah namespace `idx` (mis. `get_logger("predict")` -> `idx.predict`)."""
+    configure_logging()
+    return logging.getLogger(f"idx.{name}")
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Registry metrik in-process (counter dan histogram berlabel) dengan output format
+    teks Prometheus. Tanpa dependensi tambahan; aman dipakai dari banyak thread.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauge_callbacks = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def register_gauge(self, name, callback, help_text=""):
+        """`callback() -> {label_tuple_or_dict: nilai}` dievaluasi saat scrape."""
+        self._gauge_callbacks[name] = (callback, help_text)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Ringkasan JSON: counter dan histogram (count, sum, mean) per label."""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+            histograms = [
+                {"name": n, "labels": dict(l), "count": h["count"], "sum": h["sum"],
+                 "mean": h["sum"] / h["count"] if h["count"] else None}
+                for (n, l), h in self._histograms.items()
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self):
+        """Exposition format teks Prometheus (versi 0.0.4)."""
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {_METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{fmt_labels(labels)} {value}")
+
+        for (name, labels), hist in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {_METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in zip(self.buckets, hist["buckets"]):
+                lines.append(f"{name}_bucket{fmt_labels(labels, [('le', repr(float(bound)))])} {count}")
+            lines.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {hist['sum']}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {hist['count']}")
+
+        for name, (callback, help_text) in sorted(self._gauge_callbacks.items()):
+            try:
+                values = callback()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text or name}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values.items():
+                labels = _label_key(labels) if isinstance(labels, dict) else labels
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """Registry metrik bersama per proses."""
+    return _registry
+
+
+class RunReport:
+    """
+    Laporan JSON satu run pipeline: span (tahap/sektor) beserta durasinya dan counter.
+
+    Dipasang lewat `run_report()`; `span` dan `count` di dalam konteks tersebut ikut
+    tercatat di laporan selain di metrik global.
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, duration_s, labels):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "labels": labels,
+                "start_offset_s": round(time.time() - duration_s - self.started_at, 6),
+                "duration_s": round(duration_s, 6),
+            })
+
+    def add_count(self, name, value, labels):
+        key = name + "".join(f"|{k}={v}" for k, v in sorted(labels.items()))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        slowest = sorted((s for s in spans if s["name"] == "predict"), key=lambda s: -s["duration_s"])
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "duration_s": round(time.time() - self.started_at, 6),
+            "spans": spans,
+            "counters": counters,
+            "slowest_sectors": [{**s["labels"], "duration_s": s["duration_s"]} for s in slowest[:5]],
+        }
+
+
+_current_report = contextvars.ContextVar("idx_run_report", default=None)
+
+
+@contextlib.contextmanager
+def run_report(run_id=None):
+    """Mengaktifkan `RunReport` baru untuk blok ini (per thread/konteks)."""
+    report = RunReport(run_id)
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+
+
+def current_report():
+    return _current_report.get()
+
+
+def record_span(name, duration_s, metric="idx_stage_duration_seconds", **labels):
+    """Mencatat durasi yang diukur di luar `span` (mis. hasil dari process pool)."""
+    _registry.observe(metric, duration_s, **labels)
+    report = _current_report.get()
+    if report is not None:
+        report.add_span(name, duration_s, {k: str(v) for k, v in labels.items()})
+
+
+@contextlib.contextmanager
+def span(name, metric="idx_stage_duration_seconds", **labels):
+    """
+    Mengukur durasi blok ke histogram `metric` dan ke run report aktif.
+
+    Contoh:
+        with span("ingest", stage="stocks"):
+            ...
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - t0, metric=metric, **labels)
+
+
+def count(name, value=1, **labels):
+    """Menambah counter global dan counter di run report aktif."""
+    _registry.inc(name, value, **labels)
+    report = _current_report.get()
+    if report is not None:
+        report.add_count(name, value, {k: str(v) for k, v in labels.items()})
@@ -0,0 +1,284 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.metrics import get_logger, get_metrics
+
+logger = get_logger("model_registry")
+
+# Kunci/folder model global (satu model untuk semua sektor, lihat `src.train.run_global_forecast`)
+GLOBAL_MODEL_KEY = "_global"
+# Metadata di folder checkpoint: model dan fitur eksogen yang dipakai saat training
+CHECKPOINT_SETTING = "sector_setting.json"
+
+
+def sector_dir_name(sector):
+    """Nama folder model untuk satu sektor, contoh 'Properties & Real Estate' -> 'Properties_and_Real_Estate'."""
+    return sector.replace(" & ", "_and_").replace(" ", "_")
+
+
+def _swap_in_progress(model_path):
+    # Sisa `old-*` di sebelah folder = save_checkpoint_atomic/ekspor sedang di antara dua rename
+    parent, name = os.path.split(os.path.abspath(model_path))
+    name = glob.escape(name)
+    return bool(glob.glob(os.path.join(parent, f".{name}.old-*")) or glob.glob(os.path.join(parent, f"{name}.old-*")))
+
+
+def wait_for_checkpoint(model_path, timeout=2.0):
+    """
+    Menunggu folder model muncul kembali bila sedang ditukar (lihat `save_checkpoint_atomic`).
+
+    Returns:
+        bool: True bila folder ada.
+    """
+    deadline = time.monotonic() + timeout
+    while not os.path.isdir(model_path):
+        if time.monotonic() >= deadline or not _swap_in_progress(model_path):
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def checkpoint_fingerprint(model_path, hash_contents=False):
+    """
+    Sidik jari isi folder model, berubah setiap kali file checkpoint diganti.
+
+    Args:
+        model_path (str): Folder model NeuralForecast.
+        hash_contents (bool): True = hash isi file (lebih lambat, kebal terhadap mtime
+            yang tidak berubah). False = cukup nama, ukuran dan mtime file.
+
+    Returns:
+        str: Hex digest SHA-1.
+    """
+    if not wait_for_checkpoint(model_path):
+        raise FileNotFoundError(f"❌ Folder model '{model_path}' tidak ditemukan.")
+
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(model_path)):
+        file_path = os.path.join(model_path, name)
+        if not os.path.isfile(file_path):
+            continue
+        stat = os.stat(file_path)
+        digest.update(f"{name}:{stat.st_size}".encode())
+        if hash_contents:
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(str(stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def write_checkpoint_setting(model_path, setting):
+    """Mencatat {sector, model, feature} training di folder checkpoint (lihat `read_checkpoint_setting`)."""
+    with open(os.path.join(model_path, CHECKPOINT_SETTING), "w") as f:
+        json.dump({key: setting.get(key) for key in ("sector", "model", "feature")}, f, indent=2)
+
+
+def read_checkpoint_setting(model_path):
+    """Metadata training checkpoint, atau None untuk checkpoint lama tanpa metadata."""
+    path = os.path.join(model_path, CHECKPOINT_SETTING)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def check_checkpoint_setting(setting, stored, model=None):
+    """
+    Memastikan checkpoint dilatih dengan model dan fitur eksogen yang diminta `setting`.
+
+    Args:
+        setting (dict): Entri sektor dari konfigurasi serving.
+        stored (dict | None): Hasil `read_checkpoint_setting` (None untuk checkpoint lama).
+        model (optional): Model termuat; kelasnya dipakai bila metadata tidak ada.
+
+    Raises:
+        ValueError: Model atau fitur berbeda (mis. konfigurasi sudah diganti model search
+            tetapi checkpoint belum dilatih ulang).
+    """
+    trained_model = (stored or {}).get('model')
+    if trained_model is None and model is not None:
+        trained_model = getattr(model, 'model_name', None) or next(
+            (type(m).__name__ for m in getattr(model, 'models', [])), None)
+    if trained_model is not None and trained_model != setting['model']:
+        raise ValueError(f"❌ Checkpoint '{setting['sector']}' adalah {trained_model}, konfigurasi meminta "
+                         f"{setting['model']}. Latih ulang sektor ini sebelum konfigurasi dipakai.")
+    if stored is not None and stored.get('feature') != setting['feature']:
+        raise ValueError(f"❌ Checkpoint '{setting['sector']}' dilatih dengan fitur {stored.get('feature')}, "
+                         f"konfigurasi meminta {setting['feature']}. Latih ulang sektor ini.")
+
+
+def _model_nbytes(nf):
+    if hasattr(nf, 'nbytes'):
+        # Artefak ekspor (src.export.ExportedForecaster): ukuran file TorchScript
+        return nf.nbytes
+    total = 0
+    for model in getattr(nf, 'models', []):
+        for tensor in list(model.parameters()) + list(model.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _default_loader(model_path):
+    # Folder hasil `python -m src.export` dimuat tanpa NeuralForecast/Lightning
+    from src.export import is_exported, load_exported
+    if is_exported(model_path):
+        return load_exported(model_path)
+    from neuralforecast.core import NeuralForecast
+    return NeuralForecast.load(path=model_path)
+
+
+class ModelRegistry:
+    """
+    Menyimpan model NeuralForecast per sektor di memori agar tidak dimuat ulang setiap request.
+
+    Model dimuat saat pertama dipakai (atau lewat `warm_up`) lalu tetap resident.
+    Setiap akses membandingkan sidik jari checkpoint di disk; jika berubah
+    (mis. setelah retrain), model dimuat ulang secara otomatis.
+
+    Args:
+        model_save_dir (str): Folder utama berisi satu subfolder per sektor.
+        loader (callable, optional): Fungsi `(model_path) -> model`. Default `NeuralForecast.load`,
+            atau `ExportedForecaster` untuk folder hasil ekspor TorchScript (`src.export`).
+        hash_contents (bool): Lihat `checkpoint_fingerprint`.
+        require_checkpoint (bool): False = folder model boleh tidak ada (untuk `loader` yang
+            tidak membaca disk, mis. `NaiveForecaster` di src.bench); model dimuat sekali.
+    """
+
+    def __init__(self, model_save_dir, loader=None, hash_contents=False, require_checkpoint=True):
+        self.model_save_dir = model_save_dir
+        self.loader = loader or _default_loader
+        self.hash_contents = hash_contents
+        self.require_checkpoint = require_checkpoint
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def model_path(self, sector):
+        return os.path.join(self.model_save_dir, sector_dir_name(sector))
+
+    def _sector_lock(self, sector):
+        with self._lock:
+            return self._locks.setdefault(sector, threading.RLock())
+
+    def get(self, sector):
+        """
+        Mengembalikan model resident untuk `sector`, memuat/memuat ulang bila perlu.
+
+        Raises:
+            FileNotFoundError: Folder model sektor tidak ada (dan `require_checkpoint`).
+        """
+        model_path = self.model_path(sector)
+        with self._sector_lock(sector):
+            if self.require_checkpoint or os.path.isdir(model_path):
+                fingerprint = checkpoint_fingerprint(model_path, hash_contents=self.hash_contents)
+            else:
+                fingerprint = None
+            entry = self._entries.get(sector)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                t0 = time.perf_counter()
+                try:
+                    model = self.loader(model_path)
+                except FileNotFoundError:
+                    # Checkpoint ditukar saat sedang dibaca: muat sekali lagi dari folder baru
+                    if not self.require_checkpoint or not wait_for_checkpoint(model_path):
+                        raise
+                    fingerprint = checkpoint_fingerprint(model_path, hash_contents=self.hash_contents)
+                    model = self.loader(model_path)
+                load_time_s = time.perf_counter() - t0
+                self._entries[sector] = {
+                    'model': model,
+                    'setting': read_checkpoint_setting(model_path) if fingerprint else None,
+                    'path': model_path,
+                    'fingerprint': fingerprint,
+                    'loaded_at': pd.Timestamp.now(),
+                    'load_time_s': load_time_s,
+                    'nbytes': _model_nbytes(model),
+                }
+                get_metrics().observe("idx_model_load_seconds", load_time_s, sector=sector)
+                logger.info(f"📥 Model '{sector}' dimuat dalam {load_time_s:.2f}s")
+                entry = self._entries[sector]
+            return entry['model']
+
+    @contextmanager
+    def using(self, sector):
+        """
+        Context manager yang meminjam model sektor secara eksklusif.
+
+        `NeuralForecast.predict` tidak aman dipanggil bersamaan pada objek yang sama,
+        jadi pemakaian per sektor diserialisasi dengan lock.
+        """
+        lock = self._sector_lock(sector)
+        with lock:
+            yield self.get(sector)
+
+    def checkpoint_setting(self, sector):
+        """Metadata training (`read_checkpoint_setting`) dari model yang sedang resident."""
+        entry = self._entries.get(sector)
+        return entry['setting'] if entry else None
+
+    def fingerprint(self, sector):
+        """Sidik jari checkpoint dari model yang sedang resident (None jika belum dimuat)."""
+        entry = self._entries.get(sector)
+        return entry['fingerprint'] if entry else None
+
+    def warm_up(self, sectors):
+        """Memuat model untuk daftar sektor sekaligus; sektor tanpa model dilewati."""
+        for sector in sectors:
+            try:
+                self.get(sector)
+            except FileNotFoundError:
+                logger.warning(f"⚠️ Peringatan: Model untuk '{sector}' tidak ditemukan. Melewati...")
+            except Exception as e:
+                logger.error(f"❌ Gagal memuat model '{sector}': {e}")
+
+    def evict(self, sector=None):
+        """Melepas model dari memori (satu sektor, atau semua jika `sector` None)."""
+        with self._lock:
+            if sector is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sector, None)
+
+    def memory_report(self):
+        """
+        Returns:
+            pd.DataFrame: Satu baris per model resident dengan kolom Sector, Model, path,
+                fingerprint, loaded_at, load_time_s dan param_mb.
+        """
+        rows = []
+        for sector, entry in list(self._entries.items()):
+            model_names = [type(m).__name__ for m in getattr(entry['model'], 'models', [])]
+            rows.append({
+                'Sector': sector,
+                'Model': getattr(entry['model'], 'model_name', None) or ",".join(model_names),
+                'path': entry['path'],
+                'fingerprint': entry['fingerprint'],
+                'loaded_at': entry['loaded_at'],
+                'load_time_s': entry['load_time_s'],
+                'param_mb': entry['nbytes'] / 2**20,
+            })
+        return pd.DataFrame(
+            rows, columns=['Sector', 'Model', 'path', 'fingerprint', 'loaded_at', 'load_time_s', 'param_mb']
+        )
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_save_dir):
+    """Registry bersama (satu per folder model) untuk dipakai ulang antar request dalam satu proses."""
+    key = os.path.abspath(model_save_dir)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ModelRegistry(model_save_dir)
+        return _registries[key]
@@ -0,0 +1,365 @@
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from src.runtime import default_threads_per_worker, limit_torch_threads
+from src.settings import SETTINGS_PATH, load_settings, save_settings
+from src.train_orchestrator import _run_cv_job, _timed, data_fingerprint
+
+MODEL_TYPES = ('TFT', 'NHITS', 'NBEATSx', 'LSTM')
+FEATURES = (None, 'ArticlesCount_Daily', 'GPR_Daily', 'GPR_Action_Daily', 'GPR_Threat_Daily')
+# Rung successive halving: jumlah window CV (paling baru) yang dievaluasi per rung
+DEFAULT_RUNGS = (1, 3, 5)
+
+LEADERBOARD_COLUMNS = [
+    'Sektor', 'Model', 'feature', 'trial_id', 'rung', 'cv_windows', 'max_steps', 'status',
+    'MAE', 'RMSE', 'sMAPE (%)', 'duration_s', 'cached', 'base_config',
+]
+
+
+def expand_grid(base_config, grid=None):
+    """
+    Semua kombinasi base_config dari grid `{param: [nilai, ...]}` di atas `base_config`.
+
+    Contoh: `expand_grid(base, {'input_size': [30, 60], 'scaler_type': ['minmax', 'robust']})`
+    menghasilkan 4 konfigurasi.
+    """
+    grid = grid or {}
+    keys = sorted(grid)
+    return [{**base_config, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def build_trials(sectors, models=MODEL_TYPES, features=FEATURES, base_configs=None):
+    """Kandidat sektor x model x fitur x base_config."""
+    return [
+        {'sector': sector, 'model': model, 'feature': feature, 'base_config': config}
+        for sector in sectors for model in models for feature in features for config in base_configs
+    ]
+
+
+def _hash(payload):
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def trial_id(trial):
+    """Identitas kandidat (tidak bergantung pada data maupun rung)."""
+    return _hash(trial)[:16]
+
+
+def trial_key(trial, data_fp, horizon, n_windows, max_steps):
+    """Kunci cache satu evaluasi: kandidat + data sektor + budget rung."""
+    return _hash({'trial': trial, 'data': data_fp, 'horizon': horizon, 'windows': n_windows, 'max_steps': max_steps})
+
+
+class TrialCache:
+    """
+    Hasil evaluasi trial di disk (JSONL append-only, satu baris per evaluasi selesai).
+
+    Search yang terhenti cukup dijalankan ulang: evaluasi dengan kunci yang sama (data,
+    kandidat dan budget sama) dibaca dari cache, bukan dilatih ulang.
+
+    Args:
+        path (str): File JSONL.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # baris terakhir bisa terpotong bila proses mati saat menulis
+                    self._records[record['key']] = record
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, key):
+        return self._records.get(key)
+
+    def put(self, record):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        self._records[record['key']] = record
+
+
+def _rung_steps(base_config, n_windows, n_cv_windows, scale_steps, min_steps):
+    # Budget training ikut diskalakan dengan jumlah window, sehingga rung awal memang murah
+    if not scale_steps:
+        return base_config['max_steps']
+    return max(min_steps, int(round(base_config['max_steps'] * n_windows / n_cv_windows)))
+
+
+def _prune(trials, records, keep_fraction, min_keep):
+    """Per sektor: simpan `keep_fraction` kandidat terbaik (MAE) yang berhasil di rung ini."""
+    survivors = {}
+    by_sector = {}
+    for tid, trial in trials.items():
+        by_sector.setdefault(trial['sector'], []).append(tid)
+    for sector, tids in by_sector.items():
+        ok = sorted((tid for tid in tids if records[tid]['status'] == 'ok'), key=lambda tid: records[tid]['MAE'])
+        n_keep = max(min_keep, math.ceil(len(tids) * keep_fraction))
+        survivors.update({tid: trials[tid] for tid in ok[:n_keep]})
+    return survivors
+
+
+def _settings_entry(trial, base_config):
+    entry = {'sector': trial['sector'], 'feature': trial['feature'], 'model': trial['model']}
+    override = {k: v for k, v in trial['base_config'].items() if base_config.get(k) != v}
+    if override:
+        entry['base_config'] = override
+    return entry
+
+
+def write_winners(winners, config, path=None, selection=None):
+    """
+    Menulis pemenang per sektor ke bagian `pending` file konfigurasi. Konfigurasi serving
+    (`sectors`, dibaca src.predict/API/scheduler) tidak disentuh: checkpoint di disk masih
+    dilatih dengan pilihan lama. Training membaca `pending` (`src.settings.training_settings`)
+    dan mempromosikannya setelah checkpoint dilatih ulang (`src.settings.promote_pending`).
+    Sektor yang tidak ikut search (atau tanpa trial yang berhasil) tetap memakai entri lamanya.
+
+    Args:
+        winners (dict): {sektor: record trial terbaik}.
+        config (dict): Konfigurasi saat ini (lihat `src.settings.load_settings`).
+    """
+    base_config = config['base_config']
+    current = (config.get('pending') or {}).get('sectors') or config['sectors']
+    entries = {entry['sector']: entry for entry in current}
+    for sector, record in winners.items():
+        entries[sector] = _settings_entry(record['trial'], base_config)
+    new_config = {**config, 'pending': {'sectors': list(entries.values()), 'selection': selection}}
+    return save_settings(new_config, path)
+
+
+def run_search(
+    df,
+    sectors=None,
+    models=MODEL_TYPES,
+    features=FEATURES,
+    grid=None,
+    n_cv_windows=5,
+    rungs=DEFAULT_RUNGS,
+    keep_fraction=1 / 3,
+    min_keep=1,
+    scale_steps=True,
+    min_steps=50,
+    n_workers=2,
+    threads_per_worker=None,
+    search_dir='./final_models/search',
+    settings_path=None,
+    write_settings=True,
+    retry_failed=False,
+    evaluator=None,
+):
+    """
+    Model selection paralel per sektor dengan successive halving.
+
+    Semua kandidat sektor x model x fitur x base_config dievaluasi dulu dengan budget kecil
+    (rung pertama: sedikit window CV terakhir, `max_steps` diskalakan sebanding), lalu
+    hanya `keep_fraction` terbaik per sektor yang naik ke rung berikutnya, sampai rung
+    terakhir dengan `n_cv_windows` penuh. Evaluasi dijalankan di process pool yang sama
+    dengan orkestrator training dan setiap hasil langsung disimpan ke cache JSONL di
+    `search_dir`, sehingga search bisa dihentikan dan dilanjutkan.
+
+    Args:
+        df (pd.DataFrame | str): Data lengkap, atau path dataset biner/CSV.
+        sectors (list[str], optional): Default semua sektor di file konfigurasi.
+        models (tuple[str]): Tipe model kandidat.
+        features (tuple[str | None]): Fitur eksogen kandidat (None = tanpa fitur).
+        grid (dict, optional): Grid base_config `{param: [nilai, ...]}`.
+        n_cv_windows (int): Jumlah window CV pada rung terakhir.
+        rungs (tuple[int]): Jumlah window CV per rung (naik, diakhiri `n_cv_windows`).
+        keep_fraction (float): Porsi kandidat per sektor yang lolos ke rung berikutnya.
+        n_workers (int): Jumlah proses worker.
+        search_dir (str): Folder cache trial (`trials.jsonl`) dan `leaderboard.csv`.
+        settings_path (str, optional): File konfigurasi yang dibaca dan ditulis.
+        write_settings (bool): Tulis pemenang ke file konfigurasi.
+        retry_failed (bool): Ulangi evaluasi yang tercatat gagal di cache.
+        evaluator (callable, optional): Pengganti `_run_cv_job` (harus bisa di-pickle).
+
+    Returns:
+        pd.DataFrame: Pemenang per sektor (Sektor, Model, feature, MAE, RMSE, sMAPE (%)).
+    """
+    from src.train import prepare_data
+
+    config = load_settings(settings_path)
+    horizon, base_config = config['horizon'], config['base_config']
+    sectors = sectors or [entry['sector'] for entry in config['sectors']]
+    rungs = tuple(sorted({min(r, n_cv_windows) for r in rungs} | {n_cv_windows}))
+    evaluator = evaluator or _run_cv_job
+
+    if isinstance(df, str):
+        from src.dataset import load_frame
+        df = load_frame(df, sectors=sectors)
+    missing = [f for f in features if f and f not in df.columns]
+    if missing:
+        print(f"⚠️ Fitur tidak ada di data, dilewati: {', '.join(missing)}")
+        features = tuple(f for f in features if not f or f in df.columns)
+
+    trials = build_trials(sectors, models, features, expand_grid(base_config, grid))
+    inputs, fingerprints = {}, {}
+    for sector, feature in {(t['sector'], t['feature']) for t in trials}:
+        inputs[sector, feature] = prepare_data(df, sector, feature)
+        fingerprints[sector, feature] = data_fingerprint(inputs[sector, feature])
+
+    cache = TrialCache(os.path.join(search_dir, 'trials.jsonl'))
+    threads_per_worker = threads_per_worker or default_threads_per_worker(n_workers)
+    alive = {trial_id(t): t for t in trials}
+    leaderboard, n_evaluated, n_cached = [], 0, 0
+    print(f"\n🔎 Model search: {len(trials)} kandidat untuk {len(sectors)} sektor, rung {rungs}, "
+          f"{n_workers} worker x {threads_per_worker} thread, cache {len(cache)} evaluasi")
+
+    with contextlib.ExitStack() as stack:
+        pool = None
+        for rung, n_windows in enumerate(rungs):
+            records, todo = {}, []
+            for tid, trial in alive.items():
+                max_steps = _rung_steps(trial['base_config'], n_windows, n_cv_windows, scale_steps, min_steps)
+                key = trial_key(trial, fingerprints[trial['sector'], trial['feature']], horizon, n_windows, max_steps)
+                cached = cache.get(key)
+                if cached and (cached['status'] == 'ok' or not retry_failed):
+                    records[tid] = {**cached, 'cached': True}
+                else:
+                    todo.append((tid, trial, key, max_steps))
+            n_cached += len(records)
+            print(f"  🪜 Rung {rung + 1}/{len(rungs)}: {len(alive)} kandidat, {n_windows} window CV, "
+                  f"{len(todo)} dievaluasi ({len(records)} dari cache)")
+
+            if todo and pool is None:
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=n_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=limit_torch_threads,  # tanpa plot, jadi tidak perlu matplotlib
+                    initargs=(threads_per_worker,),
+                ))
+            futures = {}
+            for tid, trial, key, max_steps in todo:
+                setting = {k: trial[k] for k in ('sector', 'feature', 'model')}
+                rung_config = {**trial['base_config'], 'max_steps': max_steps}
+                future = pool.submit(_timed, evaluator, inputs[trial['sector'], trial['feature']],
+                                     setting, rung_config, horizon, n_windows, None)
+                futures[future] = (tid, trial, key, max_steps)
+
+            for future in as_completed(futures):
+                tid, trial, key, max_steps = futures[future]
+                record = {'key': key, 'trial': trial, 'cv_windows': n_windows, 'max_steps': max_steps,
+                          'finished_at': pd.Timestamp.now().isoformat()}
+                try:
+                    record.update(status='ok', **future.result())
+                except BrokenProcessPool:
+                    raise  # worker mati (mis. OOM), bukan hasil trial: jangan masuk cache
+                except Exception as e:
+                    record.update(status='error', error=str(e))
+                    print(f"  ❌ {trial['sector']} | {trial['model']} | {trial['feature']} gagal: {e}")
+                cache.put(record)
+                records[tid] = {**record, 'cached': False}
+                n_evaluated += 1
+
+            for tid, record in records.items():
+                trial = record['trial']
+                leaderboard.append({
+                    'Sektor': trial['sector'], 'Model': trial['model'], 'feature': trial['feature'],
+                    'trial_id': tid, 'rung': rung + 1, 'cv_windows': n_windows, 'max_steps': record['max_steps'],
+                    'status': record['status'], 'MAE': record.get('MAE'), 'RMSE': record.get('RMSE'),
+                    'sMAPE (%)': record.get('sMAPE (%)'), 'duration_s': record.get('duration_s'),
+                    'cached': record['cached'], 'base_config': json.dumps(trial['base_config'], sort_keys=True),
+                })
+
+            if rung < len(rungs) - 1:
+                alive = _prune(alive, records, keep_fraction, min_keep)
+            else:
+                final_records = records
+
+    winners = {}
+    for record in final_records.values():
+        sector = record['trial']['sector']
+        if record['status'] == 'ok' and (sector not in winners or record['MAE'] < winners[sector]['MAE']):
+            winners[sector] = record
+
+    os.makedirs(search_dir, exist_ok=True)
+    leaderboard_df = pd.DataFrame(leaderboard, columns=LEADERBOARD_COLUMNS)
+    leaderboard_df.to_csv(os.path.join(search_dir, 'leaderboard.csv'), index=False)
+
+    summary = pd.DataFrame([
+        {'Sektor': sector, 'Model': r['trial']['model'], 'feature': r['trial']['feature'],
+         'MAE': r['MAE'], 'RMSE': r['RMSE'], 'sMAPE (%)': r['sMAPE (%)']}
+        for sector, r in winners.items()
+    ], columns=['Sektor', 'Model', 'feature', 'MAE', 'RMSE', 'sMAPE (%)'])
+    print(f"\n🏁 Search selesai: {n_evaluated} evaluasi baru, {n_cached} dari cache, "
+          f"pemenang untuk {len(winners)}/{len(sectors)} sektor")
+
+    if write_settings and winners:
+        selection = {
+            'method': 'successive_halving',
+            'finished_at': pd.Timestamp.now().isoformat(),
+            'metric': 'MAE',
+            'rungs': list(rungs),
+            'keep_fraction': keep_fraction,
+            'candidates': len(trials),
+            'evaluations': n_evaluated,
+            'cached': n_cached,
+            'search_dir': search_dir,
+            'scores': {sector: {k: r[k] for k in ('MAE', 'RMSE', 'sMAPE (%)')} for sector, r in winners.items()},
+        }
+        path = write_winners(winners, config, settings_path, selection)
+        print(f"💾 Pemenang ditulis ke bagian `pending` di {path}; latih ulang (python -m src.train) untuk mempromosikannya")
+    return summary.set_index(['Sektor', 'Model'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model selection paralel per sektor (successive halving).")
+    parser.add_argument("--data", default="data/sector_vol_with_geo_2_7d.csv")
+    parser.add_argument("--sectors", help="Daftar sektor dipisah koma (default semua).")
+    parser.add_argument("--models", default=",".join(MODEL_TYPES))
+    parser.add_argument("--features", default=",".join(f or "none" for f in FEATURES),
+                        help="Fitur eksogen dipisah koma; 'none' = tanpa fitur.")
+    parser.add_argument("--grid", help='Grid base_config dalam JSON, mis. \'{"input_size": [30, 60]}\'.')
+    parser.add_argument("--cv-windows", type=int, default=5)
+    parser.add_argument("--rungs", default=",".join(map(str, DEFAULT_RUNGS)))
+    parser.add_argument("--keep", type=float, default=1 / 3, help="Porsi kandidat yang lolos per rung.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads-per-worker", type=int)
+    parser.add_argument("--search-dir", default="./final_models/search")
+    parser.add_argument("--settings", default=SETTINGS_PATH)
+    parser.add_argument("--no-write", action="store_true", help="Jangan tulis pemenang ke bagian `pending` file konfigurasi.")
+    parser.add_argument("--retry-failed", action="store_true")
+    args = parser.parse_args(argv)
+
+    summary = run_search(
+        args.data,
+        sectors=args.sectors.split(",") if args.sectors else None,
+        models=tuple(args.models.split(",")),
+        features=tuple(None if f == "none" else f for f in args.features.split(",")),
+        grid=json.loads(args.grid) if args.grid else None,
+        n_cv_windows=args.cv_windows,
+        rungs=tuple(int(r) for r in args.rungs.split(",")),
+        keep_fraction=args.keep,
+        n_workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        search_dir=args.search_dir,
+        settings_path=args.settings,
+        write_settings=not args.no_write,
+        retry_failed=args.retry_failed,
+    )
+    print(summary.to_string())
+
+
+if __name__ == "__main__":
+    start = time.time()
+    main()
+    print(f"⏱️ Total {time.time() - start:.0f}s")
@@ -1,14 +1,189 @@
 import pandas as pd
-import numpy as np
 import os
-from neuralforecast.core import NeuralForecast
-from IPython.display import display
+import time
 import logging
 from src.get_data import get_sector_and_article_data
+from src.model_registry import GLOBAL_MODEL_KEY, check_checkpoint_setting, get_registry, checkpoint_fingerprint
+from src.forecast_cache import get_forecast_cache, input_fingerprint, forecast_key
+from src.runtime import limit_torch_threads, default_threads_per_worker
+from src.metrics import get_logger, record_span, span
+from src.settings import global_model_settings, resolve_base_config, sector_settings
 
 logging.getLogger("pytorch_lightning").setLevel(logging.WARNING)
+logger = get_logger("predict")
 
-def generate_all_predictions(model_save_dir: str, horizon: int):
+# --- MODEL SETTINGS ---
+# Dibaca dari config/sector_settings.json (sama dengan yang dipakai training, lihat src.settings)
+SECTOR_SETTINGS = sector_settings()
+
+# Panjang jendela input model per sektor (sama dengan base_config['input_size'] saat training)
+INPUT_SIZES = {s['sector']: resolve_base_config(s)['input_size'] for s in SECTOR_SETTINGS}
+# Mode model global: satu model NeuralForecast untuk semua sektor (unique_id = sektor)
+GLOBAL_MODEL = global_model_settings()
+PREDICT_MODES = ('per_sector', 'global')
+# Baris histori per sektor yang dibaca dari dataset lokal (~70 hari kalender seperti ingest online)
+HISTORY_ROWS = max(50, max(INPUT_SIZES.values()) + 20, GLOBAL_MODEL['base_config']['input_size'] + 20)
+
+def prepare_sector_input(df, setting):
+    """
+    Menyiapkan input NeuralForecast (kolom unique_id, ds, y, [x]) untuk satu sektor.
+
+    Args:
+        df (pd.DataFrame): Data gabungan hasil `get_sector_and_article_data`.
+        setting (dict): Satu entri `SECTOR_SETTINGS`.
+
+    Returns:
+        pd.DataFrame: Histori sektor yang siap diprediksi.
+    """
+    feature = setting['feature']
+    historical_df = df[df['Sector'] == setting['sector']].copy()
+
+    if feature:
+        historical_df[feature] = historical_df[feature].rolling(window=7, min_periods=1).sum()
+        historical_df.fillna(0, inplace=True)
+        historical_df = historical_df.rename(columns={feature: 'x'})
+
+    historical_df = historical_df.rename(columns={'Date': 'ds', 'Sector': 'unique_id', 'SectorVolatility_7d':'y'})
+    # historical_df = historical_df.tail(40)
+    return historical_df
+
+
+def predict_sector(historical_df, setting, registry):
+    """
+    Menjalankan prediksi satu sektor memakai model resident dari `registry`.
+
+    Returns:
+        pd.DataFrame: Kolom Date, Sector, SectorVolatility_7d. Durasi inferensi (tanpa
+            waktu muat model) ada di `attrs['inference_s']`.
+
+    Raises:
+        ValueError: Checkpoint dilatih dengan model/fitur lain dari `setting`.
+    """
+    sector, model_type = setting['sector'], setting['model']
+    with registry.using(sector) as nf_loaded:
+        check_checkpoint_setting(setting, registry.checkpoint_setting(sector), nf_loaded)
+        t0 = time.perf_counter()
+        predictions = nf_loaded.predict(df = historical_df)
+        inference_s = time.perf_counter() - t0
+    record_span("predict", inference_s, metric="idx_predict_duration_seconds", sector=sector, model=model_type)
+
+    predictions_renamed = predictions.rename(columns={
+        'ds': 'Date',
+        model_type: 'SectorVolatility_7d'
+    })
+    predictions_renamed['Sector'] = sector
+    result = predictions_renamed[['Date', 'Sector', 'SectorVolatility_7d']]
+    result.attrs['inference_s'] = inference_s
+    return result
+
+
+def prepare_global_input(inputs):
+    """
+    Menggabungkan input semua sektor (hasil `prepare_sector_input`) menjadi satu frame
+    multi-series untuk model global. Kolom eksogen disejajarkan ke `x` (fitur pilihan
+    tiap sektor); sektor tanpa fitur diisi 0.
+    """
+    frames = []
+    for historical_df in inputs:
+        frame = historical_df[[c for c in ('unique_id', 'ds', 'y', 'x') if c in historical_df.columns]]
+        if 'x' not in frame.columns:
+            frame = frame.assign(x=0.0)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def predict_global(inputs, settings, registry):
+    """
+    Prediksi semua sektor dalam satu forward pass model global.
+
+    Args:
+        inputs (list[pd.DataFrame]): Input per sektor (hasil `prepare_sector_input`).
+        settings (list[dict]): Entri sektor yang bersesuaian dengan `inputs`.
+        registry (ModelRegistry): Registry dengan model di `GLOBAL_MODEL_KEY`.
+
+    Returns:
+        list[pd.DataFrame]: Prediksi per sektor (format sama dengan `predict_sector`).
+    """
+    stacked = prepare_global_input(inputs)
+    with registry.using(GLOBAL_MODEL_KEY) as nf_loaded:
+        t0 = time.perf_counter()
+        predictions = nf_loaded.predict(df=stacked)
+        inference_s = time.perf_counter() - t0
+    model_type = GLOBAL_MODEL['model']
+    record_span("predict", inference_s, metric="idx_predict_duration_seconds", sector="all", model=f"global:{model_type}")
+
+    predictions = predictions.reset_index() if 'unique_id' not in predictions.columns else predictions
+    value_col = [c for c in predictions.columns if c not in ('unique_id', 'ds')][0]
+    by_sector = dict(tuple(predictions.groupby('unique_id', sort=False)))
+    results = []
+    for setting in settings:
+        part = by_sector[setting['sector']].rename(columns={'ds': 'Date', value_col: 'SectorVolatility_7d'})
+        part = part.assign(Sector=setting['sector'])[['Date', 'Sector', 'SectorVolatility_7d']].reset_index(drop=True)
+        part.attrs['inference_s'] = inference_s / len(settings)
+        results.append(part)
+    return results
+
+
+# --- Worker pool untuk inferensi paralel per sektor ---
+_worker_registry = None
+_inference_pool = None
+_inference_pool_key = None
+
+
+def _init_inference_worker(model_save_dir, torch_threads):
+    # Batasi thread torch per worker agar total thread tidak melebihi jumlah core
+    global _worker_registry
+    limit_torch_threads(torch_threads)
+    _worker_registry = get_registry(model_save_dir)
+
+
+def _predict_sector_in_worker(historical_df, setting):
+    # Registry milik worker tetap hidup antar panggilan, jadi model tetap warm
+    return predict_sector(historical_df, setting, _worker_registry)
+
+
+def get_inference_pool(model_save_dir, n_workers, torch_threads=None):
+    """
+    Process pool persisten untuk inferensi paralel. Pool dipakai ulang antar
+    panggilan selama konfigurasinya sama, sehingga model di tiap worker tetap warm.
+
+    Args:
+        model_save_dir (str): Folder model yang dimuat worker.
+        n_workers (int): Jumlah proses worker.
+        torch_threads (int, optional): Thread torch per worker. Default
+            `cpu_count // n_workers` (minimal 1).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _inference_pool, _inference_pool_key
+    if torch_threads is None:
+        torch_threads = default_threads_per_worker(n_workers)
+
+    key = (os.path.abspath(model_save_dir), n_workers, torch_threads)
+    if _inference_pool is None or _inference_pool_key != key:
+        shutdown_inference_pool()
+        # spawn: jangan fork proses yang sudah memuat torch/threads
+        _inference_pool = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_inference_worker,
+            initargs=(model_save_dir, torch_threads),
+        )
+        _inference_pool_key = key
+    return _inference_pool
+
+
+def shutdown_inference_pool():
+    """Menghentikan process pool inferensi (jika ada)."""
+    global _inference_pool, _inference_pool_key
+    if _inference_pool is not None:
+        _inference_pool.shutdown(wait=True, cancel_futures=True)
+    _inference_pool = None
+    _inference_pool_key = None
+
+
+def generate_all_predictions(model_save_dir: str, horizon: int, registry=None, n_workers=1, torch_threads=None, cache=None, use_cache=True, on_event=None, data=None, mode='per_sector'):
     """
     Memuat semua model terlatih, membuat prediksi untuk setiap sektor,
     dan mengembalikan hasilnya dalam satu DataFrame.
@@ -17,71 +192,157 @@ def generate_all_predictions(model_save_dir: str, horizon: int):
         data_path (str): Path ke file CSV data lengkap.
         model_save_dir (str): Path ke direktori utama tempat semua model disimpan.
         horizon (int): Jumlah hari ke depan yang akan diprediksi.
+        registry (ModelRegistry, optional): Registry model resident. Default registry
+            bersama untuk `model_save_dir`, sehingga model hanya dimuat sekali per proses.
+        n_workers (int): > 1 = sektor diprediksi paralel di process pool persisten.
+            Hasil dan urutannya sama dengan mode sekuensial.
+        torch_threads (int, optional): Thread torch per worker (mode paralel).
+        cache (ForecastCache, optional): Cache prediksi. Default cache bersama per proses.
+        use_cache (bool): False = selalu jalankan model.
+        on_event (callable, optional): Dipanggil dengan dict event selama proses:
+            `{"type": "progress", "stage", "message"}` untuk tahap ingest/prediksi dan
+            `{"type": "sector", "sector", "predictions", "history"}` begitu satu sektor selesai.
+        data (str | pd.DataFrame, optional): Sumber data pengganti ingest online: DataFrame,
+            atau path dataset biner/CSV (lihat `src.dataset.load_frame`) yang di-mmap
+            sehingga tidak ada parsing maupun unduhan per run.
+        mode (str): 'per_sector' (satu model per sektor) atau 'global' (satu model untuk
+            semua sektor, satu kali load dan satu forward pass; lihat `predict_global`).
 
     Returns:
         pd.DataFrame: Sebuah DataFrame tunggal berisi semua prediksi, atau None jika gagal.
+            `attrs['provenance']` berisi {sektor: {model_version, input_fingerprint, as_of}}
+            dan `attrs['mode']` mode prediksinya.
     """
+    if mode not in PREDICT_MODES:
+        raise ValueError(f"Mode prediksi tidak dikenal: {mode}. Pilihan: {', '.join(PREDICT_MODES)}")
 
-    # --- MODEL SETTINGS ---
-    settings = [
-        {"sector": "Basic Materials", "feature": "GPR_Threat_Daily", "model": "NHITS"},
-        {"sector": "Consumer Cyclicals", "feature": "ArticlesCount_Daily", "model": "NBEATSx"},
-        {"sector": "Consumer Non-Cyclicals", "feature": "GPR_Threat_Daily", "model": "TFT"},
-        {"sector": "Energy", "feature": "GPR_Threat_Daily", "model": "LSTM"},
-        {"sector": "Financials", "feature": "GPR_Threat_Daily", "model": "TFT"},
-        {"sector": "Industrials", "feature": "ArticlesCount_Daily", "model": "NBEATSx"},
-        {"sector": "Infrastuctures", "feature": "GPR_Daily", "model": "TFT"},
-        {"sector": "Kesehatan", "feature": None, "model": "LSTM"},
-        {"sector": "Properties & Real Estate", "feature": "GPR_Threat_Daily", "model": "NHITS"},
-        {"sector": "Technology", "feature": "GPR_Action_Daily", "model": "TFT"},
-        {"sector": "Transportation & Logistic", "feature": "GPR_Action_Daily", "model": "LSTM"},
-    ]
-
-    try:
-        df = get_sector_and_article_data()
-    except Exception as e:
-        print(f"❌ ERROR: {e}")
-        return None
-
-    all_predictions_list = []
-    print("Memulai pipeline prediksi untuk semua sektor...")
+    emit = on_event or (lambda event: None)
+    with span("pipeline", stage="ingest"):
+        try:
+            if data is None:
+                df = get_sector_and_article_data(on_event=on_event)
+            elif isinstance(data, str):
+                from src.dataset import load_frame
+                df = load_frame(data, sectors=[s['sector'] for s in SECTOR_SETTINGS], tail=HISTORY_ROWS)
+            else:
+                df = data
+        except Exception as e:
+            logger.error(f"❌ ERROR: {e}")
+            return None, None
+    if not isinstance(df, pd.DataFrame):
+        return None, None
 
-    for setting in settings:
-        sector = setting['sector']
-        model_type = setting['model']
-        feature = setting['feature']
+    settings = SECTOR_SETTINGS
+    if registry is None:
+        registry = get_registry(model_save_dir)
 
-        model_path = os.path.join(model_save_dir, sector.replace(" & ", "_and_").replace(" ", "_"))
-        print(f"\n-- Memproses {sector}... --")
+    logger.info("Memulai pipeline prediksi untuk semua sektor...")
+    emit({"type": "progress", "stage": "predict", "message": "Melakukan prediksi..."})
 
-        try:
-            nf_loaded = NeuralForecast.load(path=model_path)
-            historical_df = df[df['Sector'] == sector].copy()
+    if cache is None and use_cache:
+        cache = get_forecast_cache()
 
-            if feature:
-                historical_df[feature] = historical_df[feature].rolling(window=7, min_periods=1).sum()
-                historical_df.fillna(0, inplace=True)
-                historical_df = historical_df.rename(columns={feature: 'x'})
+    with span("pipeline", stage="predict"):
+        # Cek cache dulu: kunci = checkpoint model + jendela input terakhir
+        # Sidik jari yang sama juga menjadi provenance prediksi (versi model + input, lihat src.forecast_archive)
+        inputs, keys, cached, provenance = [], [], [], {}
+        for setting in settings:
+            historical_df = prepare_sector_input(df, setting)
+            inputs.append(historical_df)
+            if mode == 'global':
+                model_key, input_size = GLOBAL_MODEL_KEY, GLOBAL_MODEL['base_config']['input_size']
+            else:
+                model_key, input_size = setting['sector'], INPUT_SIZES[setting['sector']]
+            try:
+                model_fp = checkpoint_fingerprint(registry.model_path(model_key))
+            except FileNotFoundError:
+                model_fp = None
+            input_fp = input_fingerprint(historical_df, input_size)
+            provenance[setting['sector']] = {
+                'model_version': model_fp,
+                'input_fingerprint': input_fp,
+                'as_of': historical_df['ds'].max() if len(historical_df) else None,
+            }
+            key = forecast_key(model_fp, input_fp, horizon) if use_cache and model_fp else None
+            keys.append(key)
+            cached.append(cache.get(key) if key is not None else None)
 
-            historical_df = historical_df.rename(columns={'Date': 'ds', 'Sector': 'unique_id', 'SectorVolatility_7d':'y'})
-            # historical_df = historical_df.tail(40)
-            predictions = nf_loaded.predict(df = historical_df)
+        results = [None] * len(settings)
 
-            predictions_renamed = predictions.rename(columns={
-                'ds': 'Date',
-                model_type: 'SectorVolatility_7d'
+        def finish_sector(i, predictions, from_cache=False):
+            sector = settings[i]['sector']
+            results[i] = predictions
+            if from_cache:
+                logger.info(f"⚡ Prediksi untuk {sector} diambil dari cache.")
+            else:
+                if keys[i] is not None:
+                    cache.put(keys[i], predictions)
+                logger.info(f"✅ Prediksi untuk {sector} selesai ({predictions.attrs.get('inference_s', 0):.3f}s).")
+            emit({
+                "type": "sector",
+                "sector": sector,
+                "predictions": predictions,
+                "history": df[df['Sector'] == sector],
             })
-            predictions_renamed['Sector'] = sector
-            all_predictions_list.append(predictions_renamed[['Date', 'Sector', 'SectorVolatility_7d']])
-            print(f"  ✅ Prediksi untuk {sector} selesai.")
-        except FileNotFoundError:
-            print(f"  ⚠️ Peringatan: Model untuk '{sector}' tidak ditemukan. Melewati...")
-            continue
+
+        # Sektor yang ada di cache langsung dikirim lebih dulu
+        for i, predictions in enumerate(cached):
+            if predictions is not None:
+                finish_sector(i, predictions, from_cache=True)
+
+        pending = [i for i in range(len(settings)) if cached[i] is None]
+        if mode == 'global' and pending:
+            # Semua sektor yang belum ada di cache diprediksi sekaligus
+            emit({"type": "progress", "stage": "predict", "message": f"Memprediksi {len(pending)} sektor (model global)..."})
+            try:
+                batch = predict_global([inputs[i] for i in pending], [settings[i] for i in pending], registry)
+            except FileNotFoundError:
+                logger.error("❌ Model global tidak ditemukan. Latih dulu dengan `run_global_forecast`.")
+                batch = []
+            for i, predictions in zip(pending, batch):
+                finish_sector(i, predictions)
+        elif n_workers and n_workers > 1 and pending:
+            from concurrent.futures import as_completed
+
+            pool = get_inference_pool(model_save_dir, n_workers, torch_threads)
+            futures = {pool.submit(_predict_sector_in_worker, inputs[i], settings[i]): i for i in pending}
+            # Event dikirim begitu sektor selesai; urutan output akhir tetap mengikuti settings
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    predictions = future.result()
+                except FileNotFoundError:
+                    logger.warning(f"⚠️ Peringatan: Model untuk '{settings[i]['sector']}' tidak ditemukan. Melewati...")
+                    continue
+                # Metrik di proses worker tidak terlihat dari sini, jadi durasinya dicatat ulang
+                record_span("predict", predictions.attrs.get('inference_s', 0.0), metric="idx_predict_duration_seconds",
+                            sector=settings[i]['sector'], model=settings[i]['model'])
+                finish_sector(i, predictions)
+        else:
+            for i in pending:
+                sector = settings[i]['sector']
+                logger.debug(f"-- Memproses {sector}... --")
+                emit({"type": "progress", "stage": "predict", "message": f"Memprediksi {sector}..."})
+                try:
+                    finish_sector(i, predict_sector(inputs[i], settings[i], registry))
+                except FileNotFoundError:
+                    logger.warning(f"⚠️ Peringatan: Model untuk '{sector}' tidak ditemukan. Melewati...")
+                    continue
+
+    all_predictions_list = [predictions for predictions in results if predictions is not None]
+
+    if use_cache:
+        stats = cache.stats()
+        logger.info(f"📦 Cache prediksi: {stats['hits']} hit / {stats['misses']} miss (hit rate {stats['hit_rate']:.0%})")
 
     if not all_predictions_list:
-        print("\nTidak ada prediksi yang berhasil dibuat.")
+        logger.error("Tidak ada prediksi yang berhasil dibuat.")
         return None,None
 
     final_predictions_df = pd.concat(all_predictions_list, ignore_index=True)
+    final_predictions_df.attrs['provenance'] = {
+        sector: info for sector, info in provenance.items() if sector in set(final_predictions_df['Sector'])
+    }
+    final_predictions_df.attrs['mode'] = mode
     final_data = df
     return final_data, final_predictions_df
\ No newline at end of file
@@ -0,0 +1,247 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+METHODS = ('risk_parity', 'min_variance', 'inverse_vol')
+
+
+def _shrunk_correlation(returns, shrinkage):
+    corr = np.corrcoef(returns, rowvar=False)
+    corr = np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(corr, 1.0)
+    return (1 - shrinkage) * corr + shrinkage * np.eye(len(corr))
+
+
+def _risk_parity(cov, n_iter=200, tol=1e-12):
+    # Iterasi titik tetap w_i ~ 1 / (Σw)_i; konvergen ke kontribusi risiko yang sama
+    w = 1.0 / np.sqrt(np.diag(cov))
+    w /= w.sum()
+    for _ in range(n_iter):
+        new = 1.0 / (cov @ w)
+        new /= new.sum()
+        new = np.sqrt(w * new)  # langkah teredam (rata-rata geometris) agar stabil
+        new /= new.sum()
+        if np.abs(new - w).max() < tol:
+            w = new
+            break
+        w = new
+    return w
+
+
+def project_capped_simplex(v, cap, n_iter=60):
+    """
+    Proyeksi Euclidean setiap baris `v` (B, S) ke {w : 0 <= w <= cap, sum(w) = 1}.
+
+    Dicari tau per baris dengan bisection sehingga sum(clip(v - tau, 0, cap)) = 1.
+
+    Args:
+        v (np.ndarray): Bobot mentah (B, S).
+        cap (np.ndarray): Bobot maksimum per baris (B,), harus >= 1 / S.
+    """
+    cap = np.asarray(cap, dtype=np.float64)[:, None]
+    lo = (v - cap).min(axis=1, keepdims=True)
+    hi = v.max(axis=1, keepdims=True)
+    for _ in range(n_iter):
+        tau = (lo + hi) / 2
+        total = np.clip(v - tau, 0.0, cap).sum(axis=1, keepdims=True)
+        lo = np.where(total > 1, tau, lo)
+        hi = np.where(total > 1, hi, tau)
+    w = np.clip(v - (lo + hi) / 2, 0.0, cap)
+    return w / w.sum(axis=1, keepdims=True)
+
+
+class RebalanceState:
+    """
+    State yang dipra-hitung untuk `/rebalance`: kovarians sektor dan bobot dasar setiap
+    metode. Dibangun sekali per hasil prediksi, sehingga satu panggilan `solve` hanya
+    berisi operasi array kecil.
+
+    Kovarians = D * Corr * D, dengan Corr dari histori SectorReturn_avg (`lookback` hari
+    terakhir, di-shrink ke identitas) dan D volatilitas harian per sektor: rata-rata
+    prediksi SectorVolatility_7d selama horizon bila ada, selain itu volatilitas realisasi.
+
+    Args:
+        history_df (pd.DataFrame): Kolom Date, Sector, SectorReturn_avg.
+        predictions_df (pd.DataFrame, optional): Kolom Sector, SectorVolatility_7d (dan Date untuk
+            jalur volatilitas per hari, lihat `vol_path`).
+        lookback (int): Jumlah hari histori untuk korelasi.
+        shrinkage (float): Bobot identitas pada korelasi (0..1).
+        source (str, optional): Identitas hasil prediksi yang dipakai (job_id / snapshot).
+        source_kind (str, optional): 'job', 'snapshot' atau 'history'.
+        source_updated_at (float, optional): Waktu (epoch) hasil prediksi tersebut selesai.
+    """
+
+    def __init__(self, history_df, predictions_df=None, lookback=250, shrinkage=0.1, source=None,
+                 source_kind=None, source_updated_at=None):
+        returns = (
+            history_df.pivot_table(index='Date', columns='Sector', values='SectorReturn_avg')
+            .sort_index().tail(lookback)
+        )
+        self.sectors = list(returns.columns)
+        self.sector_pos = {sector: i for i, sector in enumerate(self.sectors)}
+        returns = returns.fillna(0.0).to_numpy(dtype=np.float64)
+
+        realized = returns.std(axis=0, ddof=1)
+        vol = realized.copy()
+        self.forecast_source = 'history'
+        if predictions_df is not None and not predictions_df.empty:
+            predicted = predictions_df.groupby('Sector')['SectorVolatility_7d'].mean()
+            predicted = predicted.reindex(self.sectors).to_numpy(dtype=np.float64)
+            available = np.isfinite(predicted) & (predicted > 0)
+            vol[available] = predicted[available]
+            self.forecast_source = 'forecast' if available.all() else 'forecast+history'
+        vol = np.where(vol > 0, vol, realized[realized > 0].mean() if (realized > 0).any() else 1e-4)
+
+        self.vol = vol
+        # Volatilitas harian per hari horizon (H, S) untuk simulasi risiko (src.risk);
+        # hari/sektor tanpa prediksi memakai `vol`
+        self.vol_path = vol[None, :].copy()
+        if predictions_df is not None and not predictions_df.empty and 'Date' in predictions_df.columns:
+            path = (
+                predictions_df.pivot_table(index='Date', columns='Sector', values='SectorVolatility_7d')
+                .sort_index().reindex(columns=self.sectors).to_numpy(dtype=np.float64)
+            )
+            self.vol_path = np.where(np.isfinite(path) & (path > 0), path, vol[None, :])
+        self.corr = _shrunk_correlation(returns, shrinkage)
+        self.cov = self.corr * np.outer(vol, vol)
+        self.as_of = str(pd.to_datetime(history_df['Date']).max().date())
+        self.source = source
+        self.source_kind = source_kind or ('history' if source is None else None)
+        self.source_updated_at = source_updated_at
+        self.built_at = time.time()
+
+        inv = np.linalg.solve(self.cov, np.ones(len(self.sectors)))
+        inv_vol = 1.0 / vol
+        self.base_weights = {
+            'min_variance': inv / inv.sum(),
+            'risk_parity': _risk_parity(self.cov),
+            'inverse_vol': inv_vol / inv_vol.sum(),
+        }
+
+    def holdings_matrix(self, holdings_list):
+        """
+        List of {sektor: nilai} -> (bobot (B, S), kas (B,)). Nilai boleh berupa nominal
+        atau bobot; dinormalisasi terhadap total per portofolio (kunci 'cash' = kas).
+
+        Raises:
+            ValueError: Sektor tidak dikenal atau total portofolio tidak positif.
+        """
+        weights = np.zeros((len(holdings_list), len(self.sectors)))
+        cash = np.zeros(len(holdings_list))
+        for i, holdings in enumerate(holdings_list):
+            for sector, value in (holdings or {}).items():
+                if sector == 'cash':
+                    cash[i] = value
+                elif sector in self.sector_pos:
+                    weights[i, self.sector_pos[sector]] = value
+                else:
+                    raise ValueError(f"Sektor tidak dikenal: {sector}")
+        total = weights.sum(axis=1) + cash
+        if (weights < 0).any() or (cash < 0).any():
+            raise ValueError("Holding tidak boleh negatif.")
+        empty = total <= 0
+        total = np.where(empty, 1.0, total)
+        weights, cash = weights / total[:, None], cash / total
+        cash[empty] = 1.0  # portofolio kosong dianggap kas penuh
+        return weights, cash
+
+    def solve(self, current, method='risk_parity', max_weight=None, turnover_cap=None, risk_target=None):
+        """
+        Bobot target untuk B portofolio sekaligus.
+
+        Langkah: bobot dasar metode -> proyeksi ke batas bobot per sektor -> penskalaan
+        ke target risiko (sisa ke kas) -> batas turnover: posisi saat ini yang melebihi
+        batas bobot dijual dulu ke batasnya (wajib, ke kas), lalu sisa anggaran turnover
+        dipakai bergerak sebagian ke target secara linear. Hasilnya tidak pernah melebihi
+        `max_weight`; bila penjualan wajib saja sudah melebihi `turnover_cap`, batas
+        turnover yang dilanggar dan ditandai di `turnover_cap_breached`.
+
+        Args:
+            current (np.ndarray): Bobot saat ini (B, S).
+            method (str): 'risk_parity', 'min_variance' atau 'inverse_vol'.
+            max_weight (array-like, optional): Bobot maksimum per sektor, skalar atau (B,).
+            turnover_cap (array-like, optional): Turnover maksimum (sum |Δw|), skalar atau (B,).
+            risk_target (array-like, optional): Volatilitas tahunan target, skalar atau (B,).
+
+        Returns:
+            dict: Array weights (B, S), cash (B,), expected_vol (B,, tahunan),
+                turnover (B,), turnover_capped (B,) dan turnover_cap_breached (B,).
+        """
+        if method not in self.base_weights:
+            raise ValueError(f"Metode tidak dikenal: {method}. Pilihan: {', '.join(METHODS)}")
+        n_port, n_sectors = current.shape
+
+        def per_row(value, default):
+            arr = np.broadcast_to(np.asarray(default if value is None else value, dtype=np.float64), (n_port,))
+            return np.where(np.isnan(arr), default, arr)
+
+        cap = per_row(max_weight, 1.0)
+        if (cap * n_sectors < 1 - 1e-12).any():
+            raise ValueError(f"max_weight minimal {1 / n_sectors:.4f} agar bobot bisa berjumlah 1.")
+
+        target = np.broadcast_to(self.base_weights[method], (n_port, n_sectors))
+        if (target > cap[:, None]).any():
+            target = project_capped_simplex(target, cap)
+        else:
+            target = target.copy()
+
+        annual_vol = np.sqrt(np.einsum('bi,ij,bj->b', target, self.cov, target) * TRADING_DAYS)
+        risk = per_row(risk_target, np.inf)
+        scale = np.minimum(1.0, risk / np.maximum(annual_vol, 1e-12))
+        target *= scale[:, None]
+
+        # Titik awal interpolasi sudah di dalam batas bobot, jadi hasilnya juga
+        start = np.minimum(current, cap[:, None])
+        forced = np.abs(current - start).sum(axis=1)
+        turnover = np.abs(target - start).sum(axis=1)
+        limit = per_row(turnover_cap, np.inf)
+        budget = np.maximum(limit - forced, 0.0)
+        capped = turnover > budget
+        alpha = np.where(capped, budget / np.maximum(turnover, 1e-12), 1.0)
+        weights = start + alpha[:, None] * (target - start)
+
+        return {
+            'weights': weights,
+            'cash': 1.0 - weights.sum(axis=1),
+            'expected_vol': np.sqrt(np.einsum('bi,ij,bj->b', weights, self.cov, weights) * TRADING_DAYS),
+            'turnover': np.abs(weights - current).sum(axis=1),
+            'turnover_capped': capped,
+            'turnover_cap_breached': forced > limit,
+        }
+
+    def summary(self):
+        return {
+            'as_of': self.as_of,
+            'forecast_source': self.forecast_source,
+            'source': self.source,
+            'source_kind': self.source_kind,
+            'source_updated_at': self.source_updated_at,
+            'sectors': self.sectors,
+            'daily_vol': dict(zip(self.sectors, self.vol.round(6).tolist())),
+        }
+
+
+def load_history(path="./data/df_final_update.csv", recent_df=None):
+    """
+    Histori SectorReturn_avg dari file data, ditimpa/ditambah data terbaru (mis. `data`
+    hasil job prediksi) bila ada.
+    """
+    history = pd.read_csv(path, usecols=['Date', 'Sector', 'SectorReturn_avg'], parse_dates=['Date'])
+    if recent_df is not None and not recent_df.empty:
+        recent = recent_df[['Date', 'Sector', 'SectorReturn_avg']].copy()
+        recent['Date'] = pd.to_datetime(recent['Date'])
+        history = pd.concat([history, recent]).drop_duplicates(['Date', 'Sector'], keep='last')
+    return history
+
+
+if __name__ == "__main__":
+    state = RebalanceState(load_history())
+    rng = np.random.default_rng(0)
+    current = rng.dirichlet(np.ones(len(state.sectors)), size=10_000)
+    t0 = time.perf_counter()
+    result = state.solve(current, method='risk_parity', max_weight=0.15, turnover_cap=0.3, risk_target=0.10)
+    elapsed = time.perf_counter() - t0
+    print(f"⚖️ {len(current)} portofolio dalam {elapsed * 1000:.1f} ms "
+          f"| rata-rata vol {result['expected_vol'].mean():.3f} | turnover dibatasi {result['turnover_capped'].mean():.0%}")
@@ -0,0 +1,26 @@
+import logging
+import os
+
+
+def limit_torch_threads(torch_threads):
+    """
+    Membatasi jumlah thread torch/BLAS di proses ini.
+
+    Dipakai oleh worker pool (inferensi maupun training) agar total thread
+    semua worker tidak melebihi jumlah core CPU.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    import torch
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Sudah di-set sebelumnya (hanya bisa sekali per proses)
+        pass
+    logging.getLogger("pytorch_lightning").setLevel(logging.WARNING)
+
+
+def default_threads_per_worker(n_workers):
+    """Pembagian core CPU yang adil untuk `n_workers` proses (minimal 1)."""
+    return max(1, (os.cpu_count() or 1) // max(1, n_workers))
@@ -0,0 +1,444 @@
+import hashlib
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from src.metrics import count, get_logger, run_report, span
+
+# Modul ini juga dibaca oleh API (read_current, is_fresh), jadi impor level atas hanya stdlib;
+# pandas, src.predict dan kawan-kawan diimpor di dalam fungsi yang menjalankan pipeline.
+
+logger = get_logger("scheduler")
+
+# Jam bursa IDX dalam WIB (UTC+7, tanpa DST). Sesi II ditutup 15:50 dan post-trading
+# berakhir 16:15, jadi default run 16:30 saat bar penutupan sudah tersedia di sumber data.
+WIB = timezone(timedelta(hours=7), "WIB")
+DEFAULT_RUN_AT = "16:30"
+TRADING_WEEKDAYS = (0, 1, 2, 3, 4)
+DEFAULT_SNAPSHOT_DIR = "./data/snapshots"
+SNAPSHOT_FORMAT = "snapshot-v1"
+CURRENT_FILE = "CURRENT"
+STATE_FILE = "scheduler_state.json"
+LOCK_FILE = "scheduler.lock"
+RESPONSE_FORMATS = ("records", "compact")
+
+
+def _parse_run_at(run_at):
+    hour, minute = (int(part) for part in run_at.split(":"))
+    return hour, minute
+
+
+def last_slot(now, run_at=DEFAULT_RUN_AT, weekdays=TRADING_WEEKDAYS):
+    """
+    Jadwal run terakhir yang sudah lewat (<= `now`): pukul `run_at` WIB pada hari bursa.
+
+    Args:
+        now (datetime): Waktu ber-timezone.
+        run_at (str): Jam run "HH:MM" (WIB).
+        weekdays (tuple): Hari bursa (0 = Senin).
+
+    Returns:
+        datetime: Slot dalam WIB.
+    """
+    hour, minute = _parse_run_at(run_at)
+    now = now.astimezone(WIB)
+    slot = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if slot > now:
+        slot -= timedelta(days=1)
+    while slot.weekday() not in weekdays:
+        slot -= timedelta(days=1)
+    return slot
+
+
+def next_slot(now, run_at=DEFAULT_RUN_AT, weekdays=TRADING_WEEKDAYS):
+    """Jadwal run berikutnya (> `now`)."""
+    slot = last_slot(now, run_at, weekdays) + timedelta(days=1)
+    while slot.weekday() not in weekdays:
+        slot += timedelta(days=1)
+    return slot
+
+
+class SystemClock:
+    """
+    Jam dinding sistem. Clock pengganti (mis. untuk replay/pengujian offline) cukup
+    punya `now()` yang mengembalikan datetime ber-timezone dan `sleep(detik)`.
+    """
+
+    def now(self):
+        return datetime.now(WIB)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def live_provider(**kwargs):
+    """
+    Provider data default: ingest online `get_sector_and_article_data`. Harga saham
+    di-refresh inkremental lewat store lokal (hanya tanggal yang belum ada yang diunduh)
+    dan GPR lewat cache-nya. `kwargs` diteruskan ke `get_sector_and_article_data`.
+    """
+    def provide(slot, on_event=None):
+        from src.get_data import get_sector_and_article_data
+        return get_sector_and_article_data(on_event=on_event, **kwargs)
+    return provide
+
+
+def dataset_provider(path):
+    """
+    Provider data offline: dataset biner/CSV lokal (lihat `src.dataset`) yang dipotong
+    sampai tanggal slot, sehingga jadwal bisa di-replay tanpa jaringan.
+    """
+    def provide(slot, on_event=None):
+        import pandas as pd
+        from src.dataset import load_frame
+        from src.predict import HISTORY_ROWS, SECTOR_SETTINGS
+        df = load_frame(path, sectors=[s['sector'] for s in SECTOR_SETTINGS])
+        df = df[df['Date'] <= pd.Timestamp(slot.date())]
+        return df.groupby('Sector', sort=False).tail(HISTORY_ROWS).reset_index(drop=True)
+    return provide
+
+
+class _RunLock:
+    """
+    Lock antarproses berbasis file (dibuat dengan O_EXCL) agar run tidak tumpang tindih,
+    baik antar-daemon maupun dengan `--once` manual. Lock milik proses yang sudah mati
+    atau yang lebih tua dari `stale_after` detik dianggap basi dan diambil alih.
+    """
+
+    def __init__(self, path, stale_after=2 * 3600):
+        self.path = path
+        self.stale_after = stale_after
+
+    def acquire(self):
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._is_stale():
+                    return False
+                logger.warning(f"⚠️ Lock basi di {self.path} diambil alih.")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                json.dump({"pid": os.getpid(), "host": socket.gethostname(), "started_at": time.time()}, f)
+            return True
+        return False
+
+    def _is_stale(self):
+        try:
+            with open(self.path) as f:
+                owner = json.load(f)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError):
+            # Lock baru dibuat dan isinya belum ditulis: cukup cek umurnya
+            return time.time() - os.path.getmtime(self.path) > self.stale_after
+        if time.time() - owner.get("started_at", 0) > self.stale_after:
+            return True
+        if owner.get("host") == socket.gethostname():
+            try:
+                os.kill(owner["pid"], 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                pass
+        return False
+
+    def release(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def publish_snapshot(snapshot_dir, snapshot_id, data, predictions_df, meta, keep=3):
+    """
+    Menerbitkan snapshot baru secara atomik.
+
+    Isi snapshot: `meta.json` dan body respons yang sudah diserialisasi per format
+    (`response_records.json`, `response_compact.json`) beserta ETag-nya, sehingga API
+    cukup mengirim byte yang sudah jadi. Folder ditulis sebagai folder tersembunyi lalu
+    di-rename; pointer `CURRENT` diganti dengan `os.replace`, jadi pembaca selalu melihat
+    snapshot lama atau baru secara utuh. Hanya `keep` snapshot terbaru yang disimpan.
+
+    Returns:
+        dict: Isi meta.json.
+    """
+    from src.serialize import to_compact, to_records
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_path = os.path.join(snapshot_dir, f".{snapshot_id}.tmp")
+    os.makedirs(tmp_path)
+
+    result = {"data": to_records(data), "predictions": to_records(predictions_df),
+              "report": meta.get("report"), "archive": meta.get("archive"), "snapshot": snapshot_id}
+    payloads = {
+        "records": {"status": "done", "result": result},
+        "compact": {"status": "done", "format": "compact",
+                    "result": {"data": to_compact(data), "predictions": to_compact(predictions_df)}},
+    }
+    etags = {}
+    for fmt, payload in payloads.items():
+        # Serialisasi dan ETag sama dengan `_etag_response` di api_backend
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+        etags[fmt] = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with open(os.path.join(tmp_path, f"response_{fmt}.json"), "wb") as f:
+            f.write(body)
+
+    meta = {**meta, "format": SNAPSHOT_FORMAT, "snapshot_id": snapshot_id, "etags": etags, "published_at": time.time()}
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    os.rename(tmp_path, os.path.join(snapshot_dir, snapshot_id))
+
+    pointer = os.path.join(snapshot_dir, CURRENT_FILE)
+    tmp_pointer = f"{pointer}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp_pointer, "w") as f:
+        f.write(snapshot_id)
+    os.replace(tmp_pointer, pointer)
+
+    published = sorted(
+        name for name in os.listdir(snapshot_dir)
+        if not name.startswith(".") and os.path.isdir(os.path.join(snapshot_dir, name))
+    )
+    for name in published[:-keep] if keep else []:
+        if name != snapshot_id:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+    return meta
+
+
+def read_current(snapshot_dir):
+    """
+    Meta snapshot aktif (ditunjuk `CURRENT`), ditambah `path` folder snapshot-nya,
+    atau None bila belum ada snapshot.
+    """
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE)) as f:
+            snapshot_id = f.read().strip()
+        path = os.path.join(snapshot_dir, snapshot_id)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    return {**meta, "path": path}
+
+
+def is_fresh(meta, now=None):
+    """Snapshot dibuat untuk jadwal terakhir yang sudah lewat (atau sesudahnya)."""
+    now = now or datetime.now(WIB)
+    return datetime.fromisoformat(meta["slot"]) >= last_slot(now, meta.get("run_at", DEFAULT_RUN_AT))
+
+
+class MarketCloseScheduler:
+    """
+    Daemon yang menjalankan pipeline setelah penutupan bursa IDX: refresh data
+    (inkremental) -> prediksi semua sektor -> arsip prediksi -> terbitkan snapshot
+    (body respons siap kirim) yang dilayani API secara read-only.
+
+    - Run yang terlewat (daemon mati/server restart) dikejar sekali saat start: beberapa
+      slot yang terlewat digabung menjadi satu run untuk slot terakhir.
+    - Run yang gagal dicoba ulang setelah `retry_delay` detik, maksimal `max_retries` kali per slot.
+    - Run yang tumpang tindih (daemon lain, `--once` manual) dicegah dengan lock file.
+    - Clock dan provider data bisa diganti, sehingga jadwal bisa diuji offline.
+
+    Args:
+        model_save_dir (str): Folder model (sama dengan `PREDICT_MODEL_DIR` API).
+        snapshot_dir (str): Folder snapshot (sama dengan `SNAPSHOT_DIR` API).
+        provider (callable, optional): `(slot, on_event) -> DataFrame` data terbaru.
+            Default `live_provider()`.
+        clock (optional): Objek dengan `now()` dan `sleep(detik)`. Default `SystemClock()`.
+        run_at (str): Jam run "HH:MM" WIB.
+        horizon (int): Horizon prediksi.
+        mode (str): 'per_sector' atau 'global' (lihat `generate_all_predictions`).
+        archive_dir (str, optional): Folder arsip prediksi (lihat `src.forecast_archive`).
+        n_workers (int): Worker inferensi paralel.
+        keep (int): Jumlah snapshot yang disimpan.
+        retry_delay (float): Jeda sebelum mencoba ulang run yang gagal (detik).
+        max_retries (int): Jumlah percobaan maksimum per slot.
+        poll_interval (float): Tidur maksimum daemon sebelum memeriksa jadwal lagi (detik).
+    """
+
+    def __init__(self, model_save_dir, snapshot_dir=DEFAULT_SNAPSHOT_DIR, provider=None, clock=None,
+                 run_at=DEFAULT_RUN_AT, horizon=7, mode='per_sector', archive_dir=None, n_workers=1,
+                 keep=3, retry_delay=600, max_retries=3, poll_interval=300):
+        _parse_run_at(run_at)
+        self.model_save_dir = model_save_dir
+        self.snapshot_dir = snapshot_dir
+        self.provider = provider or live_provider()
+        self.clock = clock or SystemClock()
+        self.run_at = run_at
+        self.horizon = horizon
+        self.mode = mode
+        self.archive_dir = archive_dir
+        self.n_workers = n_workers
+        self.keep = keep
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self._lock = _RunLock(os.path.join(snapshot_dir, LOCK_FILE))
+        self._state_path = os.path.join(snapshot_dir, STATE_FILE)
+
+    def state(self):
+        """Status run terakhir: last_success_slot, last_attempt_slot, attempts, retry_at, last_error, last_snapshot."""
+        try:
+            with open(self._state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _update_state(self, **fields):
+        _write_json_atomic(self._state_path, {**self.state(), **fields})
+
+    def due_slot(self, now=None):
+        """
+        Slot yang perlu dijalankan sekarang, atau None. Slot terakhir dianggap belum
+        selesai (termasuk bila terlewat) sampai ada run yang berhasil untuknya.
+        """
+        now = now or self.clock.now()
+        slot = last_slot(now, self.run_at)
+        state = self.state()
+        if state.get("last_success_slot") and datetime.fromisoformat(state["last_success_slot"]) >= slot:
+            return None
+        if state.get("last_attempt_slot") == slot.isoformat():
+            if state.get("attempts", 0) >= self.max_retries or now.timestamp() < (state.get("retry_at") or 0):
+                return None
+        return slot
+
+    def run_once(self, force=False):
+        """
+        Menjalankan pipeline bila ada slot yang jatuh tempo (atau selalu bila `force`).
+
+        Returns:
+            dict | None: Meta snapshot yang diterbitkan, None bila tidak ada yang dijalankan,
+                run lain sedang berjalan, atau run gagal (lihat `state()['last_error']`).
+        """
+        now = self.clock.now()
+        slot = last_slot(now, self.run_at) if force else self.due_slot(now)
+        if slot is None:
+            return None
+        if not self._lock.acquire():
+            logger.warning("⏭️ Run scheduler lain masih berjalan, slot ini dilewati.")
+            count("idx_scheduler_runs_total", status="skipped")
+            return None
+
+        state = self.state()
+        attempts = state.get("attempts", 0) + 1 if state.get("last_attempt_slot") == slot.isoformat() else 1
+        try:
+            logger.info(f"🕓 Run scheduler untuk slot {slot:%Y-%m-%d %H:%M} WIB (percobaan {attempts})")
+            meta = self._run(slot)
+        except Exception as e:
+            logger.exception(f"❌ Run scheduler slot {slot:%Y-%m-%d %H:%M} gagal")
+            count("idx_scheduler_runs_total", status="error")
+            self._update_state(last_attempt_slot=slot.isoformat(), attempts=attempts, last_error=str(e),
+                               retry_at=self.clock.now().timestamp() + self.retry_delay)
+            return None
+        else:
+            count("idx_scheduler_runs_total", status="done")
+            self._update_state(last_success_slot=slot.isoformat(), last_attempt_slot=slot.isoformat(), attempts=0,
+                               retry_at=None, last_error=None, last_snapshot=meta["snapshot_id"])
+            logger.info(f"📸 Snapshot {meta['snapshot_id']} diterbitkan ({meta['duration_s']:.1f}s)")
+            return meta
+        finally:
+            self._lock.release()
+
+    def _run(self, slot):
+        from src.predict import generate_all_predictions
+
+        started = self.clock.now()
+        snapshot_id = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        t0 = time.perf_counter()
+        with run_report(run_id=snapshot_id) as report:
+            with span("scheduler", stage="refresh"):
+                data = self.provider(slot, on_event=None)
+            if not hasattr(data, "empty") or data.empty:
+                raise RuntimeError("Provider data tidak menghasilkan data.")
+
+            # Cache prediksi proses daemon ikut terisi, jadi run ulang untuk data yang sama cukup cache read
+            data, predictions = generate_all_predictions(
+                self.model_save_dir, self.horizon, data=data, mode=self.mode, n_workers=self.n_workers,
+            )
+            if predictions is None:
+                raise RuntimeError("Pipeline prediksi tidak menghasilkan data.")
+
+            archived = None
+            if self.archive_dir:
+                from src.forecast_archive import archive_run
+                with span("scheduler", stage="archive"):
+                    archived = archive_run(self.archive_dir, data, predictions, run_id=snapshot_id, mode=self.mode)
+
+            with span("scheduler", stage="publish"):
+                meta = {
+                    "slot": slot.isoformat(),
+                    "run_at": self.run_at,
+                    "started_at": started.isoformat(),
+                    "model_save_dir": os.path.abspath(self.model_save_dir),
+                    "mode": self.mode,
+                    "horizon": self.horizon,
+                    "as_of": str(data['Date'].max())[:10],
+                    "sectors": int(predictions['Sector'].nunique()),
+                    "archive": archived,
+                    "duration_s": round(time.perf_counter() - t0, 3),
+                    "report": report.to_dict(),
+                }
+                return publish_snapshot(self.snapshot_dir, snapshot_id, data, predictions, meta, keep=self.keep)
+
+    def run_forever(self, max_iterations=None):
+        """
+        Loop daemon: jalankan slot yang jatuh tempo, lalu tidur sampai slot berikutnya
+        (atau jadwal retry), paling lama `poll_interval` detik sekali periksa.
+        """
+        logger.info(f"🕓 Scheduler aktif: run setiap hari bursa pukul {self.run_at} WIB, snapshot di {self.snapshot_dir}")
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            iterations += 1
+            self.run_once()
+            now = self.clock.now()
+            wake = next_slot(now, self.run_at).timestamp()
+            state = self.state()
+            if state.get("retry_at") and state.get("attempts", 0) < self.max_retries:
+                wake = min(wake, state["retry_at"])
+            self.clock.sleep(max(1.0, min(wake - now.timestamp(), self.poll_interval)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scheduler pasca-penutupan bursa: data, prediksi, arsip dan snapshot API.")
+    parser.add_argument("--model-dir", default=os.environ.get("PREDICT_MODEL_DIR", "saved_models/Forecast_Model"))
+    parser.add_argument("--snapshot-dir", default=os.environ.get("SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--archive-dir", default=os.environ.get("FORECAST_ARCHIVE", "data/forecast_archive"),
+                        help="Folder arsip prediksi (kosong = tidak diarsipkan)")
+    parser.add_argument("--mode", default=os.environ.get("PREDICT_MODE", "per_sector"), choices=("per_sector", "global"))
+    parser.add_argument("--at", default=DEFAULT_RUN_AT, help="Jam run WIB (HH:MM)")
+    parser.add_argument("--dataset", help="Data dari dataset/CSV lokal (offline) alih-alih ingest online")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PREDICT_WORKERS", "1")))
+    parser.add_argument("--once", action="store_true", help="Jalankan slot yang jatuh tempo sekali lalu keluar")
+    parser.add_argument("--force", action="store_true", help="Bersama --once: jalankan walau slot terakhir sudah selesai")
+    args = parser.parse_args()
+
+    scheduler = MarketCloseScheduler(
+        args.model_dir, args.snapshot_dir, run_at=args.at, mode=args.mode, archive_dir=args.archive_dir or None,
+        provider=dataset_provider(args.dataset) if args.dataset else None, n_workers=args.workers,
+    )
+    if args.once:
+        meta = scheduler.run_once(force=args.force)
+        if meta is None:
+            error = scheduler.state().get("last_error")
+            print(f"⏭️ Tidak ada snapshot baru: {error or 'slot terakhir sudah selesai atau run lain berjalan'}")
+            raise SystemExit(1 if error else 0)
+    else:
+        scheduler.run_forever()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+def round_significant(values, digits=7):
+    """
+    Membulatkan array float ke `digits` angka penting (presisi float32 ~ 7 digit).
+
+    Desimal ditentukan per kolom dari nilai absolut terbesar sehingga angka kecil
+    seperti volatilitas (~0.01) tetap presisi, sementara JSON tidak memuat ekor
+    digit float64 yang tidak berarti.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.abs(values[np.isfinite(values)])
+    if finite.size == 0 or finite.max() == 0:
+        return values
+    decimals = int(digits - 1 - np.floor(np.log10(finite.max())))
+    return np.round(values, max(decimals, 0))
+
+
+def convert_datetime(df):
+    # Konversi kolom datetime dan Timestamp ke string agar bisa di-serialize ke JSON
+    if df is not None:
+        df = df.copy()
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]) or df[col].dtype.__class__.__name__ == 'Timestamp':
+                df[col] = df[col].astype(str)
+    return df
+
+
+def to_records(df):
+    """DataFrame -> list of dict siap JSON (format `records` respons API)."""
+    return convert_datetime(df).to_dict(orient="records") if df is not None else []
+
+
+def filter_frame(df, sectors=None, history=None):
+    """
+    Filter sisi server untuk output API.
+
+    Args:
+        df (pd.DataFrame): Frame dengan kolom Date dan Sector.
+        sectors (list[str], optional): Hanya sektor ini.
+        history (int, optional): Hanya `history` baris terakhir per sektor.
+    """
+    if df is None or df.empty:
+        return df
+    if sectors:
+        df = df[df['Sector'].isin(sectors)]
+    if history:
+        df = df.sort_values(['Sector', 'Date']).groupby('Sector', sort=False).tail(history)
+    return df
+
+
+def to_compact(df, digits=7):
+    """
+    Encoding kolumnar ringkas untuk DataFrame prediksi/histori.
+
+    - Kolom disimpan sebagai array (nama kolom tidak diulang per baris).
+    - Sector di-encode sebagai indeks ke `sectors`.
+    - Date di-encode sebagai offset hari dari `date_start`.
+    - Float dibulatkan ke presisi float32.
+
+    Returns:
+        dict: `{"format", "length", "sectors", "date_start", "columns"}`.
+    """
+    if df is None or df.empty:
+        return {"format": "compact-v1", "length": 0, "sectors": [], "date_start": None, "columns": {}}
+
+    df = df.reset_index(drop=True)
+    columns = {}
+    sectors = []
+    date_start = None
+
+    for col in df.columns:
+        series = df[col]
+        if col == 'Sector':
+            codes, uniques = pd.factorize(series, sort=True)
+            sectors = list(uniques)
+            columns[col] = codes.tolist()
+        elif col == 'Date':
+            dates = pd.to_datetime(series).dt.normalize()
+            start = dates.min()
+            date_start = start.strftime('%Y-%m-%d')
+            columns[col] = ((dates - start).dt.days).astype('int32').tolist()
+        elif pd.api.types.is_float_dtype(series):
+            rounded = round_significant(series.to_numpy(), digits)
+            columns[col] = [None if np.isnan(v) else v for v in rounded.tolist()]
+        elif pd.api.types.is_integer_dtype(series):
+            columns[col] = series.astype('int64').tolist()
+        else:
+            columns[col] = series.astype(str).tolist()
+
+    return {
+        "format": "compact-v1",
+        "length": len(df),
+        "sectors": sectors,
+        "date_start": date_start,
+        "columns": columns,
+    }
+
+
+def from_compact(payload):
+    """Kebalikan dari `to_compact` (dipakai klien Python dan pengujian)."""
+    columns = dict(payload["columns"])
+    if 'Sector' in columns:
+        columns['Sector'] = [payload["sectors"][code] for code in columns['Sector']]
+    if 'Date' in columns:
+        start = pd.Timestamp(payload["date_start"])
+        columns['Date'] = start + pd.to_timedelta(columns['Date'], unit='D')
+    return pd.DataFrame(columns)
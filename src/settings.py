@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import uuid
+
+# Satu sumber konfigurasi model per sektor untuk training, prediksi dan model search.
+# `python -m src.model_search` hanya menulis bagian `pending`; path bisa diganti lewat env.
+SETTINGS_PATH = os.environ.get(
+    "SECTOR_SETTINGS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "sector_settings.json"),
+)
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def load_settings(path=None):
+    """
+    Membaca file konfigurasi (di-cache per proses, dibaca ulang bila file berubah).
+
+    Returns:
+        dict: version, horizon, base_config, sectors (list of {sector, feature, model,
+            [base_config]}), global_model (mode satu model untuk semua sektor), selection
+            (metadata hasil model search, atau None) dan opsional pending (hasil model search
+            yang belum dilatih ulang: {sectors, selection}).
+    """
+    path = path or SETTINGS_PATH
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path) as f:
+                cached = (mtime, json.load(f))
+            _loaded[path] = cached
+        return cached[1]
+
+
+def sector_settings(path=None):
+    """Daftar {sector, feature, model} (plus override `base_config` bila ada) per sektor."""
+    return [dict(setting) for setting in load_settings(path)["sectors"]]
+
+
+def training_settings(path=None):
+    """
+    Entri sektor untuk training: hasil model search yang masih `pending` bila ada, selain
+    itu sama dengan `sector_settings`. Prediksi tetap memakai `sector_settings` sampai
+    `promote_pending` dipanggil setelah checkpoint dilatih ulang.
+    """
+    config = load_settings(path)
+    pending = config.get("pending")
+    return [dict(setting) for setting in (pending["sectors"] if pending else config["sectors"])]
+
+
+def promote_pending(path=None):
+    """
+    Memindahkan hasil model search dari `pending` ke konfigurasi serving (`sectors`,
+    `selection`). Panggil hanya setelah checkpoint semua sektor dilatih ulang dengan
+    `training_settings`.
+
+    Returns:
+        bool: True bila ada yang dipromosikan.
+    """
+    config = dict(load_settings(path))
+    pending = config.pop("pending", None)
+    if not pending:
+        return False
+    config.update(sectors=pending["sectors"], selection=pending.get("selection"))
+    save_settings(config, path)
+    return True
+
+
+def resolve_base_config(setting, base_config=None, path=None):
+    """
+    `base_config` global digabung dengan override milik sektor (`setting['base_config']`).
+
+    Args:
+        setting (dict): Satu entri sektor.
+        base_config (dict, optional): Default dari file konfigurasi.
+    """
+    base = dict(base_config if base_config is not None else load_settings(path)["base_config"])
+    base.update(setting.get("base_config") or {})
+    return base
+
+
+def global_model_settings(path=None):
+    """
+    Konfigurasi mode model global: {model, base_config} dengan base_config sudah digabung
+    ke default global.
+    """
+    config = load_settings(path)
+    entry = config.get("global_model") or {"model": "NHITS"}
+    return {"model": entry["model"], "base_config": resolve_base_config(entry, config["base_config"])}
+
+
+def save_settings(config, path=None):
+    """Menulis konfigurasi secara atomik (pembaca tidak pernah melihat file setengah jadi)."""
+    path = path or SETTINGS_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp_path, "w") as f:
+        json.dump(config, f, indent=2, default=str)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path
@@ -1,51 +1,82 @@
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from IPython.display import display
 from neuralforecast.core import NeuralForecast
 from neuralforecast.models import TFT, NHITS, NBEATSx, LSTM
 from neuralforecast.losses.pytorch import MAE
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import logging
+from src.model_registry import GLOBAL_MODEL_KEY, sector_dir_name
+from src.train_orchestrator import save_checkpoint_atomic
+from src.dataset import load_frame
+from src.settings import global_model_settings, load_settings, promote_pending, resolve_base_config, training_settings
 
 logging.getLogger("pytorch_lightning").setLevel(logging.WARNING)
 
+def smape(y_true, y_pred):
+    epsilon = 1e-10
+    numerator = np.abs(y_pred - y_true)
+    denominator = (np.abs(y_true) + np.abs(y_pred)) / 2 + epsilon
+    return np.mean(numerator / denominator) * 100
+
+def highlight_min(s):
+    is_min = s == s.min()
+    return ['background-color: #d4edda' if v else '' for v in is_min]
+
+def prepare_data(df, sector, feature):
+    df_sector = df[df['Sector'] == sector].copy()
+    if feature:
+        df_sector[feature] = df_sector[feature].rolling(window=7, min_periods=1).sum()
+        df_sector = df_sector.rename(columns={'Date': 'ds', 'SectorVolatility_7d': 'y', feature: 'x'})
+        df_sector['unique_id'] = sector
+        df_sector = df_sector[['unique_id', 'ds', 'y', 'x']]
+    else:
+        df_sector = df_sector.rename(columns={'Date': 'ds', 'SectorVolatility_7d': 'y'})
+        df_sector['unique_id'] = sector
+        df_sector = df_sector[['unique_id', 'ds', 'y']]
+    return df_sector
+
+def init_model(model_type, params, scaler_type='minmax', n_blocks=[1,1,1]):
+    if model_type == "TFT":
+        return TFT(**params, scaler_type=scaler_type)
+    elif model_type == "NHITS":
+        return NHITS(**params, n_blocks=n_blocks, scaler_type=scaler_type)
+    elif model_type == "NBEATSx":
+        return NBEATSx(**params, n_blocks=n_blocks, scaler_type=scaler_type)
+    elif model_type == "LSTM":
+        return LSTM(**params, scaler_type=scaler_type)
+    else:
+        raise ValueError(f"Model {model_type} tidak dikenali")
+
+def build_common_params(base_config, horizon, feature):
+    common_params = {
+        'h': horizon,
+        'input_size': base_config['input_size'],
+        'loss': MAE(),
+        'max_steps': base_config['max_steps'],
+        'batch_size': base_config['batch_size'],
+        'random_seed': 1
+    }
+    if feature:
+        common_params['hist_exog_list'] = ['x']
+    return common_params
+
+def evaluate_cv(cv_df, model_type):
+    """Menghitung MAE, RMSE dan sMAPE dari hasil cross-validation."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    y_true, y_pred = cv_df['y'], cv_df[model_type]
+    mae = mean_absolute_error(y_true, y_pred)
+    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+    smape_val = smape(y_true.values, y_pred.values)
+    return mae, rmse, smape_val
+
 def run_all_sector_forecast(df, settings, base_config, save_dir='./final_models', horizon=7, n_cv_windows=5):
-    def smape(y_true, y_pred):
-        epsilon = 1e-10
-        numerator = np.abs(y_pred - y_true)
-        denominator = (np.abs(y_true) + np.abs(y_pred)) / 2 + epsilon
-        return np.mean(numerator / denominator) * 100
-
-    def highlight_min(s):
-        is_min = s == s.min()
-        return ['background-color: #d4edda' if v else '' for v in is_min]
-
-    def prepare_data(df, sector, feature):
-        df_sector = df[df['Sector'] == sector].copy()
-        if feature:
-            df_sector[feature] = df_sector[feature].rolling(window=7, min_periods=1).sum()
-            df_sector = df_sector.rename(columns={'Date': 'ds', 'SectorVolatility_7d': 'y', feature: 'x'})
-            df_sector['unique_id'] = sector
-            df_sector = df_sector[['unique_id', 'ds', 'y', 'x']]
-        else:
-            df_sector = df_sector.rename(columns={'Date': 'ds', 'SectorVolatility_7d': 'y'})
-            df_sector['unique_id'] = sector
-            df_sector = df_sector[['unique_id', 'ds', 'y']]
-        return df_sector
-
-    def init_model(model_type, params, scaler_type='minmax', n_blocks=[1,1,1]):
-        if model_type == "TFT":
-            return TFT(**params, scaler_type=scaler_type)
-        elif model_type == "NHITS":
-            return NHITS(**params, n_blocks=n_blocks, scaler_type=scaler_type)
-        elif model_type == "NBEATSx":
-            return NBEATSx(**params, n_blocks=n_blocks, scaler_type=scaler_type)
-        elif model_type == "LSTM":
-            return LSTM(**params, scaler_type=scaler_type)
-        else:
-            raise ValueError(f"Model {model_type} tidak dikenali")
+    # df boleh berupa path dataset biner/CSV; dibaca lewat mmap (lihat src.dataset)
+    if isinstance(df, str):
+        df = load_frame(df, sectors=[setting['sector'] for setting in settings], dtype=np.float64)
+    # Plot dan tampilan notebook hanya untuk laporan training, tidak ikut di jalur inferensi
+    import matplotlib.pyplot as plt
+    from IPython.display import display
 
     os.makedirs(save_dir, exist_ok=True)
     results = []
@@ -59,21 +90,13 @@ def run_all_sector_forecast(df, settings, base_config, save_dir='./final_models'
 
         df_sector = prepare_data(df, sector, feature)
 
-        # Model config
-        common_params = {
-            'h': horizon,
-            'input_size': base_config['input_size'],
-            'loss': MAE(),
-            'max_steps': base_config['max_steps'],
-            'batch_size': base_config['batch_size'],
-            'random_seed': 1
-        }
-        if feature:
-            common_params['hist_exog_list'] = ['x']
+        # Model config (base_config global + override per sektor dari config/sector_settings.json)
+        config = resolve_base_config(setting, base_config)
+        common_params = build_common_params(config, horizon, feature)
         cv_params = common_params.copy()
-        cv_params['early_stop_patience_steps'] = base_config['early_stop_patience_steps']
+        cv_params['early_stop_patience_steps'] = config['early_stop_patience_steps']
 
-        model_cv = init_model(model_type, cv_params, scaler_type=base_config['scaler_type'], n_blocks=base_config['n_blocks'])
+        model_cv = init_model(model_type, cv_params, scaler_type=config['scaler_type'], n_blocks=config['n_blocks'])
         nf_cv = NeuralForecast(models=[model_cv], freq='D')
 
         print("  📊 Cross-validation...")
@@ -81,10 +104,7 @@ def run_all_sector_forecast(df, settings, base_config, save_dir='./final_models'
 
         if not cv_df.empty:
             cv_df.dropna(inplace=True)
-            y_true, y_pred = cv_df['y'], cv_df[model_type]
-            mae = mean_absolute_error(y_true, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-            smape_val = smape(y_true.values, y_pred.values)
+            mae, rmse, smape_val = evaluate_cv(cv_df, model_type)
 
             results.append({'Sektor': sector, 'Model': model_type, 'MAE': mae, 'RMSE': rmse, 'sMAPE (%)': smape_val})
             print(f"  ✅ MAE={mae:.4f} | RMSE={rmse:.4f} | sMAPE={smape_val:.2f}%")
@@ -101,11 +121,11 @@ def run_all_sector_forecast(df, settings, base_config, save_dir='./final_models'
             axes[idx].set_title(f"{sector} ({model_type}) - Gagal CV")
 
         print("  🚂 Training final...")
-        model_final = init_model(model_type, common_params, scaler_type=base_config['scaler_type'], n_blocks=base_config['n_blocks'])
+        model_final = init_model(model_type, common_params, scaler_type=config['scaler_type'], n_blocks=config['n_blocks'])
         nf_final = NeuralForecast(models=[model_final], freq='D')
         nf_final.fit(df=df_sector)
-        model_path = os.path.join(save_dir, sector.replace(" & ", "_and_").replace(" ", "_"))
-        nf_final.save(path=model_path, overwrite=True)
+        model_path = os.path.join(save_dir, sector_dir_name(sector))
+        save_checkpoint_atomic(nf_final, model_path, setting)
         print(f"  ✔️ Model disimpan di: {model_path}")
 
     plt.tight_layout(pad=3.0)
@@ -127,36 +147,92 @@ def run_all_sector_forecast(df, settings, base_config, save_dir='./final_models'
         print("❌ Tidak ada hasil evaluasi yang valid.")
 
 
+def prepare_global_data(df, settings):
+    """
+    Data training multi-series untuk model global: setiap sektor menjadi satu `unique_id`,
+    fitur eksogen pilihan tiap sektor disejajarkan ke kolom `x` (0 untuk sektor tanpa fitur).
+    """
+    frames = []
+    for setting in settings:
+        df_sector = prepare_data(df, setting['sector'], setting['feature'])
+        if 'x' not in df_sector.columns:
+            df_sector['x'] = 0.0
+        frames.append(df_sector)
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_global_forecast(df, settings, save_dir='./final_models', horizon=7, n_cv_windows=5, model_type=None, base_config=None):
+    """
+    Melatih satu model untuk semua sektor (mode global) dan menyimpannya ke
+    `<save_dir>/_global`. Metrik CV per sektor ditulis ke `<save_dir>/global_cv_metrics.csv`
+    agar bisa dibandingkan dengan model per sektor.
+
+    Args:
+        df (pd.DataFrame | str): Data lengkap atau path dataset biner/CSV.
+        settings (list[dict]): Entri sektor (fitur eksogen per sektor).
+        model_type (str, optional): Default `global_model.model` di config/sector_settings.json.
+        base_config (dict, optional): Override untuk `global_model.base_config`; kunci yang
+            tidak diberikan tetap memakai nilai default.
+
+    Returns:
+        pd.DataFrame: Metrik CV per sektor (Sektor, Model, MAE, RMSE, sMAPE (%)).
+    """
+    if isinstance(df, str):
+        df = load_frame(df, sectors=[setting['sector'] for setting in settings], dtype=np.float64)
+    global_config = global_model_settings()
+    model_type = model_type or global_config['model']
+    config = {**global_config['base_config'], **(base_config or {})}
+
+    data = prepare_global_data(df, settings)
+    print(f"\n{'='*50}\n🌐 MODEL GLOBAL: {model_type} | {data['unique_id'].nunique()} sektor\n{'='*50}")
+    common_params = build_common_params(config, horizon, feature=True)
+    cv_params = {**common_params, 'early_stop_patience_steps': config['early_stop_patience_steps']}
+
+    print("  📊 Cross-validation...")
+    model_cv = init_model(model_type, cv_params, scaler_type=config['scaler_type'], n_blocks=config['n_blocks'])
+    cv_df = NeuralForecast(models=[model_cv], freq='D').cross_validation(df=data, n_windows=n_cv_windows, val_size=horizon)
+    cv_df = cv_df.reset_index() if 'unique_id' not in cv_df.columns else cv_df
+    results = []
+    for sector, sector_cv in cv_df.dropna().groupby('unique_id', sort=False):
+        mae, rmse, smape_val = evaluate_cv(sector_cv, model_type)
+        results.append({'Sektor': sector, 'Model': f"global:{model_type}", 'MAE': mae, 'RMSE': rmse, 'sMAPE (%)': smape_val})
+    results_df = pd.DataFrame(results, columns=['Sektor', 'Model', 'MAE', 'RMSE', 'sMAPE (%)'])
+    if not results_df.empty:
+        print(f"  ✅ MAE rata-rata={results_df['MAE'].mean():.4f} | RMSE rata-rata={results_df['RMSE'].mean():.4f}")
+
+    print("  🚂 Training final...")
+    model_final = init_model(model_type, common_params, scaler_type=config['scaler_type'], n_blocks=config['n_blocks'])
+    nf_final = NeuralForecast(models=[model_final], freq='D')
+    nf_final.fit(df=data)
+    os.makedirs(save_dir, exist_ok=True)
+    model_path = os.path.join(save_dir, GLOBAL_MODEL_KEY)
+    save_checkpoint_atomic(nf_final, model_path)
+    results_df.to_csv(os.path.join(save_dir, 'global_cv_metrics.csv'), index=False)
+    print(f"  ✔️ Model global disimpan di: {model_path}")
+    return results_df.set_index(['Sektor', 'Model'])
+
+
 if __name__ == "__main__":
     data_path = 'data/sector_vol_with_geo_2_7d.csv'
     model_save_dir = './final_models'
     
-    settings = [
-        {"sector": "Basic Materials", "feature": "GPR_Threat_Daily", "model": "NHITS"},
-        {"sector": "Consumer Cyclicals", "feature": "ArticlesCount_Daily", "model": "NBEATSx"},
-        {"sector": "Consumer Non-Cyclicals", "feature": "GPR_Threat_Daily", "model": "TFT"},
-        # {"sector": "Energy", "feature": "GPR_Threat_Daily", "model": "LSTM"},
-        # {"sector": "Financials", "feature": "GPR_Threat_Daily", "model": "TFT"},
-        # {"sector": "Industrials", "feature": "ArticlesCount_Daily", "model": "NBEATSx"},
-        # {"sector": "Infrastuctures", "feature": "GPR_Daily", "model": "TFT"},
-        # {"sector": "Kesehatan", "feature": None, "model": "LSTM"},
-        # {"sector": "Properties & Real Estate", "feature": "GPR_Threat_Daily", "model": "NHITS"},
-        # {"sector": "Technology", "feature": "GPR_Action_Daily", "model": "TFT"},
-        # {"sector": "Transportation & Logistic", "feature": "GPR_Action_Daily", "model": "LSTM"},
-    ]
-
-    base_config = {
-        'input_size': 30,
-        'max_steps': 1000,
-        'batch_size': 64,
-        'early_stop_patience_steps': 50,
-        'scaler_type': 'minmax',
-        'n_blocks': [1, 1, 1]
-    }
+    # Sektor, model, fitur dan base_config dari config/sector_settings.json; hasil model search
+    # yang masih `pending` dilatih di sini lalu dipromosikan ke konfigurasi serving
+    config = load_settings()
+    settings, base_config = training_settings(), config['base_config']
 
     try:
-        df = pd.read_csv(data_path, parse_dates=['Date'])
+        df = load_frame(data_path)
     except FileNotFoundError:
         print(f"❌ ERROR: File data di '{data_path}' tidak ditemukan.")
     else:
-        run_all_sector_forecast(df, settings, base_config, save_dir=model_save_dir)
\ No newline at end of file
+        run_all_sector_forecast(df, settings, base_config, save_dir=model_save_dir, horizon=config['horizon'])
+        if promote_pending():
+            print("✅ Konfigurasi hasil model search dipromosikan bersama checkpoint baru.")
+
+        # Alternatif: training paralel per sektor, bisa dilanjutkan jika terhenti
+        # from src.train_orchestrator import run_training_jobs
+        # run_training_jobs(df, settings, base_config, save_dir=model_save_dir, horizon=config['horizon'], n_workers=4, plot_dir='./final_models/plots')
+
+        # Alternatif: satu model global untuk semua sektor (PREDICT_MODE=global di API)
+        # run_global_forecast(df, settings, save_dir=model_save_dir, horizon=config['horizon'])
\ No newline at end of file
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from src.model_registry import checkpoint_fingerprint, sector_dir_name, write_checkpoint_setting
+from src.runtime import default_threads_per_worker, limit_torch_threads
+from src.settings import resolve_base_config
+
+RUN_LOG_COLUMNS = [
+    'Sektor', 'Model', 'feature', 'job', 'data_fingerprint', 'config_hash',
+    'MAE', 'RMSE', 'sMAPE (%)', 'checkpoint_fingerprint', 'duration_s', 'finished_at',
+]
+
+
+def data_fingerprint(df_sector):
+    """Hash dari data training satu sektor (berubah jika ada baris baru/berubah)."""
+    return hashlib.sha1(pd.util.hash_pandas_object(df_sector, index=False).values.tobytes()).hexdigest()
+
+
+def config_hash(setting, base_config, horizon, n_cv_windows):
+    payload = {'setting': setting, 'base_config': base_config, 'horizon': horizon, 'n_cv_windows': n_cv_windows}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def save_checkpoint_atomic(nf, model_path, setting=None):
+    """
+    Menyimpan NeuralForecast ke folder sementara lalu menukarnya dengan `model_path`.
+
+    Pembaca tidak pernah melihat folder yang setengah tertulis, tetapi pertukaran terdiri
+    dari dua rename: sesaat di antaranya `model_path` tidak ada (folder lama berada di
+    `.<nama>.old-*`). `checkpoint_fingerprint` dan `ModelRegistry` menunggu jendela ini
+    selesai (`src.model_registry.wait_for_checkpoint`); pembaca lain perlu melakukan hal yang sama.
+
+    `setting` (entri sektor) dicatat di folder yang sama agar prediksi bisa menolak
+    checkpoint yang tidak cocok dengan konfigurasi (`check_checkpoint_setting`).
+    """
+    parent = os.path.dirname(os.path.abspath(model_path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = os.path.join(parent, f".{os.path.basename(model_path)}.tmp-{uuid.uuid4().hex[:8]}")
+    nf.save(path=tmp_path, overwrite=True)
+    if setting is not None:
+        write_checkpoint_setting(tmp_path, setting)
+
+    old_path = None
+    if os.path.exists(model_path):
+        old_path = os.path.join(parent, f".{os.path.basename(model_path)}.old-{uuid.uuid4().hex[:8]}")
+        os.rename(model_path, old_path)
+    os.rename(tmp_path, model_path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _init_training_worker(torch_threads):
+    limit_torch_threads(torch_threads)
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _run_cv_job(df_sector, setting, base_config, horizon, n_cv_windows, plot_dir):
+    from neuralforecast.core import NeuralForecast
+    from src.train import build_common_params, evaluate_cv, init_model
+
+    sector, feature, model_type = setting['sector'], setting['feature'], setting['model']
+    base_config = resolve_base_config(setting, base_config)
+    cv_params = build_common_params(base_config, horizon, feature)
+    cv_params['early_stop_patience_steps'] = base_config['early_stop_patience_steps']
+    model_cv = init_model(model_type, cv_params, scaler_type=base_config['scaler_type'], n_blocks=base_config['n_blocks'])
+    nf_cv = NeuralForecast(models=[model_cv], freq='D')
+    cv_df = nf_cv.cross_validation(df=df_sector, n_windows=n_cv_windows, val_size=horizon).dropna()
+    if cv_df.empty:
+        raise RuntimeError(f"Cross-validation {sector} tidak menghasilkan data.")
+
+    mae, rmse, smape_val = evaluate_cv(cv_df, model_type)
+
+    if plot_dir:
+        # Satu file plot per sektor, tidak ada figure raksasa di memori
+        import matplotlib.pyplot as plt
+
+        os.makedirs(plot_dir, exist_ok=True)
+        last_window_df = cv_df[cv_df['cutoff'] == cv_df['cutoff'].max()]
+        fig, ax = plt.subplots(figsize=(15, 7))
+        last_window_df.plot(x='ds', y='y', ax=ax, label='Aktual', style='-', color='black')
+        last_window_df.plot(x='ds', y=model_type, ax=ax, label='Prediksi', style='--', color='red')
+        ax.set_title(f"{sector} | {model_type}\nMAE={mae:.4f} | RMSE={rmse:.4f} | sMAPE={smape_val:.2f}%")
+        ax.legend()
+        fig.savefig(os.path.join(plot_dir, f"{sector_dir_name(sector)}.png"), bbox_inches='tight')
+        plt.close(fig)
+
+    return {'MAE': mae, 'RMSE': rmse, 'sMAPE (%)': smape_val}
+
+
+def _run_fit_job(df_sector, setting, base_config, horizon, save_dir):
+    from neuralforecast.core import NeuralForecast
+    from src.train import build_common_params, init_model
+
+    model_type, feature = setting['model'], setting['feature']
+    base_config = resolve_base_config(setting, base_config)
+    common_params = build_common_params(base_config, horizon, feature)
+    model_final = init_model(model_type, common_params, scaler_type=base_config['scaler_type'], n_blocks=base_config['n_blocks'])
+    nf_final = NeuralForecast(models=[model_final], freq='D')
+    nf_final.fit(df=df_sector)
+
+    model_path = os.path.join(save_dir, sector_dir_name(setting['sector']))
+    save_checkpoint_atomic(nf_final, model_path, setting)
+    return {'checkpoint_fingerprint': checkpoint_fingerprint(model_path)}
+
+
+def _timed(job_fn, *args):
+    t0 = time.perf_counter()
+    result = job_fn(*args)
+    result['duration_s'] = time.perf_counter() - t0
+    return result
+
+
+def load_run_log(run_log_path):
+    if os.path.exists(run_log_path):
+        return pd.read_csv(run_log_path)
+    return pd.DataFrame(columns=RUN_LOG_COLUMNS)
+
+
+def _append_run_log(run_log_path, row):
+    # Append satu baris per job yang selesai, sehingga progres aman jika proses terhenti
+    header = not os.path.exists(run_log_path)
+    pd.DataFrame([row], columns=RUN_LOG_COLUMNS).to_csv(run_log_path, mode='a', header=header, index=False)
+
+
+def _is_current(run_log, sector, job, data_fp, cfg_hash, save_dir):
+    done = run_log[
+        (run_log['Sektor'] == sector) & (run_log['job'] == job)
+        & (run_log['data_fingerprint'] == data_fp) & (run_log['config_hash'] == cfg_hash)
+    ]
+    if done.empty:
+        return False
+    if job == 'fit':
+        # Checkpoint di disk harus masih sama dengan yang tercatat
+        try:
+            current = checkpoint_fingerprint(os.path.join(save_dir, sector_dir_name(sector)))
+        except FileNotFoundError:
+            return False
+        return current == done['checkpoint_fingerprint'].iloc[-1]
+    return True
+
+
+def run_training_jobs(
+    df,
+    settings,
+    base_config,
+    save_dir='./final_models',
+    horizon=7,
+    n_cv_windows=5,
+    n_workers=2,
+    threads_per_worker=None,
+    plot_dir=None,
+    run_log_path=None,
+    resume=True,
+    run_cv=True,
+):
+    """
+    Orkestrator training paralel: CV dan final fit tiap sektor dijalankan sebagai job
+    terpisah di process pool.
+
+    - Thread torch per worker dibatasi (`threads_per_worker`, default cpu_count // n_workers).
+    - Checkpoint ditulis secara atomik ke `save_dir`.
+    - Setiap job yang selesai langsung ditambahkan ke tabel hasil CSV (`run_log_path`).
+    - Dengan `resume=True`, job yang data, konfigurasi dan checkpoint-nya masih sama
+      dengan catatan di tabel hasil dilewati.
+
+    Args:
+        df (pd.DataFrame | str): Data lengkap (kolom Date, Sector, SectorVolatility_7d, fitur
+            eksogen), atau path dataset biner/CSV untuk `src.dataset.load_frame`.
+        settings (list[dict]): Daftar {sector, feature, model}.
+        base_config (dict): Konfigurasi model (lihat `run_all_sector_forecast`).
+        save_dir (str): Folder checkpoint.
+        n_workers (int): Jumlah proses worker.
+        threads_per_worker (int, optional): Thread torch per worker.
+        plot_dir (str, optional): Folder plot per sektor. None = tanpa plot.
+        run_log_path (str, optional): Tabel hasil. Default `<save_dir>/training_runs.csv`.
+        resume (bool): Lewati job yang sudah up to date.
+        run_cv (bool): False = hanya final fit.
+
+    Returns:
+        pd.DataFrame: Ringkasan metrik CV terbaru per sektor.
+    """
+    from src.train import prepare_data
+
+    if isinstance(df, str):
+        from src.dataset import load_frame
+        df = load_frame(df, sectors=[setting['sector'] for setting in settings])
+    os.makedirs(save_dir, exist_ok=True)
+    run_log_path = run_log_path or os.path.join(save_dir, 'training_runs.csv')
+    run_log = load_run_log(run_log_path)
+    threads_per_worker = threads_per_worker or default_threads_per_worker(n_workers)
+
+    jobs = []
+    for setting in settings:
+        sector = setting['sector']
+        df_sector = prepare_data(df, sector, setting['feature'])
+        data_fp = data_fingerprint(df_sector)
+        cfg_hash = config_hash(setting, base_config, horizon, n_cv_windows)
+        for job in (('cv', 'fit') if run_cv else ('fit',)):
+            if resume and _is_current(run_log, sector, job, data_fp, cfg_hash, save_dir):
+                print(f"  ⏭️ {sector} [{job}] sudah up to date, dilewati.")
+                continue
+            jobs.append((job, setting, df_sector, data_fp, cfg_hash))
+
+    print(f"\n🚂 {len(jobs)} job training dijadwalkan di {n_workers} worker x {threads_per_worker} thread")
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_training_worker,
+        initargs=(threads_per_worker,),
+    ) as pool:
+        futures = {}
+        for job, setting, df_sector, data_fp, cfg_hash in jobs:
+            if job == 'cv':
+                future = pool.submit(_timed, _run_cv_job, df_sector, setting, base_config, horizon, n_cv_windows, plot_dir)
+            else:
+                future = pool.submit(_timed, _run_fit_job, df_sector, setting, base_config, horizon, save_dir)
+            futures[future] = (job, setting, data_fp, cfg_hash)
+
+        for future in as_completed(futures):
+            job, setting, data_fp, cfg_hash = futures[future]
+            sector = setting['sector']
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  ❌ {sector} [{job}] gagal: {e}")
+                continue
+
+            row = {
+                'Sektor': sector, 'Model': setting['model'], 'feature': setting['feature'],
+                'job': job, 'data_fingerprint': data_fp, 'config_hash': cfg_hash,
+                'finished_at': pd.Timestamp.now().isoformat(), **result,
+            }
+            _append_run_log(run_log_path, row)
+            if job == 'cv':
+                print(f"  ✅ {sector} [cv] MAE={result['MAE']:.4f} | RMSE={result['RMSE']:.4f} | sMAPE={result['sMAPE (%)']:.2f}%")
+            else:
+                print(f"  ✔️ {sector} [fit] disimpan ({result['duration_s']:.0f}s)")
+
+    run_log = load_run_log(run_log_path)
+    cv_rows = run_log[run_log['job'] == 'cv']
+    if cv_rows.empty:
+        return pd.DataFrame(columns=['Sektor', 'Model', 'MAE', 'RMSE', 'sMAPE (%)'])
+    latest = cv_rows.groupby('Sektor').tail(1)
+    return latest[['Sektor', 'Model', 'MAE', 'RMSE', 'sMAPE (%)']].set_index(['Sektor', 'Model'])
@@ -3,6 +3,9 @@ document.getElementById('heroPredictBtn').onclick = function() {
     document.getElementById('simulasi').scrollIntoView({behavior: 'smooth'});
 };
 
+// Alamat backend FastAPI (api_backend.py)
+const API_BASE = 'http://127.0.0.1:8000';
+
 // Deklarasi variabel hanya sekali
 const sektorCheckboxes = document.getElementById('sektorCheckboxes');
 const simulasiPredictBtn = document.getElementById('simulasiPredictBtn');
@@ -39,50 +42,60 @@ function resetSimulasi() {
     sektorCheckboxes.querySelectorAll('input[type="checkbox"]').forEach(box => box.disabled = false);
 }
 
-function showChart(data, predictions, sectors) {
-    simulasiChart.innerHTML = '';
-    if (!sectors.length) return;
-    let chartHtml = '';
-    sectors.forEach(sektor => {
-        let hist = data.filter(d => d.Sector === sektor);
-        let pred = predictions.filter(d => d.Sector === sektor);
-        hist = hist.slice(-20);
-        let traces = [];
+function renderSectorChart(sektor, hist, pred) {
+    hist = hist.slice(-20);
+    let traces = [];
+    traces.push({
+        x: hist.map(d => d.Date),
+        y: hist.map(d => d.SectorVolatility_7d),
+        name: sektor + ' (Hist)',
+        mode: 'lines+markers',
+        line: {color: '#0077b6'},
+    });
+    if (pred.length > 0) {
         traces.push({
-            x: hist.map(d => d.Date),
-            y: hist.map(d => d.SectorVolatility_7d),
-            name: sektor + ' (Hist)',
+            x: pred.map(d => d.Date),
+            y: pred.map(d => d.SectorVolatility_7d),
+            name: sektor + ' (Prediksi)',
             mode: 'lines+markers',
-            line: {color: '#0077b6'},
+            line: {dash: 'dot', color: '#f77f00'}, // warna prediksi lebih kontras
+            marker: {color: '#f77f00'},
         });
-        if (pred.length > 0) {
-            traces.push({
-                x: pred.map(d => d.Date),
-                y: pred.map(d => d.SectorVolatility_7d),
-                name: sektor + ' (Prediksi)',
-                mode: 'lines+markers',
-                line: {dash: 'dot', color: '#f77f00'}, // warna prediksi lebih kontras
-                marker: {color: '#f77f00'},
-            });
-        }
-        // Buat div unik untuk setiap sektor
-        const chartId = 'chart_' + sektor.replace(/\s+/g, '_');
-        chartHtml += `<div class="sektor-chart-block"><h3>Plot Volatilitas: ${sektor}</h3><div id="${chartId}" class="sektor-chart"></div></div>`;
-        setTimeout(() => {
-            if (traces.length === 0) {
-                document.getElementById(chartId).innerHTML = '<div style="color:#888;">Tidak ada data untuk sektor terpilih.</div>';
-            } else {
-                Plotly.newPlot(chartId, traces, {
-                    title: '',
-                    xaxis: {title: 'Tanggal'},
-                    yaxis: {title: 'Volatilitas'}, // label y diganti
-                    legend: {orientation: 'h'},
-                    margin: {t:20, l:40, r:20, b:40},
-                }, {responsive:true});
-            }
-        }, 100);
+    }
+    // Buat div unik untuk setiap sektor
+    const chartId = 'chart_' + sektor.replace(/\s+/g, '_');
+    const block = document.createElement('div');
+    block.className = 'sektor-chart-block';
+    block.innerHTML = `<h3>Plot Volatilitas: ${sektor}</h3><div id="${chartId}" class="sektor-chart"></div>`;
+    simulasiChart.appendChild(block);
+    if (traces.length === 0) {
+        document.getElementById(chartId).innerHTML = '<div style="color:#888;">Tidak ada data untuk sektor terpilih.</div>';
+    } else {
+        Plotly.newPlot(chartId, traces, {
+            title: '',
+            xaxis: {title: 'Tanggal'},
+            yaxis: {title: 'Volatilitas'}, // label y diganti
+            legend: {orientation: 'h'},
+            margin: {t:20, l:40, r:20, b:40},
+        }, {responsive:true});
+    }
+}
+
+function showChart(data, predictions, sectors) {
+    simulasiChart.innerHTML = '';
+    sectors.forEach(sektor => {
+        renderSectorChart(
+            sektor,
+            data.filter(d => d.Sector === sektor),
+            predictions.filter(d => d.Sector === sektor),
+        );
     });
-    simulasiChart.innerHTML = chartHtml;
+}
+
+function finishSimulasi() {
+    setLoading(false);
+    resetBtn.style.display = 'block';
+    simulasiPredictBtn.style.display = 'none';
 }
 
 simulasiPredictBtn.addEventListener('click', function() {
@@ -94,34 +107,36 @@ simulasiPredictBtn.addEventListener('click', function() {
     setLoading(true);
     simulasiChart.innerHTML = '';
     simulasiStatus.textContent = 'Memulai prediksi...';
-    fetch('http://127.0.0.1:8000/predict')
-        .then(res => res.json())
-        .then(data => {
-            let poll = setInterval(() => {
-                fetch('http://127.0.0.1:8000/predict/status')
-                    .then(res => res.json())
-                    .then(statusData => {
-                        simulasiStatus.textContent = statusData.status;
-                        if (statusData.status === 'Selesai') {
-                            clearInterval(poll);
-                            setLoading(false);
-                            resetBtn.style.display = 'block';
-                            simulasiPredictBtn.style.display = 'none';
-                            showChart(statusData.result.data, statusData.result.predictions, sectors);
-                        } else if (statusData.status.startsWith('Error')) {
-                            clearInterval(poll);
-                            setLoading(false);
-                            simulasiStatus.textContent = statusData.status;
-                            alert(statusData.status);
-                        }
-                    })
-                    .catch(() => {
-                        clearInterval(poll);
-                        setLoading(false);
-                        simulasiStatus.textContent = 'Gagal polling status backend.';
-                        alert('Gagal polling status backend.');
-                    });
-            }, 1500);
+    fetch(`${API_BASE}/predict`, {method: 'POST'})
+        .then(res => {
+            if (!res.ok) throw new Error('Gagal memulai job');
+            return res.json();
+        })
+        .then(job => {
+            // Hasil dikirim per sektor lewat Server-Sent Events begitu sektor selesai
+            const source = new EventSource(`${API_BASE}/predict/jobs/${job.job_id}/events?history=20`);
+            source.addEventListener('progress', e => {
+                simulasiStatus.textContent = JSON.parse(e.data).message;
+            });
+            source.addEventListener('sector', e => {
+                const event = JSON.parse(e.data);
+                simulasiStatus.textContent = `Prediksi ${event.sector} selesai`;
+                if (sectors.includes(event.sector)) {
+                    renderSectorChart(event.sector, event.history, event.predictions);
+                }
+            });
+            source.addEventListener('done', () => {
+                source.close();
+                simulasiStatus.textContent = 'Selesai';
+                finishSimulasi();
+            });
+            source.addEventListener('error', e => {
+                source.close();
+                const message = e.data ? JSON.parse(e.data).message : 'Koneksi stream ke backend terputus.';
+                setLoading(false);
+                simulasiStatus.textContent = message;
+                alert(message);
+            });
         })
         .catch(() => {
             setLoading(false);
@@ -134,6 +149,90 @@ resetBtn.addEventListener('click', function() {
     resetSimulasi();
 });
 
+// --- Arsip prediksi & akurasi: GET /forecasts?as_of= dan GET /forecasts/accuracy ---
+const arsipDate = document.getElementById('arsipDate');
+const arsipBtn = document.getElementById('arsipBtn');
+const arsipStatus = document.getElementById('arsipStatus');
+const arsipAccuracy = document.getElementById('arsipAccuracy');
+const arsipChart = document.getElementById('arsipChart');
+
+function fetchJson(path) {
+    return fetch(`${API_BASE}${path}`).then(res => res.json().then(body => {
+        if (!res.ok) throw new Error(body.message || `HTTP ${res.status}`);
+        return body;
+    }));
+}
+
+function formatNumber(value) {
+    return value === null || value === undefined ? '-' : Number(value).toFixed(4);
+}
+
+function renderAccuracy(accuracy) {
+    // Jendela terpanjang dari ringkasan accuracy.json
+    const windows = Object.keys(accuracy.windows);
+    const days = windows[windows.length - 1];
+    const rows = accuracy.windows[days].by_sector.map(r => `
+        <tr><td>${r.Sector}</td><td>${r.n}</td><td>${formatNumber(r.mae)}</td>
+        <td>${formatNumber(r.rmse)}</td><td>${formatNumber(r.mape)}</td><td>${formatNumber(r.bias)}</td></tr>`).join('');
+    arsipAccuracy.innerHTML = `
+        <h3>Akurasi ${days} hari terakhir (target s/d ${accuracy.last_target})</h3>
+        <table>
+            <thead><tr><th>Sektor</th><th>n</th><th>MAE</th><th>RMSE</th><th>MAPE</th><th>Bias</th></tr></thead>
+            <tbody>${rows}</tbody>
+        </table>`;
+}
+
+function renderArchive(forecasts) {
+    arsipChart.innerHTML = '';
+    const sectors = [...new Set(forecasts.map(d => d.Sector))];
+    if (!sectors.length) {
+        arsipChart.innerHTML = '<div style="color:#888;">Tidak ada prediksi arsip sampai tanggal tersebut.</div>';
+        return;
+    }
+    const traces = sectors.map(sektor => {
+        const rows = forecasts.filter(d => d.Sector === sektor);
+        return {
+            x: rows.map(d => d.target),
+            y: rows.map(d => d.forecast),
+            name: `${sektor} (as-of ${rows[0].as_of})`,
+            mode: 'lines+markers',
+        };
+    });
+    Plotly.newPlot(arsipChart, traces, {
+        title: '',
+        xaxis: {title: 'Tanggal target'},
+        yaxis: {title: 'Volatilitas prediksi'},
+        legend: {orientation: 'h'},
+        margin: {t:20, l:40, r:20, b:40},
+    }, {responsive:true});
+}
+
+function loadAccuracy() {
+    fetchJson('/forecasts/accuracy')
+        .then(renderAccuracy)
+        .catch(err => { arsipAccuracy.innerHTML = `<div style="color:#888;">${err.message}</div>`; });
+}
+
+arsipBtn.addEventListener('click', function() {
+    if (!arsipDate.value) {
+        alert('Pilih tanggal terlebih dahulu!');
+        return;
+    }
+    const sectors = getSelectedSectors();
+    const params = new URLSearchParams({as_of: arsipDate.value});
+    if (sectors.length) params.set('sectors', sectors.join(','));
+    arsipStatus.textContent = 'Memuat arsip...';
+    fetchJson(`/forecasts?${params}`)
+        .then(body => {
+            arsipStatus.textContent = '';
+            renderArchive(body.forecasts);
+        })
+        .catch(err => { arsipStatus.textContent = err.message; });
+});
+
+arsipDate.value = new Date().toISOString().slice(0, 10);
+loadAccuracy();
+
 if (window.location.hash === '#simulasi') {
     setTimeout(() => {
         document.getElementById('simulasi').scrollIntoView({behavior: 'smooth'});